@@ -13,9 +13,28 @@ class Settings(BaseSettings):
     secret_key: str
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 60
+    token_cache_size: int = 4096  # Tokens verificados mantidos em memória
+    user_cache_ttl: int = 60  # Segundos que o usuário autenticado fica em cache
+    user_cache_size: int = 1024  # Usuários mantidos em cache por worker
     
     # Banco de dados
     database_url: str = "sqlite:///./app.db"
+    async_database_url: Optional[str] = None  # Padrão: database_url com driver assíncrono
+    
+    # Pool de conexões (bancos servidor, ex.: Postgres)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30  # Segundos aguardando uma conexão livre
+    db_pool_recycle: int = 1800  # Segundos até reabrir uma conexão
+    db_pool_pre_ping: bool = True
+    
+    # SQLite: "production" aplica os PRAGMAs abaixo a cada conexão; "default" mantém os do SQLite
+    sqlite_profile: str = "production"
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_mmap_size: int = 256 * 1024 * 1024  # Bytes
+    sqlite_cache_size: int = -64000  # Negativo: KiB (64 MB)
+    sqlite_busy_timeout: int = 5000  # Milissegundos
     
     # Operador padrão
     operator_email: Optional[str] = None
@@ -24,6 +43,43 @@ class Settings(BaseSettings):
     # Upload
     max_upload_mb: int = 20
     
+    # Fila de processamento de uploads
+    ingest_workers: int = 2  # Uploads processados simultaneamente
+    ingest_queue_size: int = 16  # Uploads aguardando além dos que estão em processamento
+    ingest_stale_minutes: int = 60  # Uploads "em processamento" há mais tempo são retomados na inicialização
+    stats_workers: int = 1  # Processos usados para agregar as estatísticas de um arquivo
+    
+    # Pool de hashing de senhas (bcrypt)
+    password_hash_rounds: int = 12  # Custo do bcrypt (log2 das iterações); ver scripts/calibrate_password_hash.py
+    password_workers: int = 2  # Hashes/verificações simultâneos
+    password_queue_size: int = 32  # Operações aguardando; além disso, 503
+    
+    # Limitação de tentativas de login (token bucket, por worker). O IP é o
+    # request.client.host: atrás de proxy reverso, rodar o uvicorn com
+    # --proxy-headers e --forwarded-allow-ips (FORWARDED_ALLOW_IPS) do proxy
+    login_ip_burst: int = 20  # Tentativas seguidas por IP
+    login_ip_per_minute: float = 10  # Reposição por IP
+    login_email_burst: int = 5  # Tentativas seguidas por email, a partir de um mesmo IP
+    login_email_per_minute: float = 2  # Reposição por (email, IP)
+    login_email_global_burst: int = 100  # Tentativas seguidas por email, somando todos os IPs
+    login_email_global_per_minute: float = 30  # Reposição global por email
+    login_throttle_max_keys: int = 10000  # IPs/emails acompanhados (LRU)
+    
+    # Cópia colunar (Parquet) gravada na ingestão; requer pyarrow
+    columnar_sidecar: bool = True
+    columnar_compression: str = "zstd"
+    
+    # Índice esparso de linhas: offset de uma a cada N linhas de dados
+    row_index_stride: int = 1000
+    
+    # Consultas sobre o conteúdo dos uploads
+    query_max_rows: int = 100000  # Limite de linhas por consulta
+    export_link_max_age: int = 300  # Validade (s) dos links assinados de exportação
+    download_gzip: bool = True  # Servir variante gzip (gerada sob demanda) a quem aceitar
+    
+    # Listagem de uploads
+    listing_count_cap: int = 10000  # Limite da contagem no modo count=estimate
+    
     # Diretório de uploads
     uploads_dir: str = "./uploads"
     
@@ -1,16 +1,86 @@
 """
 Configuração do banco de dados
 """
-from sqlalchemy import create_engine
+from functools import lru_cache
+from typing import Any, Dict
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
 
+# Drivers assíncronos usados para cada banco
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+
+def sqlite_pragmas() -> Dict[str, Any]:
+    """PRAGMAs do perfil de SQLite configurado"""
+    if settings.sqlite_profile != "production":
+        return {}
+    return {
+        "journal_mode": settings.sqlite_journal_mode,
+        "synchronous": settings.sqlite_synchronous,
+        "mmap_size": settings.sqlite_mmap_size,
+        "cache_size": settings.sqlite_cache_size,
+        "busy_timeout": settings.sqlite_busy_timeout,
+    }
+
+
+def engine_options(url: str) -> Dict[str, Any]:
+    """Argumentos de ``create_engine`` para o banco da URL"""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {"connect_args": {"check_same_thread": False}}
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
+def configure_engine(engine: Engine) -> Engine:
+    """Aplicar os PRAGMAs do SQLite a cada nova conexão da engine"""
+    pragmas = sqlite_pragmas()
+    if engine.dialect.name != "sqlite" or not pragmas:
+        return engine
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    return engine
+
+
+def describe_engine(engine: Engine) -> Dict[str, Any]:
+    """Configuração efetiva da engine (para o log de inicialização)"""
+    if engine.dialect.name == "sqlite":
+        with engine.connect() as conn:
+            return {
+                name: conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+                for name in ("journal_mode", "synchronous", "mmap_size", "cache_size", "busy_timeout")
+            }
+    return {
+        "pool_size": engine.pool.size(),
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
 # Criar engine do SQLAlchemy
-engine = create_engine(
-    settings.database_url,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {}
-)
+engine = configure_engine(create_engine(settings.database_url, **engine_options(settings.database_url)))
 
 # Criar sessão
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -28,6 +98,95 @@ def get_db():
         db.close()
 
 
+def async_database_url(url: str) -> str:
+    """Converter a URL do banco para o driver assíncrono correspondente"""
+    parsed = make_url(url)
+    if parsed.get_dialect().is_async:
+        return url
+    
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"Banco sem driver assíncrono configurado: {backend}")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+@lru_cache(maxsize=None)
+def get_async_engine() -> AsyncEngine:
+    """Engine assíncrona, criada no primeiro uso"""
+    url = settings.async_database_url or async_database_url(settings.database_url)
+    async_engine = create_async_engine(url, **engine_options(url))
+    configure_engine(async_engine.sync_engine)
+    return async_engine
+
+
+@lru_cache(maxsize=None)
+def get_async_sessionmaker() -> async_sessionmaker:
+    """Fábrica de sessões assíncronas"""
+    # Sem expirar no commit: atributos não podem ser recarregados fora de um await
+    return async_sessionmaker(bind=get_async_engine(), autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db():
+    """Dependency para obter sessão assíncrona do banco"""
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+
 def create_tables():
     """Criar todas as tabelas"""
     Base.metadata.create_all(bind=engine)
+    add_missing_columns()
+    add_missing_indexes()
+    normalize_upload_timestamps()
+
+
+def add_missing_columns():
+    """
+    Adicionar às tabelas existentes as colunas novas dos modelos
+
+    ``create_all`` não altera tabelas já criadas; as colunas adicionadas
+    depois da criação do banco são incluídas aqui via ``ALTER TABLE``.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=engine.dialect)}"
+                # Apenas defaults constantes são aceitos em ADD COLUMN
+                if column.server_default is not None and isinstance(column.server_default.arg, str):
+                    ddl += f" DEFAULT '{column.server_default.arg}'"
+                conn.execute(text(ddl))
+
+
+def add_missing_indexes():
+    """Criar nas tabelas existentes os índices novos dos modelos"""
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+
+
+def normalize_upload_timestamps(bind: Engine = None) -> int:
+    """
+    Uniformizar no SQLite o formato de ``uploads.uploaded_at``
+
+    O SQLite compara datas como texto. Linhas gravadas pelo
+    ``CURRENT_TIMESTAMP`` (``YYYY-MM-DD HH:MM:SS``) ficariam fora de ordem
+    em relação ao formato do SQLAlchemy (``YYYY-MM-DD HH:MM:SS.ffffff``),
+    usado pelo cursor da listagem. Retorna quantas linhas foram ajustadas.
+    """
+    bind = bind or engine
+    if bind.dialect.name != "sqlite":
+        return 0
+    with bind.begin() as conn:
+        result = conn.execute(text(
+            "UPDATE uploads SET uploaded_at = uploaded_at || '.000000' WHERE length(uploaded_at) = 19"
+        ))
+    return result.rowcount
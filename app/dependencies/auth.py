@@ -4,44 +4,53 @@ from fastapi.responses import RedirectResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional, Dict
 from app.services.auth_service import AuthService
+from app.services.token_cache import decode_access_token
+from app.services.user_cache import UserSnapshot, user_cache
 from app.dependencies.database import get_db
+from app.db import get_async_db
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 def get_auth_service(db: Session = Depends(get_db)) -> AuthService:
     return AuthService(db)
 
+def get_async_auth_service(db: AsyncSession = Depends(get_async_db)) -> AuthService:
+    return AuthService(db)
+
 security = HTTPBearer()
 
 async def require_auth(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    auth_service: AuthService = Depends(get_auth_service)
+    credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> dict:
+    # Sem sessão de banco: o token é resolvido pelo cache de tokens verificados
     token = credentials.credentials
-    user_data = auth_service.decode_access_token(token)
+    user_data = decode_access_token(token)
     if not user_data:
         raise HTTPException(status_code=401, detail="Token inválido")
     return user_data
 
 async def get_user_object(
     user_data: dict = Depends(require_auth),
-    db: Session = Depends(get_db)
+    auth_service: AuthService = Depends(get_async_auth_service)
 ):
-    """Retorna usuário completo do banco a partir do token."""
-    auth_service = AuthService(db)
-    user = auth_service.get_user_by_id(user_data["user_id"])
+    """Retorna o usuário do token como instantâneo imutável (do cache ou do banco)."""
+    snapshot = user_cache.get(user_data["user_id"])
+    if snapshot is not None:
+        return snapshot
+
+    user = await auth_service.get_user_by_id_async(user_data["user_id"])
     if not user:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
-    return user
+    snapshot = UserSnapshot.from_user(user)
+    user_cache.put(snapshot)
+    return snapshot
 
-async def redirect_if_authenticated(
-    request: Request,
-    auth_service: AuthService = Depends(get_auth_service)
-):
+async def redirect_if_authenticated(request: Request):
     """Redireciona usuário para dashboard se token válido presente."""
     auth_header = request.headers.get("Authorization")
     if auth_header:
         scheme, _, token = auth_header.partition(" ")
         if scheme.lower() == "bearer" and token:
-            user_data = auth_service.decode_access_token(token)
+            user_data = decode_access_token(token)
             if user_data:
                 return RedirectResponse(url="/dashboard", status_code=302)
\ No newline at end of file
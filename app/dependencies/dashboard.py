@@ -1,13 +1,21 @@
-from app.db import get_db
+from app.db import get_async_db, get_db
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from fastapi import Depends
 from app.services.stats_service import StatsService
 
-def get_dashboard_data(db: Session = Depends(get_db)):
+def get_stats_service(db: Session = Depends(get_db)) -> StatsService:
+    return StatsService(db)
+
+async def get_dashboard_data(
+    db: Session = Depends(get_db),
+    async_db: AsyncSession = Depends(get_async_db)
+):
     """Dependência para obter todos os dados do dashboard."""
-    stats_service = StatsService(db)
-    stats = stats_service.get_dashboard_stats()
-    military_stats = stats_service.get_military_stats()
+    stats = await StatsService(async_db).get_dashboard_stats_async()
+    # Pode agregar o arquivo quando não há estatísticas gravadas: roda fora do event loop
+    military_stats = await run_in_threadpool(StatsService(db).get_military_stats)
     
     # Preparar dados para o gráfico
     chart_data = {
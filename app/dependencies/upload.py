@@ -1,21 +1,24 @@
 from http.client import HTTPException
 from typing import Annotated
-from app.db import get_db 
+from app.db import get_async_db, get_db
 from app.models import Upload
 from app.services.file_service import FileService
 from fastapi import Depends
 from fastapi import APIRouter, Request, Depends, HTTPException, status, Query, UploadFile, File, Form
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-import json
 from app.services.upload_service import UploadService
 
 def get_upload_service(db: Session = Depends(get_db)) -> UploadService:
     return UploadService(db)
 
+def get_async_upload_service(db: AsyncSession = Depends(get_async_db)) -> UploadService:
+    return UploadService(db)
+
 def get_upload_details(upload_id: int, db: Session = Depends(get_db)):
     """Dependência para obter os detalhes de um upload."""
     upload_service = UploadService(db)
-    upload = upload_service.get_upload_by_id(upload_id)
+    upload = upload_service.get_upload_by_id(upload_id, include_blobs=True)
 
     if not upload:
         raise HTTPException(
@@ -23,34 +26,12 @@ def get_upload_details(upload_id: int, db: Session = Depends(get_db)):
             detail="Upload não encontrado"
         )
 
-    # Parsear JSONs
-    columns = []
-    dtypes = {}
-    sample_rows = []
-
-    if upload.columns_json:
-        try:
-            columns = json.loads(upload.columns_json)
-        except (json.JSONDecodeError, TypeError):
-            pass
-
-    if upload.dtypes_json:
-        try:
-            dtypes = json.loads(upload.dtypes_json)
-        except (json.JSONDecodeError, TypeError):
-            pass
-
-    if upload.sample_rows_json:
-        try:
-            sample_rows = json.loads(upload.sample_rows_json)
-        except (json.JSONDecodeError, TypeError):
-            pass
-
+    # JSONs gravados na ingestão, repassados sem decodificar
     return {
         "upload": upload,
-        "columns": columns,
-        "dtypes": dtypes,
-        "sample_rows": sample_rows
+        "columns_json": upload.columns_json or "[]",
+        "dtypes_json": upload.dtypes_json or "{}",
+        "sample_rows_json": upload.sample_rows_json or "[]"
     }
 
 def get_download_file(upload_id: int, db: Session = Depends(get_db)):
@@ -74,7 +55,8 @@ def get_download_file(upload_id: int, db: Session = Depends(get_db)):
     
     return {
         "path": str(file_path),
-        "filename": upload.original_name
+        "filename": upload.original_name,
+        "upload": upload
     }
 
 def validate_csv_upload(
@@ -1,5 +1,7 @@
 from fastapi import Form, Request, Depends, HTTPException, status
 from app.services.auth_service import AuthService
+from app.services.password_pool import PasswordPoolFull
+from starlette.concurrency import run_in_threadpool
 from app.dependencies.auth import require_auth, get_auth_service
 from app.dependencies.database import get_db
 from sqlalchemy.orm import Session
@@ -32,11 +34,19 @@ def validate_password_change_factory():
                 detail="Nova senha deve ter pelo menos 6 caracteres"
             )
     
-        success = auth_service.change_password(
-            current_user["user_id"],
-            current_password,
-            new_password
-        )
+        try:
+            success = await run_in_threadpool(
+                auth_service.change_password,
+                current_user["user_id"],
+                current_password,
+                new_password
+            )
+        except PasswordPoolFull:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Muitas solicitações. Tente novamente em instantes.",
+                headers={"Retry-After": "1"}
+            )
         if not success:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
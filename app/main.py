@@ -13,9 +13,13 @@ import logging
 from pathlib import Path
 
 from app.config import settings
-from app.db import create_tables
+from app.db import create_tables, describe_engine, engine
 from app.services.auth_service import AuthService
+from app.services.search_service import create_search_index
+from app.services.upload_service import UploadService
 from app.db import get_db
+from app.services.ingest_queue import ingest_queue
+from app.services.password_pool import password_pool
 from .routers.v1.router import router as v1_router
 from .routers.pages import router as frontend_router
 
@@ -61,6 +65,11 @@ async def startup_event():
         # Criar tabelas do banco
         create_tables()
         logger.info("Tabelas do banco criadas/verificadas")
+        logger.info(f"Banco de dados {engine.dialect.name}: {describe_engine(engine)}")
+        
+        # Índice de busca por nome de arquivo
+        if create_search_index(engine):
+            logger.info("Índice de busca por nome de arquivo verificado")
         
         # Criar diretório de uploads
         uploads_dir = Path(settings.uploads_dir)
@@ -78,6 +87,25 @@ async def startup_event():
         finally:
             db.close()
         
+        # Preencher metadados de colunas de uploads antigos
+        db = next(get_db())
+        try:
+            backfilled = UploadService(db).backfill_upload_columns()
+            if backfilled:
+                logger.info(f"Colunas de {backfilled} upload(s) gravadas em upload_columns")
+        except Exception as e:
+            logger.warning(f"Erro ao preencher upload_columns: {e}")
+        finally:
+            db.close()
+        
+        # Retomar uploads que não terminaram de ser processados
+        requeued = ingest_queue.requeue_unfinished()
+        if requeued:
+            logger.info(f"{requeued} upload(s) pendente(s) reenfileirado(s)")
+        
+        # Agregar, em segundo plano, uploads antigos que ainda não têm agregado gravado
+        ingest_queue.start_aggregate_backfill()
+        
         logger.info("Aplicação iniciada com sucesso")
         
     except Exception as e:
@@ -85,6 +113,13 @@ async def startup_event():
         raise
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Evento de encerramento"""
+    ingest_queue.shutdown(wait=False)
+    password_pool.shutdown(wait=False)
+
+
 @app.get("/", response_class=HTMLResponse, include_in_schema=False)
 async def root(request: Request):
     """Página inicial - serve o template base. O redirecionamento será tratado pelo JS."""
@@ -1,12 +1,21 @@
 """
 Modelos SQLAlchemy
 """
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Enum
-from sqlalchemy.orm import relationship
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, ForeignKey, Text, Enum, Index
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
 from app.db import Base
+from datetime import datetime, timezone
 import enum
 
+# Grupo das colunas JSON do upload que não são carregadas por padrão
+UPLOAD_BLOBS = "upload_blobs"
+
+
+def utcnow() -> datetime:
+    """Horário atual em UTC (default gerado no Python, com formato fixo no banco)"""
+    return datetime.now(timezone.utc)
+
 
 class UserRole(str, enum.Enum):
     """Roles de usuário"""
@@ -14,6 +23,14 @@ class UserRole(str, enum.Enum):
     USER = "user"
 
 
+class UploadStatus(str, enum.Enum):
+    """Status de processamento de um upload"""
+    PENDING = "pending"
+    PROCESSING = "processing"
+    READY = "ready"
+    FAILED = "failed"
+
+
 class User(Base):
     """Modelo de usuário"""
     __tablename__ = "users"
@@ -32,20 +49,70 @@ class User(Base):
 class Upload(Base):
     """Modelo de upload de arquivo"""
     __tablename__ = "uploads"
+    __table_args__ = (
+        # Listagem por usuário e paginação por data (uploaded_at, id)
+        Index("ix_uploads_user_id_uploaded_at", "user_id", "uploaded_at"),
+        Index("ix_uploads_uploaded_at_id", "uploaded_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     original_name = Column(String(255), nullable=False)
     stored_path = Column(String(500), nullable=False)
-    size_bytes = Column(Integer, nullable=False)
-    uploaded_at = Column(DateTime(timezone=True), server_default=func.now())
+    size_bytes = Column(BigInteger, nullable=False)
+    content_sha256 = Column(String(64), nullable=True)  # Hash do conteúdo calculado no upload
+    columnar_path = Column(String(500), nullable=True)  # Cópia Parquet gerada na ingestão
+    row_index_path = Column(String(500), nullable=True)  # Índice esparso de offsets de linhas
+    # Default no Python: o CURRENT_TIMESTAMP do SQLite grava sem microssegundos
+    # e quebraria a comparação textual do cursor da listagem
+    uploaded_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
+    
+    # Processamento em segundo plano (uploads anteriores à fila já estão prontos)
+    status = Column(Enum(UploadStatus), default=UploadStatus.PENDING, server_default=UploadStatus.READY.name, nullable=False)
+    error_message = Column(Text, nullable=True)
+    processing_started_at = Column(DateTime(timezone=True), nullable=True)  # Quando um worker reivindicou o upload
     
     # Metadados do CSV
     rows_total = Column(Integer, nullable=True)
+    bad_lines_total = Column(Integer, nullable=True)  # Linhas descartadas por estarem mal formadas
     cols_total = Column(Integer, nullable=True)
-    columns_json = Column(Text, nullable=True)  # JSON string
-    dtypes_json = Column(Text, nullable=True)   # JSON string
-    sample_rows_json = Column(Text, nullable=True)  # JSON string
+    # JSONs carregados apenas sob demanda (undefer_group(UPLOAD_BLOBS)), fora das listagens
+    columns_json = deferred(Column(Text, nullable=True), group=UPLOAD_BLOBS)  # JSON string
+    dtypes_json = deferred(Column(Text, nullable=True), group=UPLOAD_BLOBS)   # JSON string
+    sample_rows_json = deferred(Column(Text, nullable=True), group=UPLOAD_BLOBS)  # JSON string
     
     # Relacionamento com usuário
     user = relationship("User", back_populates="uploads")
+    
+    # Agregados calculados na ingestão
+    aggregate = relationship("UploadAggregate", uselist=False, back_populates="upload", cascade="all, delete-orphan")
+    
+    # Metadados normalizados das colunas
+    columns = relationship("UploadColumn", back_populates="upload", cascade="all, delete-orphan", order_by="UploadColumn.position")
+
+
+class UploadAggregate(Base):
+    """Estatísticas de um upload calculadas uma única vez, na ingestão"""
+    __tablename__ = "upload_aggregates"
+    
+    upload_id = Column(Integer, ForeignKey("uploads.id", ondelete="CASCADE"), primary_key=True)
+    military_stats_json = Column(Text, nullable=False)  # JSON string no formato servido pelo dashboard
+    partials_json = Column(Text, nullable=True)  # JSON string do agregado parcial (combinável)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    upload = relationship("Upload", back_populates="aggregate")
+
+
+
+class UploadColumn(Base):
+    """Metadados de uma coluna de um upload, gravados na ingestão"""
+    __tablename__ = "upload_columns"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    upload_id = Column(Integer, ForeignKey("uploads.id", ondelete="CASCADE"), nullable=False, index=True)
+    position = Column(Integer, nullable=False)
+    name = Column(String(255), nullable=False)
+    dtype = Column(String(20), nullable=False, index=True)
+    null_count = Column(Integer, nullable=True)  # Nulo para uploads anteriores a esta tabela
+    
+    upload = relationship("Upload", back_populates="columns")
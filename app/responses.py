@@ -0,0 +1,95 @@
+"""
+Classes de resposta da API
+"""
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Mapping, Optional
+import orjson
+from fastapi.responses import FileResponse, JSONResponse, Response
+
+
+class ORJSONResponse(JSONResponse):
+    """Resposta JSON serializada com orjson (datetime, enum e UUID nativos)"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def strong_etag(content_hash: str, variant: Optional[str] = None) -> str:
+    """ETag forte a partir do hash do conteúdo (e da variante, ex.: gzip)"""
+    return f'"{content_hash}-{variant}"' if variant else f'"{content_hash}"'
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Verificar se o cliente aceita gzip (respeitando q=0)"""
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        if coding.strip().lower() in ("gzip", "x-gzip"):
+            quality = params.strip().removeprefix("q=")
+            try:
+                return not params or float(quality) > 0
+            except ValueError:
+                return False
+    return False
+
+
+def is_not_modified(request_headers: Mapping[str, str], etag: Optional[str], mtime: float) -> bool:
+    """
+    Avaliar If-None-Match / If-Modified-Since (RFC 9110)
+
+    If-None-Match tem precedência; If-Modified-Since só é considerado
+    quando o cliente não envia If-None-Match.
+    """
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        if etag is None:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        # Comparação fraca: W/"x" corresponde a "x"
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return etag.removeprefix("W/") in candidates
+
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(mtime) <= since
+    return False
+
+
+def conditional_file_response(
+    request_headers: Mapping[str, str],
+    path: Path,
+    filename: str,
+    media_type: str,
+    etag: Optional[str] = None,
+    headers: Optional[Mapping[str, str]] = None
+) -> Response:
+    """
+    Download de arquivo com validadores e GET condicional
+
+    Responde 304 quando a cópia do cliente ainda é válida; caso contrário
+    devolve um ``FileResponse``, que atende ``Range`` (uma ou várias
+    faixas) e ``If-Range`` comparando com o ETag informado.
+    """
+    stat_result = os.stat(path)
+    headers = dict(headers or {})
+    if etag is not None:
+        headers["etag"] = etag
+
+    if is_not_modified(request_headers, etag, stat_result.st_mtime):
+        not_modified = {key: value for key, value in headers.items() if key.lower() in ("etag", "vary", "cache-control")}
+        not_modified["last-modified"] = formatdate(stat_result.st_mtime, usegmt=True)
+        return Response(status_code=304, headers=not_modified)
+
+    return FileResponse(
+        path=path,
+        filename=filename,
+        media_type=media_type,
+        headers=headers,
+        stat_result=stat_result
+    )
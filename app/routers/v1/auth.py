@@ -1,12 +1,16 @@
 # app/routers/auth.py
 
-from app.dependencies.auth import get_auth_service
+from app.dependencies.auth import get_async_auth_service, get_auth_service
 from fastapi import APIRouter, Request, Form, Depends, HTTPException, Body
 from fastapi.responses import RedirectResponse, HTMLResponse, JSONResponse
 from typing import Annotated
 import logging
+import math
 from sqlalchemy.orm import Session
 from app.services.auth_service import AuthService
+from app.services.login_throttle import LoginThrottled, login_throttle
+from app.services.password_pool import PasswordPoolFull, password_pool
+from starlette.concurrency import run_in_threadpool
 
 
 logger = logging.getLogger(__name__)
@@ -15,9 +19,10 @@ router = APIRouter()
 
 @router.post("/login")
 async def login(
+    request: Request,
     email: str = Body(..., example="usuario@email.com"),
     password: str = Body(..., example="123456"),
-    auth_service: AuthService = Depends(get_auth_service)
+    auth_service: AuthService = Depends(get_async_auth_service)
 ):
     """Processar login recebendo JSON"""
     try:
@@ -26,17 +31,37 @@ async def login(
         if not email or not password:
             raise HTTPException(status_code=400, detail="Email e senha são obrigatórios")
         
-        user = auth_service.authenticate_user(email, password)
+        # Limite por IP e por email antes de qualquer verificação de senha
+        client_ip = request.client.host if request.client else "desconhecido"
+        login_throttle.check(client_ip, email)
+        
+        user = await auth_service.authenticate_user_async(email, password)
         
         if not user:
             return JSONResponse({"detail": "Usuário ou senha inválidos"}, status_code=401)
         
+        login_throttle.succeeded(client_ip, email)
+        
         token = auth_service.create_access_token({"user_id": user.id, "user_name": user.name, "user_role": user.role})
         return JSONResponse(
             {"access_token": token, "token_type": "bearer"},
             status_code=200
         )
 
+    except LoginThrottled as e:
+        logger.warning(f"Login recusado por excesso de tentativas ({e.scope})")
+        return JSONResponse(
+            {"detail": "Muitas tentativas de login. Tente novamente mais tarde."},
+            status_code=429,
+            headers={"Retry-After": str(max(1, math.ceil(min(e.retry_after, 3600))))}
+        )
+    except PasswordPoolFull:
+        logger.warning("Login recusado: pool de senhas cheio")
+        return JSONResponse(
+            {"detail": "Muitas solicitações de login. Tente novamente em instantes."},
+            status_code=503,
+            headers={"Retry-After": "1"}
+        )
     except Exception as e:
         logger.error(f"Erro no login: {e}")
         raise HTTPException(status_code=500, detail="Erro interno no servidor!")
@@ -63,12 +88,23 @@ async def register(
         if len(password) < 6:
             raise HTTPException(status_code=400, detail="A senha deve ter no mínimo 6 caracteres")
 
-        # Criação do usuário
-        user = auth_service.create_user(name, email, password)
+        # Email e regra do operador validados antes do hash: cadastros recusados não ocupam o pool
+        await run_in_threadpool(auth_service.validate_new_user, email)
+        
+        # Criação do usuário (hash no pool de senhas, gravação fora do event loop)
+        password_hash = await password_pool.hash(password)
+        user = await run_in_threadpool(auth_service.create_user, name, email, password, password_hash=password_hash)
         return JSONResponse({"msg": "Usuário criado com sucesso"}, status_code=201)
 
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except PasswordPoolFull:
+        logger.warning("Registro recusado: pool de senhas cheio")
+        return JSONResponse(
+            {"detail": "Muitas solicitações. Tente novamente em instantes."},
+            status_code=503,
+            headers={"Retry-After": "1"}
+        )
     except Exception as e:
         logger.error(f"Erro no registro: {e}")
         raise HTTPException(status_code=500, detail="Erro interno no servidor!")
\ No newline at end of file
@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from fastapi.responses import JSONResponse
 from app.dependencies.auth import require_auth, get_user_object
-from app.dependencies.dashboard import get_dashboard_data
+from app.dependencies.dashboard import get_dashboard_data, get_stats_service
+from app.services.stats_service import StatsService
+from datetime import datetime
 
 router = APIRouter()
 
@@ -17,6 +19,27 @@ async def get_dashboard_api(
         "chart_data": dashboard_data.get("chart_data")
     })
 
+# Estatísticas combinadas de vários uploads (síncrona: o FastAPI a executa no threadpool)
+@router.get("/combined")
+def get_combined_stats_api(
+    current_user: dict = Depends(require_auth),
+    stats_service: StatsService = Depends(get_stats_service),
+    user_id: int = Query(None, description="ID do usuário"),
+    from_date: str = Query(None, description="Data inicial (YYYY-MM-DD)"),
+    to_date: str = Query(None, description="Data final (YYYY-MM-DD)")
+):
+    # Se o usuário não for operador ou admin, só pode ver seus próprios uploads
+    if current_user["user_role"] not in ("admin", "operator"):
+        user_id = current_user["user_id"]
+
+    try:
+        from_dt = datetime.strptime(from_date, "%Y-%m-%d") if from_date else None
+        to_dt = datetime.strptime(to_date, "%Y-%m-%d").replace(hour=23, minute=59, second=59) if to_date else None
+    except ValueError:
+        return JSONResponse(status_code=400, content={"detail": "Datas devem estar no formato YYYY-MM-DD"})
+
+    return JSONResponse(stats_service.get_combined_military_stats(user_id, from_dt, to_dt))
+
 # Account
 @router.get("/account")
 async def get_account_api(user_object = Depends(get_user_object)):
@@ -2,20 +2,29 @@
 Router do banco de dados
 """
 from app.dependencies.auth import require_auth
-from app.dependencies.upload import get_download_file, get_upload_details, get_upload_service, validate_csv_upload
+from app.dependencies.upload import get_async_upload_service, get_download_file, get_upload_details, get_upload_service, validate_csv_upload
 from app.services.upload_service import UploadService
-from fastapi import APIRouter, Request, Depends, HTTPException, status, Query, UploadFile, File, Form
-from fastapi.responses import HTMLResponse, FileResponse, RedirectResponse, JSONResponse
+from fastapi import APIRouter, Body, Request, Depends, HTTPException, status, Query, UploadFile, File, Form
+from fastapi.responses import HTMLResponse, FileResponse, RedirectResponse, JSONResponse, Response, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, desc
 from app.db import get_db
-from app.models import Upload, User
+from app.models import Upload, UploadStatus, User
 from app.services.file_service import FileService
 from app.services.csv_service import CSVService
+from app.services.ingest_queue import IngestQueueFull, ingest_queue
+from app.services.query_service import QueryService, parse_predicates
+from app.services.export_service import EXPORT_FORMATS, ExportService, content_disposition, create_export_token, export_filename, read_export_token
+from app.config import settings
+from app.responses import ORJSONResponse, accepts_gzip, conditional_file_response, strong_etag
+from app.serializers import serialize_upload
+from starlette.concurrency import run_in_threadpool
 from datetime import datetime
+from typing import Any, Dict, List, Optional
 import json
 import logging
+import orjson
 
 logger = logging.getLogger(__name__)
 
@@ -26,13 +35,15 @@ templates = Jinja2Templates(directory="app/templates")
 @router.get("/database")
 async def database_list(
     current_user: dict = Depends(require_auth),
-    upload_service: UploadService = Depends(get_upload_service),
+    upload_service: UploadService = Depends(get_async_upload_service),
     q: str = Query(None, description="Buscar por nome do arquivo"),
     from_date: str = Query(None, description="Data inicial (YYYY-MM-DD)"),
     to_date: str = Query(None, description="Data final (YYYY-MM-DD)"),
     user_id: str = Query(None, description="ID do usuário"),
     page: int = Query(1, ge=1, description="Página"),
-    page_size: int = Query(10, ge=1, le=100, description="Itens por página")
+    page_size: int = Query(10, ge=1, le=100, description="Itens por página"),
+    cursor: str = Query(None, description="Cursor da próxima página (substitui page)"),
+    count: str = Query("exact", pattern="^(exact|estimate|none)$", description="Contagem do total: exact, estimate ou none")
 ):
     """
     Retorna a lista de uploads em formato JSON.
@@ -42,32 +53,41 @@ async def database_list(
         if current_user["user_role"] not in ("admin", "operator"):
             user_id = current_user["user_id"]
 
-        data = upload_service.get_filtered_uploads(
+        data = await upload_service.get_filtered_uploads_async(
             q=q,
             from_date=from_date,
             to_date=to_date,
             user_id=user_id,
             page=page,
-            page_size=page_size
+            page_size=page_size,
+            cursor=cursor,
+            count=count
         )
 
-        return {
-            "uploads": data["uploads"],  # certifique-se que isso seja serializável
+        return ORJSONResponse({
+            "uploads": [serialize_upload(upload, include_user=True) for upload in data["uploads"]],
             "pagination": {
                 "page": data["page"],
                 "page_size": data["page_size"],
                 "total": data["total"],
+                "total_is_estimate": data["total_is_estimate"],
                 "total_pages": data["total_pages"],
-                "has_prev": data["page"] > 1,
-                "has_next": data["page"] < data["total_pages"]
+                "has_prev": data["page"] > 1 if not cursor else True,
+                "has_next": data["has_next"],
+                "next_cursor": data["next_cursor"]
             },
             "user": {
                 "id": current_user["user_id"],
                 "name": current_user["user_name"],
                 "role": current_user["user_role"]
             }
-        }
+        })
 
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"detail": str(e)}
+        )
     except Exception as e:
         logger.error(f"Erro ao listar uploads: {e}")
         return JSONResponse(
@@ -85,53 +105,222 @@ async def api_database_detail(
     """Retorna os detalhes do upload como JSON."""
     upload = data["upload"]
 
-    return {
-        "upload": {
-            "id": upload.id,
-            "original_name": upload.original_name,
-            "uploaded_at": upload.uploaded_at.isoformat(),
-            "size_bytes": upload.size_bytes,
-            "rows_total": upload.rows_total,
-            "cols_total": upload.cols_total,
-            "user": {
-                "id": upload.user.id,
-                "name": upload.user.name,
-                "role": upload.user.role
-            }
-        },
-        "columns": data["columns"],
-        "dtypes": data["dtypes"],
-        "sample_rows": data["sample_rows"]
-    }
+    upload_json = orjson.dumps(serialize_upload(upload, include_user=True)).decode("utf-8")
+
+    # Os JSONs de colunas, tipos e amostra já estão serializados no banco:
+    # são inseridos no corpo da resposta sem json.loads/json.dumps
+    body = (
+        f'{{"upload":{upload_json},'
+        f'"columns":{data["columns_json"]},'
+        f'"dtypes":{data["dtypes_json"]},'
+        f'"sample_rows":{data["sample_rows_json"]}}}'
+    )
+    return Response(content=body.encode("utf-8"), media_type="application/json")
+
+
+def _get_ready_upload(upload_service: UploadService, upload_id: int, current_user: dict) -> Upload:
+    """Upload processado visível ao usuário; 404 se não puder vê-lo, 409 se não estiver pronto."""
+    upload = upload_service.get_upload_by_id(upload_id)
+
+    if not upload or (current_user["user_role"] not in ("admin", "operator") and upload.user_id != current_user["user_id"]):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload não encontrado"
+        )
+
+    if upload.status != UploadStatus.READY:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Upload ainda não processado"
+        )
+
+    return upload
+
+
+@router.get("/database/{upload_id}/rows")
+async def api_database_rows(
+    upload_id: int,
+    offset: int = Query(0, ge=0, description="Primeira linha de dados (a partir de 0)"),
+    limit: int = Query(100, ge=1, le=1000, description="Quantidade de linhas"),
+    current_user: dict = Depends(require_auth),
+    upload_service: UploadService = Depends(get_upload_service)
+):
+    """Retorna uma janela de linhas do arquivo completo do upload."""
+    upload = _get_ready_upload(upload_service, upload_id, current_user)
+
+    try:
+        return await run_in_threadpool(upload_service.get_upload_rows, upload, offset, limit)
+    except (ValueError, OSError) as e:
+        logger.error(f"Erro ao ler linhas do upload {upload_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erro ao ler linhas do arquivo"
+        )
+
+
+@router.post("/database/{upload_id}/query")
+async def api_database_query(
+    upload_id: int,
+    columns: List[str] = Body(None, description="Colunas retornadas (padrão: todas)"),
+    filters: List[Dict[str, Any]] = Body([], description="Predicados: {column, op, value}; todos devem ser satisfeitos"),
+    limit: int = Body(1000, ge=1, le=settings.query_max_rows, description="Máximo de linhas"),
+    current_user: dict = Depends(require_auth),
+    upload_service: UploadService = Depends(get_upload_service)
+):
+    """Retorna, em NDJSON, as linhas do upload que satisfazem os filtros."""
+    upload = _get_ready_upload(upload_service, upload_id, current_user)
+
+    try:
+        predicates = parse_predicates(filters)
+        rows = await run_in_threadpool(QueryService().query_upload, upload, columns, predicates, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    # Uma linha JSON por registro, produzida à medida que o arquivo é lido
+    return StreamingResponse(
+        (orjson.dumps(row) + b"\n" for row in rows),
+        media_type="application/x-ndjson"
+    )
+
+
+async def _original_file_response(request: Request, upload: Upload, upload_service: UploadService) -> Response:
+    """Arquivo original com ETag forte, GET condicional, Range e variante gzip."""
+    content_hash = await run_in_threadpool(upload_service.ensure_content_hash, upload)
+    path = upload_service.file_service.get_file_path(upload.stored_path)
+    etag = strong_etag(content_hash)
+    headers = {"vary": "Accept-Encoding"} if settings.download_gzip else {}
+
+    if settings.download_gzip and accepts_gzip(request.headers.get("accept-encoding")):
+        # As faixas (Range) passam a se referir aos bytes comprimidos, com ETag próprio
+        path = await run_in_threadpool(upload_service.file_service.get_gzip_variant, upload.stored_path)
+        etag = strong_etag(content_hash, "gzip")
+        headers["content-encoding"] = "gzip"
+
+    return conditional_file_response(request.headers, path, upload.original_name, 'text/csv', etag, headers)
 
 
 @router.get("/database/{upload_id}/download")
 async def download_upload(
     upload_id: int,
+    request: Request,
     current_user: dict = Depends(require_auth),
-    file_data: dict = Depends(get_download_file) # A dependência faz todo o trabalho!
+    file_data: dict = Depends(get_download_file), # A dependência faz todo o trabalho!
+    upload_service: UploadService = Depends(get_upload_service)
 ):
-    """Download do arquivo original."""
-    return FileResponse(
-        path=file_data["path"],
-        filename=file_data["filename"],
-        media_type='text/csv'
+    """Download do arquivo original (retomável via Range)."""
+    return await _original_file_response(request, file_data["upload"], upload_service)
+
+
+async def _stream_export(upload: Upload, fmt: str, columns: Optional[List[str]]) -> StreamingResponse:
+    """Resposta em streaming com o conteúdo exportado do upload."""
+    try:
+        chunks = await run_in_threadpool(ExportService().export_upload, upload, fmt, columns)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    media_type, _ = EXPORT_FORMATS[fmt]
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": content_disposition(export_filename(upload.original_name, fmt))}
     )
 
+
+@router.get("/database/{upload_id}/export")
+async def export_upload(
+    upload_id: int,
+    format: str = Query("csv", pattern="^(csv|ndjson|parquet)$", description="Formato: csv, ndjson ou parquet"),
+    columns: List[str] = Query(None, description="Colunas exportadas (padrão: todas)"),
+    current_user: dict = Depends(require_auth),
+    upload_service: UploadService = Depends(get_upload_service)
+):
+    """Exporta o conteúdo do upload, em streaming, no formato e colunas pedidos."""
+    upload = _get_ready_upload(upload_service, upload_id, current_user)
+    return await _stream_export(upload, format, columns)
+
+
+@router.post("/database/{upload_id}/export-link")
+async def create_export_link(
+    upload_id: int,
+    format: str = Body("csv", pattern="^(original|csv|ndjson|parquet)$", description="original ou formato de exportação"),
+    columns: List[str] = Body(None, description="Colunas exportadas (padrão: todas)"),
+    current_user: dict = Depends(require_auth),
+    upload_service: UploadService = Depends(get_upload_service)
+):
+    """Gera um link temporário e assinado para baixar o upload sem o cabeçalho Authorization."""
+    upload = _get_ready_upload(upload_service, upload_id, current_user)
+    token = create_export_token(upload.id, current_user["user_id"], format, columns)
+    return {
+        "url": f"/api/v1/manage-file/exports/{token}",
+        "expires_in": settings.export_link_max_age
+    }
+
+
+@router.get("/exports/{token}")
+async def download_export_link(
+    token: str,
+    request: Request,
+    upload_service: UploadService = Depends(get_upload_service)
+):
+    """Download por link assinado: o navegador grava a resposta direto em disco."""
+    export = read_export_token(token)
+    if export is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Link de exportação inválido ou expirado"
+        )
+
+    upload = upload_service.get_upload_by_id(export["upload_id"])
+    if not upload or upload.status != UploadStatus.READY:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload não encontrado"
+        )
+
+    if export["format"] == "original":
+        if not upload_service.file_service.file_exists(upload.stored_path):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Arquivo não encontrado no servidor"
+            )
+        return await _original_file_response(request, upload, upload_service)
+
+    return await _stream_export(upload, export["format"], export["columns"])
+
 @router.post("/upload-csv", response_class=JSONResponse)
 async def upload_csv(
     file: UploadFile = Depends(validate_csv_upload),
     current_user: dict = Depends(require_auth),
     db: Session = Depends(get_db)
 ):
-    """Upload de arquivo CSV via JWT + Fetch (JSON)."""
+    """Upload de arquivo CSV via JWT + Fetch (JSON). O processamento ocorre em segundo plano."""
+    if ingest_queue.is_full():
+        return JSONResponse(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            content={"message": "Muitos arquivos em processamento. Tente novamente em instantes."}
+        )
+
     try:
         upload_service = UploadService(db)
-        upload = upload_service.process_and_save_upload(current_user["user_id"], file)
+        upload = await run_in_threadpool(upload_service.create_pending_upload, current_user["user_id"], file)
+
+        try:
+            ingest_queue.submit(upload.id)
+        except IngestQueueFull:
+            await run_in_threadpool(upload_service.discard_upload, upload)
+            return JSONResponse(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                content={"message": "Muitos arquivos em processamento. Tente novamente em instantes."}
+            )
 
         return JSONResponse(
-            status_code=status.HTTP_200_OK,
-            content={"message": "Arquivo enviado com sucesso!", "upload_id": upload.id}
+            status_code=status.HTTP_202_ACCEPTED,
+            content={
+                "message": "Arquivo recebido. Processamento em andamento.",
+                "upload_id": upload.id,
+                "job_id": upload.id,
+                "status": UploadStatus.PENDING.value
+            }
         )
 
     except HTTPException as e:
@@ -144,4 +333,29 @@ async def upload_csv(
         return JSONResponse(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             content={"message": "Erro interno do servidor"}
-        )
\ No newline at end of file
+        )
+
+
+@router.get("/jobs/{job_id}")
+async def upload_job_status(
+    job_id: int,
+    current_user: dict = Depends(require_auth),
+    upload_service: UploadService = Depends(get_async_upload_service)
+):
+    """Status do processamento de um upload enviado."""
+    upload = await upload_service.get_upload_by_id_async(job_id)
+
+    if not upload or (current_user["user_role"] not in ("admin", "operator") and upload.user_id != current_user["user_id"]):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Processamento não encontrado"
+        )
+
+    return {
+        "job_id": upload.id,
+        "upload_id": upload.id,
+        "status": upload.status.value,
+        "error": upload.error_message,
+        "rows_total": upload.rows_total,
+        "cols_total": upload.cols_total
+    }
@@ -1,7 +1,12 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, status
+from app.dependencies.auth import require_auth
+from app.models import UserRole
+from app.responses import ORJSONResponse
+from app.services.login_throttle import login_throttle
+from app.services.password_pool import password_pool
 from . import auth, account, manage_file, dashboard, user
 
-router = APIRouter(tags=["Versão 1"])
+router = APIRouter(tags=["Versão 1"], default_response_class=ORJSONResponse)
 
 # Inclui os roteadores de recursos
 router.include_router(auth.router, prefix="/authentication")
@@ -13,4 +18,14 @@ router.include_router(user.router, prefix="/user")
 @router.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "ok", "message": "Sistema funcionando"}
\ No newline at end of file
+    return {"status": "ok", "message": "Sistema funcionando"}
+
+@router.get("/metrics")
+async def metrics(current_user: dict = Depends(require_auth)):
+    """Métricas internas (apenas operador)"""
+    if current_user["user_role"] != UserRole.OPERATOR.value:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acesso negado")
+    return {
+        "password_pool": password_pool.metrics(),
+        "login_throttle": login_throttle.metrics()
+    }
@@ -1,15 +1,18 @@
 from app.services.auth_service import AuthService
 from fastapi import APIRouter, Depends
 from fastapi.responses import JSONResponse
+from app.responses import ORJSONResponse
+from app.serializers import serialize_user
 from app.models import User, Upload
 from sqlalchemy.orm import Session
 from app.db import get_db
 from app.dependencies.auth import get_user_object, require_auth, get_auth_service
+from app.services.user_cache import UserSnapshot
 
 router = APIRouter()
 
 @router.get("/user-profile")
-def get_user_profile(current_user: User = Depends(get_user_object),  db: Session = Depends(get_db)):
+def get_user_profile(current_user: UserSnapshot = Depends(get_user_object),  db: Session = Depends(get_db)):
     uploads = db.query(Upload).filter(Upload.user_id == current_user.id).all()
 
     total_uploads = len(uploads)
@@ -38,17 +41,8 @@ async def list_users(
     Retorna lista de usuários como dicionários (sem BaseModel).
     """
     try:
-        users = auth_service.get_all_users()  # Deve retornar lista de objetos ORM
-        result = [
-            {
-                "id": user.id,
-                "name": user.name,
-                "email": user.email,
-                "role": user.role
-            }
-            for user in users
-        ]
-        return result
+        users = auth_service.get_all_users()
+        return ORJSONResponse([serialize_user(user) for user in users])
     except Exception as e:
         return JSONResponse(
             status_code=500,
@@ -4,13 +4,24 @@ Utilitários de segurança
 from jose import jwt, JWTError
 from fastapi import HTTPException, status
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from passlib.context import CryptContext
 from itsdangerous import URLSafeTimedSerializer
 from app.config import settings
 
-# Contexto para hash de senhas
-pwd_context = CryptContext(schemes=["bcrypt_sha256", "bcrypt"], deprecated="auto")
+# Contexto para hash de senhas. O custo (log2 das iterações do bcrypt) vem
+# de PASSWORD_HASH_ROUNDS (calibrado com scripts/calibrate_password_hash.py);
+# hashes com outro custo são marcados para atualização no próximo login.
+pwd_context = CryptContext(
+    schemes=["bcrypt_sha256", "bcrypt"],
+    deprecated="auto",
+    bcrypt_sha256__default_rounds=settings.password_hash_rounds,
+    bcrypt_sha256__min_rounds=settings.password_hash_rounds,
+    bcrypt_sha256__max_rounds=settings.password_hash_rounds,
+    bcrypt__default_rounds=settings.password_hash_rounds,
+    bcrypt__min_rounds=settings.password_hash_rounds,
+    bcrypt__max_rounds=settings.password_hash_rounds
+)
 
 # Serializer para tokens
 serializer = URLSafeTimedSerializer(settings.secret_key)
@@ -25,6 +36,21 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verificar senha"""
     return pwd_context.verify(plain_password, hashed_password)
 
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verificar senha e, se o hash estiver desatualizado, gerar um novo
+
+    Retorna (válida, novo_hash); novo_hash é None quando o hash armazenado
+    já usa o esquema e o custo atuais.
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Verificar se o hash usa esquema ou custo diferente do configurado"""
+    return pwd_context.needs_update(hashed_password)
+
 def create_access_token(self, data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
@@ -0,0 +1,41 @@
+"""
+Serialização leve de modelos para as respostas da API
+"""
+from typing import Any, Dict
+from app.models import Upload, User
+
+
+def serialize_user(user: User) -> Dict[str, Any]:
+    """Converter um usuário em dicionário"""
+    return {
+        "id": user.id,
+        "name": user.name,
+        "email": user.email,
+        "role": user.role.value
+    }
+
+
+def serialize_upload(upload: Upload, include_user: bool = False) -> Dict[str, Any]:
+    """
+    Converter um upload em dicionário
+
+    Apenas colunas leves; ``include_user`` acrescenta o autor, que deve
+    ter sido carregado junto (ex.: ``joinedload(Upload.user)``).
+    """
+    data = {
+        "id": upload.id,
+        "original_name": upload.original_name,
+        "uploaded_at": upload.uploaded_at.isoformat() if upload.uploaded_at else None,
+        "size_bytes": upload.size_bytes,
+        "status": upload.status.value if upload.status else None,
+        "rows_total": upload.rows_total,
+        "bad_lines_total": upload.bad_lines_total,
+        "cols_total": upload.cols_total
+    }
+    if include_user:
+        data["user"] = {
+            "id": upload.user.id,
+            "name": upload.user.name,
+            "role": upload.user.role.value
+        }
+    return data
@@ -3,9 +3,12 @@ Serviço de autenticação
 """
 from datetime import timedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, select
 from app.models import User, UserRole
-from app.security import hash_password, verify_password, create_access_token, verify_token
+from app.security import create_access_token, verify_token
+from app.services.password_pool import password_pool
+from app.services.token_cache import decode_access_token
+from app.services.user_cache import user_cache
 from app.config import settings
 import logging
 
@@ -25,18 +28,16 @@ class AuthService:
         return verify_token(token)
     
     def decode_access_token(self, token: str) -> dict:
-        """Decodifica um token JWT e retorna os dados do usuário"""
-        try:
-            payload = verify_token(token)
-            # payload deve conter pelo menos user_id
-            if "user_id" not in payload:
-                raise ValueError("Token inválido")
-            return payload
-        except ValueError as e:
-            raise ValueError(f"Falha ao decodificar token: {e}")
-    
-    def create_user(self, name: str, email: str, password: str, role: UserRole = UserRole.USER) -> User:
-        """Criar novo usuário"""
+        """Decodifica um token JWT e retorna os dados do usuário (com cache de tokens verificados)"""
+        return decode_access_token(token)
+    
+    def validate_new_user(self, email: str, role: UserRole = UserRole.USER) -> UserRole:
+        """
+        Validar um cadastro antes do hash da senha
+
+        Levanta ``ValueError`` se o email já estiver em uso ou se já houver
+        operador; retorna o papel efetivo (o primeiro usuário vira operador).
+        """
         # Verificar se já existe usuário com este email
         existing_user = self.db.query(User).filter(User.email == email).first()
         if existing_user:
@@ -53,13 +54,28 @@ class AuthService:
             existing_operator = self.db.query(User).filter(User.role == UserRole.OPERATOR).first()
             if not existing_operator:
                 role = UserRole.OPERATOR
-                logger.info(f"Primeiro usuário {email} promovido a operador")
+        
+        return role
+    
+    def create_user(
+        self,
+        name: str,
+        email: str,
+        password: str,
+        role: UserRole = UserRole.USER,
+        password_hash: str | None = None
+    ) -> User:
+        """Criar novo usuário; ``password_hash`` evita recalcular um hash já gerado no pool"""
+        effective_role = self.validate_new_user(email, role)
+        if effective_role != role:
+            logger.info(f"Primeiro usuário {email} promovido a operador")
+        role = effective_role
         
         # Criar usuário
         user = User(
             name=name,
             email=email,
-            password_hash=hash_password(password),
+            password_hash=password_hash or password_pool.hash_sync(password),
             role=role
         )
         
@@ -71,18 +87,70 @@ class AuthService:
     
     def authenticate_user(self, email: str, password: str) -> User | None:
         """Autenticar usuário"""
-        user = self.db.query(User).filter(User.email == email).first()
+        user = self.db.execute(self._select_user_by_email(email)).scalars().first()
         if not user:
             return None
         
-        if not verify_password(password, user.password_hash):
+        valid, new_hash = password_pool.verify_and_update_sync(password, user.password_hash)
+        if not valid:
             return None
         
+        if new_hash:
+            # Custo do hash diferente de PASSWORD_HASH_ROUNDS: regravar com o atual.
+            # A senha já foi verificada; uma falha na gravação não impede o login
+            user_id = user.id
+            try:
+                user.password_hash = new_hash
+                self.db.commit()
+                logger.info(f"Hash de senha do usuário {user_id} atualizado para o custo atual")
+            except Exception as e:
+                logger.warning(f"Falha ao atualizar o hash de senha do usuário {user_id}: {e}")
+                self.db.rollback()
+        
+        return user
+    
+    async def authenticate_user_async(self, email: str, password: str) -> User | None:
+        """Versão de ``authenticate_user`` para ``AsyncSession``"""
+        user = (await self.db.execute(self._select_user_by_email(email))).scalars().first()
+        if not user:
+            return None
+        
+        # bcrypt consome CPU: a verificação roda no pool de senhas, fora do event loop
+        valid, new_hash = await password_pool.verify_and_update(password, user.password_hash)
+        if not valid:
+            return None
+        
+        if new_hash:
+            # Custo do hash diferente de PASSWORD_HASH_ROUNDS: regravar com o atual.
+            # A senha já foi verificada; uma falha na gravação não impede o login
+            user_id = user.id
+            try:
+                user.password_hash = new_hash
+                await self.db.commit()
+                logger.info(f"Hash de senha do usuário {user_id} atualizado para o custo atual")
+            except Exception as e:
+                logger.warning(f"Falha ao atualizar o hash de senha do usuário {user_id}: {e}")
+                await self.db.rollback()
+                # O rollback expira o objeto; recarregar antes de devolvê-lo fora do await
+                await self.db.refresh(user)
+        
         return user
     
     def get_user_by_id(self, user_id: int) -> User | None:
         """Obter usuário por ID"""
-        return self.db.query(User).filter(User.id == user_id).first()
+        return self.db.execute(self._select_user_by_id(user_id)).scalars().first()
+    
+    async def get_user_by_id_async(self, user_id: int) -> User | None:
+        """Versão de ``get_user_by_id`` para ``AsyncSession``"""
+        return (await self.db.execute(self._select_user_by_id(user_id))).scalars().first()
+    
+    @staticmethod
+    def _select_user_by_id(user_id: int):
+        return select(User).where(User.id == user_id)
+    
+    @staticmethod
+    def _select_user_by_email(email: str):
+        return select(User).where(User.email == email)
     
     def get_all_users(self):
         return self.db.query(User).all()
@@ -124,6 +192,7 @@ class AuthService:
         
         self.db.delete(user)
         self.db.commit()
+        user_cache.invalidate(user_id)
         return True
     
     def change_password(self, user_id: int, current_password: str, new_password: str) -> bool:
@@ -132,9 +201,10 @@ class AuthService:
         if not user:
             return False
         
-        if not verify_password(current_password, user.password_hash):
+        if not password_pool.verify_sync(current_password, user.password_hash):
             raise ValueError("Senha atual incorreta")
         
-        user.password_hash = hash_password(new_password)
+        user.password_hash = password_pool.hash_sync(new_password)
         self.db.commit()
+        user_cache.invalidate(user_id)
         return True
@@ -0,0 +1,223 @@
+"""
+Cópia colunar (Parquet) dos uploads
+
+A ingestão grava, ao lado do CSV original, um arquivo Parquet tipado e
+comprimido com as mesmas linhas. Estatísticas e consultas leem dele
+apenas as colunas necessárias, sem reinterpretar o texto do CSV.
+
+Requer ``pyarrow``; sem ele, nenhuma cópia é gravada e os leitores
+continuam usando o CSV.
+"""
+from pathlib import Path
+from typing import Iterator, List, Optional
+import pandas as pd
+from app.config import settings
+import logging
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - dependência opcional
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+PARQUET_SUFFIX = ".parquet"
+BATCH_SIZE = 50000  # Linhas por lote na leitura
+
+
+def columnar_available() -> bool:
+    """Verificar se as cópias colunares estão habilitadas e o pyarrow instalado"""
+    return pq is not None and settings.columnar_sidecar
+
+
+def sidecar_relative_path(stored_path: str) -> str:
+    """Caminho relativo da cópia colunar de um CSV armazenado"""
+    return str(Path(stored_path).with_suffix(PARQUET_SUFFIX))
+
+
+class ParquetSidecarWriter:
+    """
+    Consumidor de blocos do CSV que grava a cópia Parquet
+
+    O esquema é definido pelo primeiro bloco: colunas de inteiros viram
+    ``int64`` (com nulos), as demais numéricas ``float64``, booleanas
+    ``bool`` e o resto ``string``. Se um bloco posterior não couber no
+    esquema, apenas a coluna afetada é promovida (``int64`` -> ``float64``
+    -> ``string``; ``bool`` -> ``string``) e o que já foi gravado é
+    regravado com o novo tipo. Colunas promovidas a texto guardam a forma
+    textual dos valores já lidos (ex.: ``1990``, ``72.5``, ``True``).
+    """
+
+    def __init__(self, file_path: Path):
+        self.file_path = Path(file_path)
+        self.tmp_path = self.file_path.with_suffix(PARQUET_SUFFIX + ".tmp")
+        self.schema = None
+        self.writer = None
+        self.failed = False
+        self.rewrites = 0
+
+    def __call__(self, chunk: pd.DataFrame):
+        if self.failed:
+            return
+        try:
+            if self.writer is None:
+                self.schema = self._infer_schema(chunk)
+                self.writer = self._open_writer(self.tmp_path, self.schema)
+            schema = pa.schema([
+                field.with_type(self._required_type(chunk[column], field.type))
+                for field, column in zip(self.schema, chunk.columns)
+            ])
+            if not schema.equals(self.schema):
+                self._rewrite(schema)
+            self.writer.write_table(self._to_table(chunk))
+        except (pa.ArrowException, ValueError, TypeError) as e:
+            logger.warning(f"Cópia colunar de {self.file_path.name} abandonada: {e}")
+            self.abort()
+
+    def close(self) -> bool:
+        """Finalizar a gravação; retorna se a cópia foi gerada"""
+        if self.failed or self.writer is None:
+            self.abort()
+            return False
+        self.writer.close()
+        self.tmp_path.replace(self.file_path)
+        return True
+
+    def abort(self):
+        """Descartar a cópia parcial"""
+        self.failed = True
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        self.tmp_path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _open_writer(path: Path, schema):
+        return pq.ParquetWriter(path, schema, compression=settings.columnar_compression)
+
+    def _rewrite(self, schema):
+        """Promover colunas: regravar o que já foi escrito com o novo esquema"""
+        changed = [field.name for field, old in zip(schema, self.schema) if not field.type.equals(old.type)]
+        logger.info(f"Cópia colunar de {self.file_path.name}: colunas promovidas {changed}")
+        self.writer.close()
+        self.writer = None
+        self.rewrites += 1
+        old_path = self.tmp_path
+        self.tmp_path = self.file_path.with_suffix(f"{PARQUET_SUFFIX}.{self.rewrites}.tmp")
+        try:
+            self.writer = self._open_writer(self.tmp_path, schema)
+            for batch in pq.ParquetFile(old_path).iter_batches(batch_size=BATCH_SIZE):
+                arrays = [
+                    self._cast_array(batch.column(i), old_field.type, field.type)
+                    for i, (old_field, field) in enumerate(zip(self.schema, schema))
+                ]
+                self.writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+        finally:
+            old_path.unlink(missing_ok=True)
+        self.schema = schema
+
+    @staticmethod
+    def _cast_array(array, old_type, new_type):
+        if old_type.equals(new_type):
+            return array
+        if pa.types.is_string(new_type):
+            return ParquetSidecarWriter._text_array(array.to_pandas())
+        return array.cast(new_type)
+
+    @staticmethod
+    def _is_integral(values: pd.Series) -> bool:
+        """Valores numéricos (sem nulos) inteiros e dentro do int64"""
+        if pd.api.types.is_integer_dtype(values):
+            return True
+        return bool(((values % 1 == 0) & (values.abs() < 2 ** 63)).all())
+
+    @classmethod
+    def _infer_schema(cls, chunk: pd.DataFrame):
+        fields = []
+        for column in chunk.columns:
+            series = chunk[column]
+            values = series.dropna()
+            if pd.api.types.is_bool_dtype(series):
+                arrow_type = pa.bool_()
+            elif pd.api.types.is_numeric_dtype(series) and not values.empty:
+                arrow_type = pa.int64() if cls._is_integral(values) else pa.float64()
+            else:
+                # Colunas vazias no primeiro bloco também viram texto
+                arrow_type = pa.string()
+            fields.append(pa.field(str(column), arrow_type))
+        return pa.schema(fields)
+
+    @classmethod
+    def _required_type(cls, series: pd.Series, arrow_type):
+        """Tipo da coluna que comporta o bloco (o atual ou uma promoção)"""
+        if pa.types.is_string(arrow_type):
+            return arrow_type
+        values = series.dropna()
+        if values.empty:
+            return arrow_type
+        if pa.types.is_boolean(arrow_type):
+            is_bool = pd.api.types.is_bool_dtype(values) or values.map(lambda v: isinstance(v, bool)).all()
+            return arrow_type if is_bool else pa.string()
+        if pd.api.types.is_bool_dtype(values):
+            return pa.string()
+        numeric = pd.to_numeric(values, errors='coerce')
+        if numeric.isna().any():
+            return pa.string()
+        if pa.types.is_integer(arrow_type) and not cls._is_integral(numeric):
+            return pa.float64()
+        return arrow_type
+
+    @staticmethod
+    def _text_array(series: pd.Series):
+        """Valores como texto; inteiros lidos como float (por causa de nulos) sem o ``.0``"""
+        values = series.dropna()
+        if pd.api.types.is_float_dtype(series) and ParquetSidecarWriter._is_integral(values):
+            series = series.astype("Int64")
+        return pa.array(series.astype("string"), type=pa.string(), from_pandas=True)
+
+    def _to_table(self, chunk: pd.DataFrame):
+        arrays = []
+        for field, column in zip(self.schema, chunk.columns):
+            series = chunk[column]
+            if pa.types.is_string(field.type):
+                arrays.append(self._text_array(series))
+            elif pa.types.is_integer(field.type):
+                numeric = pd.to_numeric(series, errors='coerce')
+                arrays.append(pa.array(numeric.astype("Int64"), type=pa.int64(), from_pandas=True))
+            elif pa.types.is_floating(field.type):
+                numeric = pd.to_numeric(series, errors='coerce')
+                arrays.append(pa.array(numeric.astype('float64'), type=pa.float64(), from_pandas=True))
+            else:
+                arrays.append(pa.array(series.astype("boolean"), type=pa.bool_(), from_pandas=True))
+        return pa.Table.from_arrays(arrays, schema=self.schema)
+
+
+class ColumnarService:
+    """Leitura das cópias colunares dos uploads"""
+
+    def __init__(self):
+        self.uploads_dir = Path(settings.uploads_dir)
+
+    def get_path(self, columnar_path: Optional[str]) -> Optional[Path]:
+        """Caminho absoluto da cópia, se existir e puder ser lida"""
+        if not columnar_path or pq is None:
+            return None
+        path = self.uploads_dir / columnar_path
+        return path if path.exists() else None
+
+    def get_columns(self, path: Path) -> List[str]:
+        """Colunas da cópia colunar"""
+        return pq.ParquetFile(path).schema_arrow.names
+
+    def iter_frames(self, path: Path, columns: Optional[List[str]] = None, batch_size: int = BATCH_SIZE) -> Iterator[pd.DataFrame]:
+        """Ler a cópia em blocos, apenas com as colunas pedidas"""
+        parquet_file = pq.ParquetFile(path)
+        if columns is not None:
+            available = set(parquet_file.schema_arrow.names)
+            columns = [column for column in columns if column in available]
+            if not columns:
+                return
+        for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+            yield batch.to_pandas()
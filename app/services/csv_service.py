@@ -2,10 +2,13 @@
 Serviço de processamento de CSV
 """
 import pandas as pd
+import codecs
+import io
 import json
 import chardet
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional, Tuple
 from pathlib import Path
+from app.services.row_counter import RowCount, count_csv_rows
 import logging
 
 logger = logging.getLogger(__name__)
@@ -19,104 +22,175 @@ class CSVService:
         self.separators = [',', ';', '\t', '|']
         self.sample_size = 5000  # Linhas para amostra
         self.max_sample_rows = 100  # Máximo de linhas para preview
+        self.head_bytes = 64 * 1024  # Bytes iniciais usados na detecção de formato
     
     def detect_encoding(self, file_path: Path) -> str:
         """Detectar encoding do arquivo"""
         try:
             with open(file_path, 'rb') as f:
-                raw_data = f.read(10000)
-                result = chardet.detect(raw_data)
-                if result['confidence'] > 0.7:
-                    return result['encoding']
+                return self._detect_encoding_from_bytes(f.read(self.head_bytes))
+        except OSError as e:
+            logger.warning(f"Erro ao detectar encoding: {e}")
+            return 'utf-8'
+
+    def detect_separator(self, file_path: Path, encoding: str) -> str:
+        """Detectar separador do CSV"""
+        try:
+            with open(file_path, 'rb') as f:
+                return self._detect_separator_from_bytes(f.read(self.head_bytes), encoding)
+        except OSError as e:
+            logger.warning(f"Erro ao detectar separador: {e}")
+            return ','
+
+    def sniff_format(self, file_path: Path) -> Tuple[str, str]:
+        """Detectar encoding e separador lendo o início do arquivo uma única vez"""
+        with open(file_path, 'rb') as f:
+            head = f.read(self.head_bytes)
+        encoding = self._detect_encoding_from_bytes(head)
+        return encoding, self._detect_separator_from_bytes(head, encoding)
+
+    def _detect_encoding_from_bytes(self, raw_data: bytes) -> str:
+        """Detectar encoding a partir do início do arquivo já lido em memória"""
+        try:
+            result = chardet.detect(raw_data[:10000])
+            if result['encoding'] and result['confidence'] > 0.7:
+                return result['encoding']
         except Exception as e:
             logger.warning(f"Erro ao detectar encoding: {e}")
-        
+
         # Fallback
         for encoding in self.encodings:
             try:
-                with open(file_path, 'r', encoding=encoding) as f:
-                    f.read(1000)
+                codecs.getincrementaldecoder(encoding)().decode(raw_data[:1000], final=False)
                 return encoding
             except (UnicodeDecodeError, UnicodeError):
                 continue
-        
+
         return 'utf-8'
-    
-    def detect_separator(self, file_path: Path, encoding: str) -> str:
-        """Detectar separador do CSV"""
+
+    def _detect_separator_from_bytes(self, raw_data: bytes, encoding: str) -> str:
+        """Detectar separador usando apenas as primeiras linhas já lidas em memória"""
+        # Descartar a última linha, que pode ter sido cortada no meio
+        head = raw_data
+        last_newline = head.rfind(b'\n')
+        if last_newline != -1:
+            head = head[:last_newline + 1]
+        text = head.decode(encoding, errors='replace')
+
         for sep in self.separators:
             try:
-                df = pd.read_csv(file_path, sep=sep, encoding=encoding, nrows=5, on_bad_lines='skip')
+                df = pd.read_csv(io.StringIO(text), sep=sep, nrows=5, on_bad_lines='skip')
                 if len(df.columns) > 1:
                     return sep
             except Exception:
                 continue
-        
+
         return ','
 
-    def get_file_info(self, file_path: Path) -> Dict[str, Any]:
+    def get_file_info(
+        self,
+        file_path: Path,
+        chunk_consumers: Optional[List[Callable[[pd.DataFrame], None]]] = None,
+        offset_stride: Optional[int] = None
+    ) -> Dict[str, Any]:
         """
         Obter informações do arquivo CSV
 
+        O início do arquivo serve para detectar encoding e separador, e o
+        pandas percorre o restante em blocos de ``sample_size`` linhas. O
+        primeiro bloco fornece colunas, tipos e preview; os demais só são
+        lidos se houver ``chunk_consumers`` (ex.: agregações calculadas na
+        ingestão).
+
+        O total de linhas vem de uma segunda varredura, ``count_csv_rows``,
+        que percorre os bytes sem parsear (bem mais barata que a leitura
+        do pandas) e registra os offsets do índice esparso de linhas
+        (``offset_stride``). Sem consumidores, essa é a única leitura do
+        arquivo inteiro; com eles, o arquivo é lido duas vezes.
+
+        Se o arquivo tiver bytes inválidos para o encoding detectado depois
+        do trecho usado na detecção, a leitura para ali e o resultado é
+        parcial: ``complete`` fica falso, ``error`` descreve o problema e os
+        consumidores terão recebido apenas os blocos anteriores.
+
         Returns:
-            Dict com: rows_total, cols_total, columns, dtypes, sample_rows
+            Dict com: rows_total, bad_lines, cols_total, columns, dtypes,
+            sample_rows, encoding, separator, row_count, complete, error
         """
         try:
-            encoding = self.detect_encoding(file_path)
-            separator = self.detect_separator(file_path, encoding)
-            
-            # Leitura da amostra
-            df_sample = pd.read_csv(
-                file_path,
-                sep=separator,
-                encoding=encoding,
-                nrows=self.sample_size,
-                on_bad_lines='skip'
-            )
-            
-            rows_total = self._count_total_rows(file_path, separator, encoding)
-
-            cols_total = len(df_sample.columns)
-            columns = df_sample.columns.tolist()
-            dtypes = self._detect_dtypes(df_sample)
-            sample_rows = self._get_sample_rows(df_sample)
+            with open(file_path, 'rb') as f:
+                head = f.read(self.head_bytes)
+                encoding = self._detect_encoding_from_bytes(head)
+                separator = self._detect_separator_from_bytes(head, encoding)
+                f.seek(0)
+
+                df_sample = None
+                rows_read = 0
+                error = None
+                try:
+                    reader = pd.read_csv(
+                        f,
+                        sep=separator,
+                        encoding=encoding,
+                        chunksize=self.sample_size,
+                        on_bad_lines='skip'
+                    )
+                    for chunk in reader:
+                        if df_sample is None:
+                            df_sample = chunk
+                        rows_read += len(chunk)
+                        if not chunk_consumers:
+                            break
+                        for consumer in chunk_consumers:
+                            consumer(chunk)
+                except UnicodeDecodeError as e:
+                    error = f"Bytes inválidos para o encoding {encoding} após {rows_read} linha(s): {e}"
+                    logger.warning(f"Leitura parcial de {file_path}: {error}")
+
+            try:
+                row_count = count_csv_rows(file_path, separator, encoding, offset_stride=offset_stride)
+            except UnicodeDecodeError:
+                if error is None:
+                    raise
+                # Leitura parcial: o total fica com as linhas lidas até o erro
+                row_count = RowCount(rows=rows_read, bad_lines=0)
+
+            if df_sample is None:
+                if error is None:
+                    df_sample = pd.DataFrame()
+                else:
+                    raise ValueError(error)
 
             return {
-                'rows_total': rows_total,
-                'cols_total': cols_total,
-                'columns': columns,
-                'dtypes': dtypes,
-                'sample_rows': sample_rows
+                'rows_total': row_count.rows,
+                'bad_lines': row_count.bad_lines,
+                'cols_total': len(df_sample.columns),
+                'columns': df_sample.columns.tolist(),
+                'dtypes': self._detect_dtypes(df_sample),
+                'sample_rows': self._get_sample_rows(df_sample),
+                'encoding': encoding,
+                'separator': separator,
+                'row_count': row_count,
+                'complete': error is None,
+                'error': error
             }
 
         except Exception as e:
             logger.error(f"Erro ao processar CSV {file_path}: {e}")
             return {
                 'rows_total': None,
+                'bad_lines': None,
                 'cols_total': 0,
                 'columns': [],
                 'dtypes': {},
-                'sample_rows': []
+                'sample_rows': [],
+                'encoding': None,
+                'separator': None,
+                'row_count': None,
+                'complete': False,
+                'error': str(e)
             }
 
-    def _count_total_rows(self, file_path: Path, separator: str, encoding: str) -> int:
-        """Contar total de linhas do arquivo"""
-        try:
-            if file_path.stat().st_size < 10 * 1024 * 1024:  # < 10MB
-                df = pd.read_csv(file_path, sep=separator, encoding=encoding, on_bad_lines='skip')
-                return len(df)
-
-            total_rows = 0
-            chunk_size = 10000
-            for chunk in pd.read_csv(file_path, sep=separator, encoding=encoding, chunksize=chunk_size, on_bad_lines='skip'):
-                total_rows += len(chunk)
-
-            return total_rows
-
-        except Exception as e:
-            logger.warning(f"Erro ao contar linhas: {e}")
-            return 0
-
     def _detect_dtypes(self, df: pd.DataFrame) -> Dict[str, str]:
         """Detectar tipos de dados simplificados"""
         dtype_map = {}
@@ -147,20 +221,3 @@ class CSVService:
                     row_dict[col] = str(value)
             sample_rows.append(row_dict)
         return sample_rows
-
-    def load_csv_preview(self, file_path: Path, max_rows: int = 100) -> pd.DataFrame:
-        """Carregar preview do CSV com robustez contra erros de formatação"""
-        try:
-            encoding = self.detect_encoding(file_path)
-            separator = self.detect_separator(file_path, encoding)
-
-            return pd.read_csv(
-                file_path,
-                sep=separator,
-                encoding=encoding,
-                nrows=max_rows,
-                on_bad_lines='skip'  # <- LINHAS MAL FORMADAS SÃO IGNORADAS
-            )
-        except Exception as e:
-            logger.error(f"Erro ao carregar preview: {e}")
-            return pd.DataFrame()
\ No newline at end of file
@@ -0,0 +1,177 @@
+"""
+Exportação do conteúdo dos uploads
+
+Gera o conteúdo de um upload em CSV, NDJSON ou Parquet, apenas com as
+colunas pedidas, como um iterador de blocos de bytes. Cada bloco lido da
+origem é convertido e entregue antes do próximo ser lido, então a memória
+usada não depende do tamanho do arquivo.
+
+Os três formatos são gerados a partir do arquivo original e usam a mesma
+tipagem: o texto de cada célula, sem conversão. No NDJSON os valores são
+strings (ou ``null`` para células vazias) e no Parquet todas as colunas
+são ``string``. A cópia colunar não é usada: ela nem sempre existe e seus
+tipos não reproduzem o texto original, então a saída variaria conforme
+a cópia tivesse sido gravada ou não.
+"""
+from pathlib import Path
+from typing import Iterator, List, Optional
+from urllib.parse import quote
+import orjson
+import pandas as pd
+from itsdangerous import BadSignature, SignatureExpired
+from app.config import settings
+from app.models import Upload
+from app.security import serializer
+from app.services.csv_service import CSVService
+from app.services.file_service import FileService
+import logging
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - dependência opcional
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+# Formato -> (media type, extensão)
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", ".csv"),
+    "ndjson": ("application/x-ndjson", ".ndjson"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+}
+BATCH_SIZE = 50000  # Linhas lidas por bloco
+EXPORT_LINK_SALT = "upload-export"
+
+
+def export_filename(original_name: str, fmt: str) -> str:
+    """Nome do arquivo exportado a partir do nome original"""
+    return Path(original_name).stem + EXPORT_FORMATS[fmt][1]
+
+
+def content_disposition(filename: str) -> str:
+    """Cabeçalho Content-Disposition de anexo, aceitando nomes não ASCII"""
+    fallback = filename.encode("ascii", "replace").decode("ascii").replace("?", "_").replace('"', "_")
+    return f"attachment; filename=\"{fallback}\"; filename*=utf-8''{quote(filename)}"
+
+
+def create_export_token(upload_id: int, user_id: int, fmt: str, columns: Optional[List[str]]) -> str:
+    """Assinar os parâmetros de uma exportação para um link temporário"""
+    return serializer.dumps(
+        {"upload_id": upload_id, "user_id": user_id, "format": fmt, "columns": columns},
+        salt=EXPORT_LINK_SALT
+    )
+
+
+def read_export_token(token: str) -> Optional[dict]:
+    """Parâmetros de um link de exportação; None se inválido ou expirado"""
+    try:
+        return serializer.loads(token, salt=EXPORT_LINK_SALT, max_age=settings.export_link_max_age)
+    except (BadSignature, SignatureExpired):
+        return None
+
+
+class _ChunkSink:
+    """Destino de escrita em memória esvaziado a cada bloco entregue"""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.parts.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+class ExportService:
+    """Serviço de exportação do conteúdo dos uploads"""
+
+    def __init__(self):
+        self.file_service = FileService()
+        self.csv_service = CSVService()
+
+    def export_upload(self, upload: Upload, fmt: str, columns: Optional[List[str]] = None) -> Iterator[bytes]:
+        """
+        Conteúdo do upload no formato pedido, em blocos de bytes
+
+        Formato ou colunas inválidos levantam ``ValueError`` aqui; a
+        leitura do arquivo só acontece ao consumir o iterador.
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Formato inválido: {fmt}")
+        if fmt == "parquet" and pq is None:
+            raise ValueError("Exportação em Parquet indisponível (pyarrow não instalado)")
+
+        file_path = self.file_service.get_file_path(upload.stored_path)
+        encoding, separator = self.csv_service.sniff_format(file_path)
+        available = pd.read_csv(file_path, sep=separator, encoding=encoding, nrows=0).columns.tolist()
+        columns = self._validate_columns(available, columns)
+        frames = self._iter_csv_frames(file_path, encoding, separator, columns)
+
+        writer = {"csv": self._write_csv, "ndjson": self._write_ndjson, "parquet": self._write_parquet}[fmt]
+        return writer(frames, columns)
+
+    @staticmethod
+    def _validate_columns(available: List[str], columns: Optional[List[str]]) -> List[str]:
+        columns = columns or list(available)
+        missing = [c for c in columns if c not in available]
+        if missing:
+            raise ValueError(f"Colunas inexistentes: {', '.join(sorted(set(missing)))}")
+        return columns
+
+    @staticmethod
+    def _iter_csv_frames(file_path: Path, encoding: str, separator: str, columns: List[str]) -> Iterator[pd.DataFrame]:
+        for chunk in pd.read_csv(
+            file_path,
+            sep=separator,
+            encoding=encoding,
+            usecols=columns,
+            dtype=str,
+            chunksize=BATCH_SIZE,
+            on_bad_lines="skip"
+        ):
+            yield chunk[columns]
+
+    @staticmethod
+    def _write_csv(frames: Iterator[pd.DataFrame], columns: List[str]) -> Iterator[bytes]:
+        yield pd.DataFrame(columns=columns).to_csv(index=False).encode("utf-8")
+        for frame in frames:
+            yield frame.to_csv(index=False, header=False).encode("utf-8")
+
+    @staticmethod
+    def _write_ndjson(frames: Iterator[pd.DataFrame], columns: List[str]) -> Iterator[bytes]:
+        for frame in frames:
+            records = frame.astype(object).where(frame.notna(), None).to_dict(orient="records")
+            yield b"".join(orjson.dumps(record) + b"\n" for record in records)
+
+    @staticmethod
+    def _write_parquet(frames: Iterator[pd.DataFrame], columns: List[str]) -> Iterator[bytes]:
+        # Cada bloco vira um row group; os bytes gravados são entregues em seguida
+        sink = _ChunkSink()
+        schema = pa.schema([pa.field(str(column), pa.string()) for column in columns])
+        writer = pq.ParquetWriter(sink, schema, compression=settings.columnar_compression)
+        try:
+            for frame in frames:
+                writer.write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False))
+                yield sink.drain()
+        finally:
+            writer.close()
+        yield sink.drain()
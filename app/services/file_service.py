@@ -1,11 +1,15 @@
 """
 Serviço de arquivos
 """
+import gzip
+import hashlib
+import io
+import shutil
 import os
 import uuid
 from datetime import datetime
 from pathlib import Path
-from typing import Tuple
+from typing import BinaryIO, Tuple
 from app.config import settings
 from app.security import is_safe_filename
 import logging
@@ -13,12 +17,25 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+GZIP_SUFFIX = ".gz"
+
+
+def gzip_relative_path(relative_path: str) -> str:
+    """Caminho relativo da variante gzip de um arquivo armazenado"""
+    return relative_path + GZIP_SUFFIX
+
+
+class FileTooLargeError(ValueError):
+    """Arquivo excede o limite de upload configurado"""
+
+
 class FileService:
     """Serviço de manipulação de arquivos"""
     
     def __init__(self):
         self.uploads_dir = Path(settings.uploads_dir)
         self.max_size_bytes = settings.max_upload_mb * 1024 * 1024
+        self.chunk_size = 1024 * 1024  # Bytes lidos por vez ao salvar uploads
     
     def ensure_uploads_dir(self):
         """Garantir que o diretório de uploads existe"""
@@ -65,10 +82,25 @@ class FileService:
         Returns:
             Tuple[str, int]: (caminho_relativo, tamanho_em_bytes)
         """
-        # Verificar tamanho
-        if len(file_content) > self.max_size_bytes:
-            raise ValueError(f"Arquivo muito grande. Máximo: {settings.max_upload_mb}MB")
+        relative_path, size_bytes, _ = self.save_upload_stream(io.BytesIO(file_content), original_filename)
+        return relative_path, size_bytes
+    
+    def save_upload_stream(self, file_obj: BinaryIO, original_filename: str) -> Tuple[str, int, str]:
+        """
+        Salvar arquivo de upload lendo o stream em blocos de tamanho fixo
+        
+        O limite de tamanho é verificado à medida que os bytes chegam e o
+        SHA-256 é calculado no mesmo laço, de modo que a memória usada não
+        depende do tamanho do arquivo. Se o limite for excedido, o arquivo
+        parcial é removido.
         
+        Args:
+            file_obj: Stream binário com o conteúdo do arquivo
+            original_filename: Nome original do arquivo
+            
+        Returns:
+            Tuple[str, int, str]: (caminho_relativo, tamanho_em_bytes, sha256_hex)
+        """
         # Garantir diretório
         self.ensure_uploads_dir()
         
@@ -79,16 +111,61 @@ class FileService:
         # Garantir que o diretório pai existe
         full_path.parent.mkdir(parents=True, exist_ok=True)
         
-        # Salvar arquivo
-        with open(full_path, 'wb') as f:
-            f.write(file_content)
+        digest = hashlib.sha256()
+        size_bytes = 0
+        try:
+            with open(full_path, 'wb') as f:
+                while True:
+                    chunk = file_obj.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    
+                    size_bytes += len(chunk)
+                    if size_bytes > self.max_size_bytes:
+                        raise FileTooLargeError(f"Arquivo muito grande. Máximo: {settings.max_upload_mb}MB")
+                    
+                    digest.update(chunk)
+                    f.write(chunk)
+        except BaseException:
+            full_path.unlink(missing_ok=True)
+            raise
         
-        return relative_path, len(file_content)
+        return relative_path, size_bytes, digest.hexdigest()
     
     def get_file_path(self, relative_path: str) -> Path:
         """Obter caminho absoluto do arquivo"""
         return self.uploads_dir / relative_path
     
+    def hash_file(self, relative_path: str) -> str:
+        """SHA-256 do conteúdo de um arquivo armazenado"""
+        digest = hashlib.sha256()
+        with open(self.get_file_path(relative_path), 'rb') as f:
+            while chunk := f.read(self.chunk_size):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    def get_gzip_variant(self, relative_path: str) -> Path:
+        """
+        Caminho da variante gzip do arquivo, gerada na primeira solicitação
+
+        A compressão é gravada em um arquivo temporário e renomeada ao
+        final, então requisições simultâneas nunca leem uma variante parcial.
+        """
+        gzip_path = self.get_file_path(gzip_relative_path(relative_path))
+        if gzip_path.exists():
+            return gzip_path
+
+        tmp_path = gzip_path.with_name(f"{gzip_path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            with open(self.get_file_path(relative_path), 'rb') as source, open(tmp_path, 'wb') as raw:
+                # mtime fixo: a mesma entrada gera sempre os mesmos bytes
+                with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6, mtime=0) as target:
+                    shutil.copyfileobj(source, target, self.chunk_size)
+            tmp_path.replace(gzip_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        return gzip_path
+    
     def file_exists(self, relative_path: str) -> bool:
         """Verificar se arquivo existe"""
         return self.get_file_path(relative_path).exists()
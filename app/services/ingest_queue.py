@@ -0,0 +1,144 @@
+"""
+Fila de processamento de uploads em segundo plano
+"""
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.db import SessionLocal
+from app.services.stats_service import StatsService
+from app.services.upload_service import UploadService
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class IngestQueueFull(Exception):
+    """Não há vagas na fila de processamento"""
+
+
+class IngestQueue:
+    """
+    Pool limitado de threads que processa uploads fora do event loop
+
+    Cada upload ocupa uma vaga desde o enfileiramento até o fim do
+    processamento; há ``max_workers`` uploads em execução e até
+    ``max_pending`` aguardando. Sem vagas, ``submit`` levanta
+    ``IngestQueueFull``.
+
+    O preenchimento de agregados de uploads antigos roda em uma thread
+    própria, fora dessas vagas, para não recusar uploads novos.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int, session_factory: Callable[[], Session] = SessionLocal):
+        self.session_factory = session_factory
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+        self.capacity = max_workers + max_pending
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self.backfill_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="aggregate-backfill")
+        self._stopping = threading.Event()
+
+    def is_full(self) -> bool:
+        """Verificar se a fila está sem vagas"""
+        with self._lock:
+            return self._in_flight >= self.capacity
+
+    def submit(self, upload_id: int):
+        """Enfileirar o processamento de um upload"""
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                raise IngestQueueFull("Fila de processamento cheia")
+            self._in_flight += 1
+
+        future = self.executor.submit(self._run, upload_id)
+        future.add_done_callback(self._release)
+
+    def _release(self, _future):
+        with self._lock:
+            self._in_flight -= 1
+
+    def _run(self, upload_id: int):
+        db = self.session_factory()
+        try:
+            UploadService(db).process_upload(upload_id)
+        except Exception as e:
+            logger.error(f"Erro no processamento em segundo plano do upload {upload_id}: {e}")
+        finally:
+            db.close()
+
+    def requeue_unfinished(self) -> int:
+        """
+        Reenfileirar uploads que ficaram pendentes (ex.: após reinício)
+
+        Retorna quantos foram enfileirados. Se vários workers enfileirarem
+        o mesmo upload, ``UploadService.claim_upload`` garante que apenas
+        um o processe.
+        """
+        db = self.session_factory()
+        try:
+            upload_ids = UploadService(db).get_unfinished_upload_ids()
+        finally:
+            db.close()
+
+        submitted = 0
+        for upload_id in upload_ids:
+            try:
+                self.submit(upload_id)
+            except IngestQueueFull:
+                logger.warning(f"Fila cheia; upload {upload_id} permanece pendente")
+                break
+            submitted += 1
+
+        return submitted
+
+    def start_aggregate_backfill(self) -> Future:
+        """
+        Calcular em segundo plano os agregados de uploads prontos que não os têm
+
+        Uploads gravados antes de ``upload_aggregates`` (ou com agregado
+        ilegível) ficam fora das estatísticas combinadas até serem
+        agregados aqui. A thread percorre os uploads até não restar nenhum
+        sem agregado; cada upload é tentado uma vez por inicialização.
+        """
+        return self.backfill_executor.submit(self._backfill_aggregates)
+
+    def _backfill_aggregates(self) -> int:
+        attempted = set()
+        backfilled = 0
+        while not self._stopping.is_set():
+            db = self.session_factory()
+            try:
+                upload_ids = [i for i in StatsService(db).get_upload_ids_missing_aggregates() if i not in attempted]
+            finally:
+                db.close()
+            if not upload_ids:
+                break
+
+            for upload_id in upload_ids:
+                if self._stopping.is_set():
+                    break
+                attempted.add(upload_id)
+                db = self.session_factory()
+                try:
+                    if StatsService(db).backfill_military_aggregate(upload_id):
+                        backfilled += 1
+                except Exception as e:
+                    logger.error(f"Erro ao calcular agregado do upload {upload_id}: {e}")
+                finally:
+                    db.close()
+
+        if backfilled:
+            logger.info(f"Agregados de {backfilled} upload(s) calculados")
+        return backfilled
+
+    def shutdown(self, wait: bool = True):
+        """Encerrar o pool de threads"""
+        self._stopping.set()
+        self.executor.shutdown(wait=wait)
+        self.backfill_executor.shutdown(wait=wait)
+
+
+# Instância global da fila
+ingest_queue = IngestQueue(settings.ingest_workers, settings.ingest_queue_size)
@@ -0,0 +1,171 @@
+"""
+Limitação de tentativas de login
+
+Cada tentativa consome uma ficha de três baldes (token buckets): um por
+IP, um por par (email, IP) e um global por email, bem mais folgado. Sem
+fichas, o login é recusado antes de qualquer verificação de senha, então
+uma rajada de tentativas não consome CPU com bcrypt. Logins bem-sucedidos
+devolvem as fichas, de modo que usuários legítimos (inclusive vários
+atrás do mesmo IP) não esgotam os baldes.
+
+O balde por email é indexado também pelo IP: quem erra a senha de outra
+pessoa esgota apenas o próprio par, sem bloquear o login da vítima. O
+balde global limita ataques distribuídos contra um mesmo email.
+
+O IP é o ``request.client.host``. Atrás de um proxy reverso, ele é o IP
+do proxy (todos os clientes dividiriam o mesmo balde); o uvicorn precisa
+rodar com ``--proxy-headers`` e ``--forwarded-allow-ips`` (ou
+``FORWARDED_ALLOW_IPS``) apontando para o proxy, para usar o IP do
+``X-Forwarded-For``.
+
+Os baldes ficam na memória do worker, limitados por LRU.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+from app.config import settings
+
+
+class TokenBucketLimiter:
+    """Baldes de fichas por chave, com reposição contínua e limite de chaves (LRU)"""
+
+    def __init__(self, capacity: float, refill_per_second: float, max_keys: int):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # chave -> [fichas, atualizado_em]
+        self._lock = threading.Lock()
+
+    def _bucket(self, key: str, now: float) -> list:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [float(self.capacity), now]
+            self._buckets[key] = bucket
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            tokens, updated_at = bucket
+            bucket[0] = min(self.capacity, tokens + (now - updated_at) * self.refill_per_second)
+            bucket[1] = now
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def acquire(self, key: str) -> Optional[float]:
+        """
+        Consumir uma ficha da chave
+
+        Retorna None se havia ficha; caso contrário, os segundos até a
+        próxima ficha ficar disponível.
+        """
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._bucket(key, now)
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return None
+            if self.refill_per_second <= 0:
+                return float("inf")
+            return (1 - bucket[0]) / self.refill_per_second
+
+    def refund(self, key: str):
+        """Devolver uma ficha à chave"""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket[0] = min(self.capacity, bucket[0] + 1)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class LoginThrottled(Exception):
+    """Tentativa de login recusada pelo limitador"""
+
+    def __init__(self, scope: str, retry_after: float):
+        super().__init__(f"Muitas tentativas de login ({scope})")
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+class LoginThrottle:
+    """Limitador de login por IP, por (email, IP) e por email, com contadores de recusas"""
+
+    def __init__(
+        self,
+        ip_burst: int,
+        ip_per_minute: float,
+        email_burst: int,
+        email_per_minute: float,
+        email_global_burst: int,
+        email_global_per_minute: float,
+        max_keys: int
+    ):
+        self.by_ip = TokenBucketLimiter(ip_burst, ip_per_minute / 60, max_keys)
+        self.by_email = TokenBucketLimiter(email_burst, email_per_minute / 60, max_keys)
+        self.by_email_global = TokenBucketLimiter(email_global_burst, email_global_per_minute / 60, max_keys)
+        self._counters = {"allowed": 0, "rejected_ip": 0, "rejected_email": 0, "rejected_email_global": 0}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _email_key(email: str) -> str:
+        return email.strip().lower()
+
+    def _email_ip_key(self, ip: str, email: str) -> str:
+        return f"{self._email_key(email)}|{ip}"
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def check(self, ip: str, email: str):
+        """Registrar uma tentativa; levanta ``LoginThrottled`` se exceder os limites"""
+        retry_after = self.by_ip.acquire(ip)
+        if retry_after is not None:
+            self._count("rejected_ip")
+            raise LoginThrottled("ip", retry_after)
+
+        email_ip_key = self._email_ip_key(ip, email)
+        retry_after = self.by_email.acquire(email_ip_key)
+        if retry_after is not None:
+            self.by_ip.refund(ip)
+            self._count("rejected_email")
+            raise LoginThrottled("email", retry_after)
+
+        retry_after = self.by_email_global.acquire(self._email_key(email))
+        if retry_after is not None:
+            self.by_ip.refund(ip)
+            self.by_email.refund(email_ip_key)
+            self._count("rejected_email_global")
+            raise LoginThrottled("email_global", retry_after)
+
+        self._count("allowed")
+
+    def succeeded(self, ip: str, email: str):
+        """Devolver as fichas de uma tentativa bem-sucedida"""
+        self.by_ip.refund(ip)
+        self.by_email.refund(self._email_ip_key(ip, email))
+        self.by_email_global.refund(self._email_key(email))
+
+    def metrics(self) -> Dict[str, int]:
+        """Contadores de tentativas e quantidade de chaves acompanhadas"""
+        with self._lock:
+            snapshot = dict(self._counters)
+        snapshot.update({
+            "tracked_ips": len(self.by_ip),
+            "tracked_email_ips": len(self.by_email),
+            "tracked_emails": len(self.by_email_global)
+        })
+        return snapshot
+
+
+# Instância global do limitador
+login_throttle = LoginThrottle(
+    settings.login_ip_burst,
+    settings.login_ip_per_minute,
+    settings.login_email_burst,
+    settings.login_email_per_minute,
+    settings.login_email_global_burst,
+    settings.login_email_global_per_minute,
+    settings.login_throttle_max_keys
+)
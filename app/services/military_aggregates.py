@@ -0,0 +1,370 @@
+"""
+Agregação das estatísticas militares em blocos
+
+Cada bloco do CSV gera um agregado parcial (contadores, contagens, somas,
+mínimo/máximo e um sketch de quantis) que pode ser combinado com outros.
+Assim o arquivo inteiro é percorrido com memória limitada, e os blocos
+podem ser processados em paralelo e combinados no mesmo formato servido
+pelo dashboard.
+"""
+import io
+import math
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+import numpy as np
+import pandas as pd
+from app.services.row_counter import count_csv_rows
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Coluna do CSV -> (chave no dashboard, quantidade máxima de categorias)
+CATEGORICAL_COLUMNS = {
+    'UF_NASCIMENTO': ('uf_nascimento', 10),
+    'SEXO': ('sexo', None),
+    'ESTADO_CIVIL': ('estado_civil', None),
+    'DISPENSA': ('dispensa', None),
+    'ZONA_RESIDENCIAL': ('zona_residencial', None),
+    'ESCOLARIDADE': ('escolaridade', 8),
+}
+BIRTH_YEAR_COLUMN = 'ANO_NASCIMENTO'
+PHYSICAL_COLUMNS = ['PESO', 'ALTURA', 'CABECA', 'CALCADO', 'CINTURA']
+AGGREGATE_COLUMNS = list(CATEGORICAL_COLUMNS) + [BIRTH_YEAR_COLUMN] + PHYSICAL_COLUMNS
+
+CHUNK_SIZE = 50000  # Linhas por bloco
+
+
+class QuantileSketch:
+    """
+    Sketch de quantis com erro relativo limitado (no estilo DDSketch)
+
+    Cada valor cai em um bucket logarítmico; o quantil estimado fica a no
+    máximo ``relative_accuracy`` do valor real. Sketches são combinados
+    somando os buckets, e a memória depende apenas da faixa de valores.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.005):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.positive: Counter = Counter()
+        self.negative: Counter = Counter()
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, values: np.ndarray):
+        """Adicionar um array de valores numéricos"""
+        values = np.asarray(values, dtype=float)
+        self.count += len(values)
+        self.zero_count += int(np.count_nonzero(values == 0))
+        for store, part in ((self.positive, values[values > 0]), (self.negative, -values[values < 0])):
+            if len(part):
+                keys, counts = np.unique(np.ceil(np.log(part) / self.log_gamma).astype(np.int64), return_counts=True)
+                store.update(dict(zip(keys.tolist(), counts.tolist())))
+
+    def merge(self, other: "QuantileSketch"):
+        """Combinar com outro sketch de mesma precisão"""
+        self.positive.update(other.positive)
+        self.negative.update(other.negative)
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimar o quantil ``q`` (0 a 1)"""
+        if self.count == 0:
+            return None
+
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self._value(key)
+        seen += self.zero_count
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self._value(key)
+        return self._value(max(self.positive))
+
+    def _value(self, key: int) -> float:
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'positive': [[key, count] for key, count in self.positive.items()],
+            'negative': [[key, count] for key, count in self.negative.items()],
+            'zero_count': self.zero_count,
+            'count': self.count,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "QuantileSketch":
+        sketch = cls(data['relative_accuracy'])
+        sketch.positive = Counter({key: count for key, count in data['positive']})
+        sketch.negative = Counter({key: count for key, count in data['negative']})
+        sketch.zero_count = data['zero_count']
+        sketch.count = data['count']
+        return sketch
+
+
+class NumericSummary:
+    """Contagem, soma, mínimo, máximo e sketch de quantis de uma coluna"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.sketch = QuantileSketch()
+
+    def add(self, values: np.ndarray):
+        if not len(values):
+            return
+        self.count += len(values)
+        self.total += float(values.sum())
+        self.min = float(values.min()) if self.min is None else min(self.min, float(values.min()))
+        self.max = float(values.max()) if self.max is None else max(self.max, float(values.max()))
+        self.sketch.add(values)
+
+    def merge(self, other: "NumericSummary"):
+        if not other.count:
+            return
+        self.count += other.count
+        self.total += other.total
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self.sketch.merge(other.sketch)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'count': self.count, 'sum': self.total, 'min': self.min, 'max': self.max, 'sketch': self.sketch.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "NumericSummary":
+        summary = cls()
+        summary.count = data['count']
+        summary.total = data['sum']
+        summary.min = data['min']
+        summary.max = data['max']
+        summary.sketch = QuantileSketch.from_dict(data['sketch'])
+        return summary
+
+
+class MilitaryAggregate:
+    """Agregado parcial das estatísticas militares, combinável com outros"""
+
+    def __init__(self):
+        self.categories: Dict[str, Counter] = {}
+        self.decades: Counter = Counter()
+        self.physical: Dict[str, NumericSummary] = {}
+
+    def update(self, df: pd.DataFrame):
+        """Acumular um bloco de linhas do CSV"""
+        for column in CATEGORICAL_COLUMNS:
+            if column in df.columns:
+                counts = _normalize_categories(df[column]).value_counts()
+                self.categories.setdefault(column, Counter()).update(dict(zip(counts.index.tolist(), counts.values.tolist())))
+
+        if BIRTH_YEAR_COLUMN in df.columns:
+            years = pd.to_numeric(df[BIRTH_YEAR_COLUMN], errors='coerce').dropna()
+            decades = ((years // 10) * 10).astype('int64').value_counts()
+            self.decades.update(dict(zip(decades.index.tolist(), decades.values.tolist())))
+
+        for column in PHYSICAL_COLUMNS:
+            if column in df.columns:
+                values = pd.to_numeric(df[column], errors='coerce').dropna().to_numpy(dtype=float)
+                self.physical.setdefault(column, NumericSummary()).add(values)
+
+    def merge(self, other: "MilitaryAggregate") -> "MilitaryAggregate":
+        """Combinar com outro agregado parcial"""
+        for column, counter in other.categories.items():
+            self.categories.setdefault(column, Counter()).update(counter)
+        self.decades.update(other.decades)
+        for column, summary in other.physical.items():
+            self.physical.setdefault(column, NumericSummary()).merge(summary)
+        return self
+
+    def finalize(self) -> Dict[str, Any]:
+        """Gerar as estatísticas no formato consumido pelo dashboard"""
+        stats = {}
+
+        for column, (key, limit) in CATEGORICAL_COLUMNS.items():
+            counter = self.categories.get(column)
+            if counter:
+                most_common = counter.most_common(limit)
+                stats[key] = {
+                    'labels': [label for label, _ in most_common],
+                    'data': [count for _, count in most_common]
+                }
+
+        if self.decades:
+            decades = sorted(self.decades)
+            stats['ano_nascimento'] = {
+                'labels': [f"{d}-{d + 9}" for d in decades],
+                'data': [self.decades[d] for d in decades]
+            }
+
+        physical_stats = {}
+        for column in PHYSICAL_COLUMNS:
+            summary = self.physical.get(column)
+            if summary and summary.count:
+                physical_stats[column.lower()] = {
+                    'media': summary.total / summary.count,
+                    'mediana': min(max(summary.sketch.quantile(0.5), summary.min), summary.max),
+                    'min': summary.min,
+                    'max': summary.max
+                }
+        if physical_stats:
+            stats['estatisticas_fisicas'] = physical_stats
+
+        return stats
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Representação serializável em JSON (para persistir ou trocar entre processos)"""
+        return {
+            'categories': {column: [[label, count] for label, count in counter.items()] for column, counter in self.categories.items()},
+            'decades': [[decade, count] for decade, count in self.decades.items()],
+            'physical': {column: summary.to_dict() for column, summary in self.physical.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MilitaryAggregate":
+        aggregate = cls()
+        aggregate.categories = {
+            column: Counter({label: count for label, count in pairs}) for column, pairs in data['categories'].items()
+        }
+        aggregate.decades = Counter({decade: count for decade, count in data['decades']})
+        aggregate.physical = {column: NumericSummary.from_dict(summary) for column, summary in data['physical'].items()}
+        return aggregate
+
+
+def _normalize_categories(series: pd.Series) -> pd.Series:
+    """Padronizar os valores de uma coluna para que blocos diferentes gerem as mesmas chaves"""
+    series = series.dropna()
+    # Um bloco com valores ausentes é lido como float (1.0); os demais como int (1)
+    if pd.api.types.is_float_dtype(series) and len(series) and (series % 1 == 0).all():
+        return series.astype('int64')
+    return series
+
+
+def aggregate_frames(frames: Iterable[pd.DataFrame]) -> MilitaryAggregate:
+    """Agregar uma sequência de blocos já lidos (ex.: da cópia colunar)"""
+    aggregate = MilitaryAggregate()
+    for frame in frames:
+        aggregate.update(frame)
+    return aggregate
+
+
+def aggregate_csv_file(
+    file_path: Path,
+    encoding: str,
+    separator: str,
+    workers: int = 1,
+    chunksize: int = CHUNK_SIZE
+) -> MilitaryAggregate:
+    """
+    Agregar o arquivo inteiro em blocos
+
+    Com ``workers > 1`` o arquivo é dividido em faixas de bytes alinhadas
+    ao início de registros, e cada faixa é agregada em um processo
+    separado; os parciais são combinados ao final.
+    """
+    file_path = Path(file_path)
+    columns = _read_header(file_path, encoding, separator)
+    usecols = [column for column in columns if column in AGGREGATE_COLUMNS]
+    if not usecols:
+        return MilitaryAggregate()
+
+    if workers <= 1:
+        return _aggregate_range(file_path, encoding, separator, columns, usecols, None, None, chunksize)
+
+    # Pontos de divisão entre faixas, sempre no início de uma linha de dados
+    row_count = count_csv_rows(file_path, separator, encoding, offset_stride=chunksize)
+    if len(row_count.offsets) < 2:
+        return _aggregate_range(file_path, encoding, separator, columns, usecols, None, None, chunksize)
+
+    step = math.ceil(len(row_count.offsets) / workers)
+    starts = row_count.offsets[::step]
+    ends = starts[1:] + [None]
+
+    aggregate = MilitaryAggregate()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(_aggregate_range_dict, str(file_path), encoding, separator, columns, usecols, start, end, chunksize)
+            for start, end in zip(starts, ends)
+        ]
+        for future in futures:
+            aggregate.merge(MilitaryAggregate.from_dict(future.result()))
+
+    return aggregate
+
+
+def _read_header(file_path: Path, encoding: str, separator: str) -> List[str]:
+    try:
+        return pd.read_csv(file_path, sep=separator, encoding=encoding, nrows=0).columns.tolist()
+    except pd.errors.EmptyDataError:
+        return []
+
+
+def _aggregate_range(
+    file_path: Path,
+    encoding: str,
+    separator: str,
+    columns: List[str],
+    usecols: List[str],
+    start: Optional[int],
+    end: Optional[int],
+    chunksize: int
+) -> MilitaryAggregate:
+    """Agregar as linhas entre os bytes ``start`` e ``end`` (ou o arquivo todo)"""
+    aggregate = MilitaryAggregate()
+    with open(file_path, 'rb') as f:
+        if start is None:
+            source, header, names = f, 'infer', None
+        else:
+            f.seek(start)
+            source = f if end is None else io.BufferedReader(_RangeReader(f, end - start))
+            header, names = None, columns
+
+        for chunk in pd.read_csv(
+            source,
+            sep=separator,
+            encoding=encoding,
+            header=header,
+            names=names,
+            usecols=usecols,
+            chunksize=chunksize,
+            on_bad_lines='skip'
+        ):
+            aggregate.update(chunk)
+
+    return aggregate
+
+
+def _aggregate_range_dict(*args) -> Dict[str, Any]:
+    """Versão para processos: devolve o parcial como dicionário serializável"""
+    return _aggregate_range(*args).to_dict()
+
+
+class _RangeReader(io.RawIOBase):
+    """Leitor que expõe apenas os próximos ``length`` bytes de um arquivo"""
+
+    def __init__(self, f, length: int):
+        self.f = f
+        self.remaining = length
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self.remaining <= 0:
+            return 0
+        data = self.f.read(min(len(buffer), self.remaining))
+        buffer[:len(data)] = data
+        self.remaining -= len(data)
+        return len(data)
@@ -0,0 +1,121 @@
+"""
+Pool de hashing de senhas
+
+bcrypt consome de 100 a 300 ms de CPU por operação. As operações rodam em
+um pool próprio e limitado de threads, para que um pico de logins não
+bloqueie o event loop nem ocupe o threadpool usado pelo resto da API.
+Com ``max_workers`` operações em execução e ``max_pending`` aguardando,
+novas solicitações são recusadas com ``PasswordPoolFull``.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+from app.config import settings
+from app.security import hash_password, verify_and_update_password, verify_password
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordPoolFull(Exception):
+    """Não há vagas no pool de hashing de senhas"""
+
+
+class PasswordPool:
+    """Pool limitado de threads para hash e verificação de senhas, com métricas"""
+
+    def __init__(self, max_workers: int, max_pending: int):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password")
+        self.max_workers = max_workers
+        self.capacity = max_workers + max_pending
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._metrics = {
+            "completed": 0,
+            "rejected": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "hash_seconds_total": 0.0,
+            "hash_seconds_max": 0.0,
+        }
+
+    def _submit(self, fn: Callable, *args) -> Future:
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self._metrics["rejected"] += 1
+                raise PasswordPoolFull("Pool de hashing de senhas cheio")
+            self._in_flight += 1
+
+        future = self.executor.submit(self._run, time.perf_counter(), fn, *args)
+        future.add_done_callback(self._release)
+        return future
+
+    def _run(self, queued_at: float, fn: Callable, *args):
+        started_at = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self._record(started_at - queued_at, time.perf_counter() - started_at)
+
+    def _record(self, wait: float, duration: float):
+        with self._lock:
+            metrics = self._metrics
+            metrics["completed"] += 1
+            metrics["wait_seconds_total"] += wait
+            metrics["wait_seconds_max"] = max(metrics["wait_seconds_max"], wait)
+            metrics["hash_seconds_total"] += duration
+            metrics["hash_seconds_max"] = max(metrics["hash_seconds_max"], duration)
+
+    def _release(self, _future):
+        with self._lock:
+            self._in_flight -= 1
+
+    async def hash(self, password: str) -> str:
+        """Gerar o hash de uma senha sem bloquear o event loop"""
+        return await asyncio.wrap_future(self._submit(hash_password, password))
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verificar uma senha sem bloquear o event loop"""
+        return await asyncio.wrap_future(self._submit(verify_password, plain_password, hashed_password))
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Verificar uma senha e gerar novo hash se o custo estiver desatualizado"""
+        return await asyncio.wrap_future(self._submit(verify_and_update_password, plain_password, hashed_password))
+
+    def hash_sync(self, password: str) -> str:
+        """Versão bloqueante de ``hash``, para código que já roda em threads"""
+        return self._submit(hash_password, password).result()
+
+    def verify_sync(self, plain_password: str, hashed_password: str) -> bool:
+        """Versão bloqueante de ``verify``, para código que já roda em threads"""
+        return self._submit(verify_password, plain_password, hashed_password).result()
+
+    def verify_and_update_sync(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Versão bloqueante de ``verify_and_update``, para código que já roda em threads"""
+        return self._submit(verify_and_update_password, plain_password, hashed_password).result()
+
+    def metrics(self) -> Dict[str, float]:
+        """Instantâneo das métricas do pool"""
+        with self._lock:
+            snapshot = dict(self._metrics)
+            in_flight = self._in_flight
+        completed = snapshot["completed"]
+        snapshot.update({
+            "workers": self.max_workers,
+            "capacity": self.capacity,
+            "in_flight": in_flight,
+            "queued": max(0, in_flight - self.max_workers),
+            "wait_seconds_avg": snapshot["wait_seconds_total"] / completed if completed else 0.0,
+            "hash_seconds_avg": snapshot["hash_seconds_total"] / completed if completed else 0.0,
+        })
+        return snapshot
+
+    def shutdown(self, wait: bool = True):
+        """Encerrar o pool de threads"""
+        self.executor.shutdown(wait=wait)
+
+
+# Instância global do pool
+password_pool = PasswordPool(settings.password_workers, settings.password_queue_size)
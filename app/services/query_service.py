@@ -0,0 +1,232 @@
+"""
+Consultas filtradas sobre o conteúdo de um upload
+
+Recebe predicados por coluna, uma projeção e um limite, e devolve as
+linhas correspondentes de forma incremental. Com a cópia colunar, a
+filtragem é feita pelo ``pyarrow.dataset`` (leitura apenas das colunas
+usadas e descarte de row groups pelas estatísticas do Parquet); sem ela,
+o CSV é lido em blocos com filtragem vetorizada no pandas.
+
+Os tipos dos valores devolvidos vêm do esquema da cópia colunar. Sem
+ela, não há esquema confiável (os tipos de ``upload_columns`` vêm só do
+primeiro bloco), então os valores são devolvidos como o texto do CSV;
+filtros com valor numérico ainda comparam a coluna como número.
+"""
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+import pandas as pd
+from app.models import Upload
+from app.services.columnar_service import ColumnarService
+from app.services.csv_service import CSVService
+from app.services.file_service import FileService
+import logging
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+except ImportError:  # pragma: no cover - dependência opcional
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+OPERATORS = ("eq", "ne", "lt", "le", "gt", "ge", "in", "not_in", "is_null", "not_null")
+BATCH_SIZE = 50000  # Linhas lidas por bloco
+
+
+@dataclass
+class Predicate:
+    """Condição sobre uma coluna"""
+    column: str
+    op: str
+    value: Any = None
+
+
+def parse_predicates(filters: List[Dict[str, Any]]) -> List[Predicate]:
+    """Validar os filtros recebidos na requisição"""
+    predicates = []
+    for item in filters or []:
+        column, op = item.get("column"), item.get("op", "eq")
+        if not column:
+            raise ValueError("Filtro sem coluna")
+        if op not in OPERATORS:
+            raise ValueError(f"Operador inválido: {op}")
+        value = item.get("value")
+        if op in ("in", "not_in") and not isinstance(value, list):
+            raise ValueError(f"O operador {op} exige uma lista de valores")
+        if op not in ("is_null", "not_null") and value is None:
+            raise ValueError(f"Filtro em {column} sem valor")
+        predicates.append(Predicate(column=column, op=op, value=value))
+    return predicates
+
+
+class QueryService:
+    """Serviço de consultas sobre o conteúdo dos uploads"""
+
+    def __init__(self):
+        self.file_service = FileService()
+        self.columnar_service = ColumnarService()
+        self.csv_service = CSVService()
+
+    def query_upload(
+        self,
+        upload: Upload,
+        columns: Optional[List[str]],
+        predicates: List[Predicate],
+        limit: int
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Linhas do upload que satisfazem todos os predicados
+
+        A validação acontece aqui (colunas inexistentes levantam
+        ``ValueError``); as linhas são produzidas sob demanda pelo
+        iterador retornado.
+        """
+        columnar_path = self.columnar_service.get_path(upload.columnar_path)
+        if columnar_path is not None and pa is not None:
+            available = self.columnar_service.get_columns(columnar_path)
+            columns = self._validate_columns(available, columns, predicates)
+            dataset = ds.dataset(columnar_path, format="parquet")
+            expression = self._arrow_expression(dataset, predicates)
+            return self._query_parquet(dataset, columns, expression, limit)
+
+        file_path = self.file_service.get_file_path(upload.stored_path)
+        encoding, separator = self.csv_service.sniff_format(file_path)
+        available = pd.read_csv(file_path, sep=separator, encoding=encoding, nrows=0).columns.tolist()
+        columns = self._validate_columns(available, columns, predicates)
+        return self._query_csv(file_path, encoding, separator, columns, predicates, limit)
+
+    @staticmethod
+    def _validate_columns(available: List[str], columns: Optional[List[str]], predicates: List[Predicate]) -> List[str]:
+        columns = columns or list(available)
+        missing = [c for c in list(columns) + [p.column for p in predicates] if c not in available]
+        if missing:
+            raise ValueError(f"Colunas inexistentes: {', '.join(sorted(set(missing)))}")
+        return columns
+
+    @staticmethod
+    def _cast_value(value, kind: str):
+        """Converter o valor de um filtro para o tipo da coluna"""
+        if kind == "float":
+            return float(value)
+        if kind == "int":
+            number = float(value)
+            return int(number) if number.is_integer() else number
+        if kind == "bool":
+            return str(value).lower() in ("true", "1") if not isinstance(value, bool) else value
+        return str(value)
+
+    def _arrow_expression(self, dataset, predicates: List[Predicate]):
+        """Combinar os predicados em uma expressão do pyarrow (E lógico)"""
+        expression = None
+        for predicate in predicates:
+            try:
+                condition = self._arrow_condition(predicate, dataset.schema.field(predicate.column).type)
+            except (TypeError, ValueError):
+                raise ValueError(f"Valor inválido para a coluna {predicate.column}")
+            expression = condition if expression is None else expression & condition
+        return expression
+
+    @staticmethod
+    def _query_parquet(dataset, columns: List[str], expression, limit: int) -> Iterator[Dict[str, Any]]:
+        remaining = limit
+        for batch in dataset.to_batches(columns=columns, filter=expression, batch_size=BATCH_SIZE):
+            for row in batch.slice(0, remaining).to_pylist():
+                yield row
+            remaining -= min(remaining, batch.num_rows)
+            if remaining == 0:
+                return
+
+    def _arrow_condition(self, predicate: Predicate, arrow_type):
+        field = pc.field(predicate.column)
+        if predicate.op == "is_null":
+            return field.is_null()
+        if predicate.op == "not_null":
+            return field.is_valid()
+
+        if pa.types.is_integer(arrow_type):
+            kind = "int"
+        elif pa.types.is_floating(arrow_type):
+            kind = "float"
+        elif pa.types.is_boolean(arrow_type):
+            kind = "bool"
+        else:
+            kind = "string"
+
+        def cast(value):
+            return self._cast_value(value, kind)
+
+        if predicate.op in ("in", "not_in"):
+            condition = field.isin([cast(v) for v in predicate.value])
+            return ~condition & field.is_valid() if predicate.op == "not_in" else condition
+
+        value = cast(predicate.value)
+        return {
+            "eq": field == value,
+            "ne": field != value,
+            "lt": field < value,
+            "le": field <= value,
+            "gt": field > value,
+            "ge": field >= value,
+        }[predicate.op]
+
+    def _query_csv(
+        self,
+        file_path: Path,
+        encoding: str,
+        separator: str,
+        columns: List[str],
+        predicates: List[Predicate],
+        limit: int
+    ) -> Iterator[Dict[str, Any]]:
+        usecols = list(dict.fromkeys(columns + [p.column for p in predicates]))
+        remaining = limit
+        for chunk in pd.read_csv(
+            file_path,
+            sep=separator,
+            encoding=encoding,
+            usecols=usecols,
+            dtype=str,
+            chunksize=BATCH_SIZE,
+            on_bad_lines="skip"
+        ):
+            mask = pd.Series(True, index=chunk.index)
+            for predicate in predicates:
+                mask &= self._pandas_condition(chunk[predicate.column], predicate)
+            matched = chunk.loc[mask, columns].head(remaining)
+            yield from matched.astype(object).where(matched.notna(), None).to_dict(orient="records")
+            remaining -= len(matched)
+            if remaining == 0:
+                return
+
+    @staticmethod
+    def _pandas_condition(series: pd.Series, predicate: Predicate) -> pd.Series:
+        if predicate.op == "is_null":
+            return series.isna()
+        if predicate.op == "not_null":
+            return series.notna()
+
+        values = predicate.value if predicate.op in ("in", "not_in") else [predicate.value]
+        # Valores numéricos comparam a coluna como número (células não numéricas
+        # não satisfazem a condição); os demais, como texto
+        if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+            series = pd.to_numeric(series, errors="coerce")
+        else:
+            values = [str(v) for v in values]
+
+        if predicate.op in ("in", "not_in"):
+            condition = series.isin(values)
+            return ~condition & series.notna() if predicate.op == "not_in" else condition
+
+        value = values[0]
+        condition = {
+            "eq": series == value,
+            "ne": series != value,
+            "lt": series < value,
+            "le": series <= value,
+            "gt": series > value,
+            "ge": series >= value,
+        }[predicate.op]
+        # Valores ausentes nunca satisfazem comparações
+        return condition & series.notna()
@@ -0,0 +1,362 @@
+"""
+Contagem rápida de linhas de CSV
+
+Percorre o arquivo armazenado via ``mmap`` em blocos de tamanho fixo e
+identifica os limites de registro diretamente nos bytes, respeitando
+campos entre aspas que contenham quebras de linha, sem carregar o
+arquivo em memória.
+
+A contagem segue as regras de ``pd.read_csv(..., on_bad_lines='skip')``
+para quebras ``\n`` e ``\r\n``, linhas vazias ou só com espaços e
+tabulações (ignoradas), colunas de índice implícitas (primeira linha de
+dados mais longa que o cabeçalho) e aspas no início e no fim dos campos.
+Fora desses casos (quebras ``\r`` isoladas, aspas no meio de um campo,
+separador espaço ou encodings multibyte) a contagem fica com o próprio
+pandas.
+"""
+import codecs
+import csv
+import mmap
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator, List, Optional
+import numpy as np
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+BLOCK_SIZE = 4 * 1024 * 1024  # Bytes processados por bloco
+NEWLINE = ord('\n')
+CARRIAGE_RETURN = ord('\r')
+BARE_CR = re.compile(rb'(?<=\r)(?!\n)')  # Ponto de corte após "\r" isolado
+BLANK_BYTES = (ord(' '), ord('\t'), CARRIAGE_RETURN, NEWLINE)  # Bytes que não contam como conteúdo
+
+
+@dataclass
+class RowCount:
+    """Resultado da contagem de linhas"""
+    rows: int  # Linhas de dados mantidas pelo pandas (sem cabeçalho)
+    bad_lines: int  # Linhas descartadas por on_bad_lines='skip'
+    blank_lines: int = 0  # Linhas em branco ignoradas
+    offsets: List[int] = field(default_factory=list)  # Byte inicial a cada ``offset_stride`` linhas de dados
+
+
+def _is_ascii_compatible(encoding: str, separator: str, quotechar: str) -> bool:
+    """Verificar se separador, aspas e quebra de linha ocupam um byte no encoding"""
+    probe = f"{separator}{quotechar}\n"
+    try:
+        encoded = probe.encode(encoding).removeprefix(codecs.BOM_UTF8)
+        return len(separator) == 1 and encoded == probe.encode('ascii')
+    except (LookupError, UnicodeError):
+        return False
+
+
+def _max_fields(header_fields: int, first_row_fields: int) -> int:
+    """
+    Campos aceitos por registro de dados
+
+    Assim como o pandas, se a primeira linha de dados tiver mais campos
+    que o cabeçalho, as colunas excedentes viram índice (um ``MultiIndex``
+    quando são duas ou mais) e esse passa a ser o tamanho esperado.
+    """
+    return max(header_fields, first_row_fields)
+
+
+def _blank_table(sep_byte: int) -> np.ndarray:
+    """Tabela de consulta dos bytes ignorados ao decidir se uma linha está em branco"""
+    table = np.zeros(256, dtype=bool)
+    table[[byte for byte in BLANK_BYTES if byte != sep_byte]] = True
+    return table
+
+
+def _has_bare_carriage_return(block: np.ndarray, positions: np.ndarray, next_byte: Optional[int]) -> bool:
+    """Verificar se algum ``\r`` fora de aspas não é seguido por ``\n``"""
+    following = np.append(block[1:], -1 if next_byte is None else next_byte)
+    next_bytes = following[positions]
+    return bool(np.any((next_bytes != NEWLINE) & (next_bytes != -1)))
+
+
+def _quotes_at_field_edges(
+    block: np.ndarray,
+    inside: np.ndarray,
+    quote_byte: int,
+    sep_byte: int,
+    last_byte: int,
+    next_byte: Optional[int]
+) -> bool:
+    """
+    Verificar se a paridade acumulada das aspas vale para o bloco
+
+    O pandas só abre um campo entre aspas quando a aspa é o primeiro
+    caractere do campo; no meio de um campo sem aspas ela é literal.
+    A paridade (XOR acumulado) coincide com o pandas quando toda aspa de
+    abertura vem logo após separador, quebra de linha, início do arquivo
+    ou outra aspa (escape ``""``) e toda aspa de fechamento é seguida por
+    separador, quebra de linha, outra aspa ou fim do arquivo.
+    """
+    positions = np.flatnonzero(block == quote_byte)
+    prev_bytes = np.where(positions > 0, block[positions - 1], last_byte)
+    following = np.append(block[1:], -1 if next_byte is None else next_byte)
+    next_bytes = following[positions]
+
+    opening = inside[positions].astype(bool)
+    prev_ok = np.isin(prev_bytes, (sep_byte, NEWLINE, CARRIAGE_RETURN, quote_byte, -1))
+    next_ok = np.isin(next_bytes, (sep_byte, NEWLINE, CARRIAGE_RETURN, quote_byte, -1))
+    return bool(np.all(np.where(opening, prev_ok, next_ok)))
+
+
+def count_csv_rows(
+    file_path: Path,
+    separator: str = ',',
+    encoding: str = 'utf-8',
+    quotechar: str = '"',
+    block_size: int = BLOCK_SIZE,
+    offset_stride: Optional[int] = None
+) -> RowCount:
+    """
+    Contar as linhas de dados de um CSV com memória constante
+
+    A paridade de aspas é acumulada ao longo do arquivo, de modo que
+    quebras de linha e separadores dentro de campos entre aspas não são
+    considerados limites. Registros com mais campos que o cabeçalho são
+    contados em ``bad_lines``, como o pandas faria com
+    ``on_bad_lines='skip'``.
+
+    Com ``offset_stride``, registra também o byte em que começam as
+    linhas de dados de índice 0, ``offset_stride``, ``2 * offset_stride``...
+    (índice esparso para acesso direto a qualquer trecho do arquivo).
+
+    Encodings que não representam separador, aspas e ``\\n`` em um único
+    byte (ex.: UTF-16), separador espaço e arquivos com aspas fora do
+    início ou do fim de um campo (literais para o pandas) ou com ``\\r``
+    isolado como quebra de linha usam o pandas como alternativa. Nesse
+    caminho os offsets vêm de uma varredura com o módulo ``csv`` (ver
+    ``_record_offsets``); encodings multibyte ficam sem offsets.
+    """
+    file_path = Path(file_path)
+    if separator == ' ' or not _is_ascii_compatible(encoding, separator, quotechar):
+        return _count_with_pandas(file_path, separator, encoding, quotechar, offset_stride)
+
+    if file_path.stat().st_size == 0:
+        return RowCount(rows=0, bad_lines=0)
+
+    quote_byte = ord(quotechar)
+    sep_byte = ord(separator)
+    blank_table = _blank_table(sep_byte)
+
+    in_quotes = 0  # Paridade de aspas ao final do bloco anterior
+    record_seps = 0  # Separadores do registro ainda aberto
+    record_content = 0  # Bytes de conteúdo (fora espaços e quebras) do registro ainda aberto
+    last_byte = -1  # Último byte do bloco anterior
+    header_fields = None
+    max_fields = None  # Campos aceitos por registro de dados
+    record_start = 0  # Byte inicial do registro ainda aberto
+    rows = bad_lines = blank_lines = 0
+    offsets = []
+
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        size = len(mm)
+        for start in range(0, size, block_size):
+            block = np.frombuffer(mm[start:start + block_size], dtype=np.uint8)
+            next_byte = mm[start + block_size] if start + block_size < size else None
+
+            newlines = np.flatnonzero(block == NEWLINE)
+            sep_positions = np.flatnonzero(block == sep_byte)
+            carriage_returns = np.flatnonzero(block == CARRIAGE_RETURN)
+            quote_mask = block == quote_byte
+            quote_count = int(np.count_nonzero(quote_mask))
+
+            # Descartar quebras e separadores dentro de aspas: o XOR acumulado
+            # das aspas indica se cada posição está dentro de um campo
+            if quote_count or in_quotes:
+                inside = np.bitwise_xor.accumulate(quote_mask)
+                if in_quotes:
+                    inside = ~inside
+                if quote_count:
+                    if not _quotes_at_field_edges(block, inside, quote_byte, sep_byte, last_byte, next_byte):
+                        # Aspas no meio de um campo são literais para o pandas e
+                        # invalidam a paridade: a contagem fica com o pandas
+                        return _count_with_pandas(file_path, separator, encoding, quotechar, offset_stride)
+                newlines = newlines[~inside[newlines]]
+                sep_positions = sep_positions[~inside[sep_positions]]
+                carriage_returns = carriage_returns[~inside[carriage_returns]]
+
+            if len(carriage_returns) and _has_bare_carriage_return(block, carriage_returns, next_byte):
+                # "\r" isolado também encerra a linha para o pandas
+                return _count_with_pandas(file_path, separator, encoding, quotechar, offset_stride)
+
+            # Bytes de conteúdo: a linha só com espaços, tabulações e "\r\n" é
+            # ignorada pelo pandas como linha em branco
+            content_positions = np.flatnonzero(~blank_table[block])
+
+            # Separadores vistos até cada quebra de linha (inclusive)
+            seps_at_nl = np.searchsorted(sep_positions, newlines)
+
+            if len(newlines):
+                # Separadores e tamanho de cada registro terminado neste bloco
+                seps = np.diff(seps_at_nl, prepend=0)
+                seps[0] += record_seps
+                content_at_nl = np.searchsorted(content_positions, newlines)
+                content = np.diff(content_at_nl, prepend=0)
+                content[0] += record_content
+                blank = content == 0
+
+                fields = seps + 1
+                starts = np.concatenate(([record_start], newlines[:-1] + 1 + start))
+                if header_fields is None:
+                    non_blank = np.flatnonzero(~blank)
+                    if len(non_blank):
+                        first = non_blank[0]
+                        header_fields = int(fields[first])
+                        blank_lines += int(blank[:first + 1].sum())
+                        first += 1
+                    else:
+                        blank_lines += int(blank.sum())
+                        first = len(blank)
+                    blank, fields, starts = blank[first:], fields[first:], starts[first:]
+
+                if header_fields is not None and max_fields is None:
+                    non_blank = np.flatnonzero(~blank)
+                    if len(non_blank):
+                        max_fields = _max_fields(header_fields, int(fields[non_blank[0]]))
+
+                if header_fields is not None:
+                    bad = ~blank & (fields > max_fields) if max_fields else np.zeros_like(blank)
+                    kept = ~blank & ~bad
+                    if offset_stride:
+                        indexes = rows + np.cumsum(kept) - 1
+                        offsets.extend(starts[kept & (indexes % offset_stride == 0)].tolist())
+                    blank_lines += int(blank.sum())
+                    bad_lines += int(bad.sum())
+                    rows += int(kept.sum())
+
+                record_start = int(newlines[-1] + 1 + start)
+                record_seps = int(len(sep_positions) - seps_at_nl[-1])
+                record_content = int(len(content_positions) - content_at_nl[-1])
+            else:
+                record_seps += len(sep_positions)
+                record_content += len(content_positions)
+
+            in_quotes ^= quote_count & 1
+            last_byte = int(block[-1])
+
+    if in_quotes:
+        # Aspas sem fechamento até o fim do arquivo
+        return _count_with_pandas(file_path, separator, encoding, quotechar, offset_stride)
+
+    # Último registro sem quebra de linha final
+    if record_content:
+        if header_fields is None:
+            pass  # O arquivo contém apenas o cabeçalho
+        elif record_seps + 1 > (max_fields or _max_fields(header_fields, record_seps + 1)):
+            bad_lines += 1
+        else:
+            if offset_stride and rows % offset_stride == 0:
+                offsets.append(record_start)
+            rows += 1
+
+    return RowCount(rows=rows, bad_lines=bad_lines, blank_lines=blank_lines, offsets=offsets)
+
+
+def _count_with_pandas(
+    file_path: Path,
+    separator: str,
+    encoding: str,
+    quotechar: str = '"',
+    offset_stride: Optional[int] = None
+) -> RowCount:
+    """Contagem alternativa pelo próprio pandas, para os casos que a varredura de bytes não cobre"""
+    bad_lines = 0
+
+    def skip_bad_line(line):
+        nonlocal bad_lines
+        bad_lines += 1
+        return None
+
+    rows = 0
+    try:
+        for chunk in pd.read_csv(
+            file_path,
+            sep=separator,
+            encoding=encoding,
+            chunksize=10000,
+            engine='python',
+            on_bad_lines=skip_bad_line
+        ):
+            rows += len(chunk)
+    except pd.errors.EmptyDataError:
+        pass
+
+    offsets = []
+    if offset_stride and rows and _is_ascii_compatible(encoding, separator, quotechar):
+        offsets = _record_offsets(file_path, separator, encoding, quotechar, offset_stride, rows)
+    return RowCount(rows=rows, bad_lines=bad_lines, offsets=offsets)
+
+
+def _record_offsets(
+    file_path: Path,
+    separator: str,
+    encoding: str,
+    quotechar: str,
+    offset_stride: int,
+    expected_rows: int
+) -> List[int]:
+    """
+    Offsets das linhas de dados quando a contagem ficou com o pandas
+
+    O engine ``python`` do pandas interpreta os registros com o módulo
+    ``csv`` sobre linhas separadas em ``\\n``, ``\\r\\n`` ou ``\\r``; aqui
+    as mesmas linhas são entregues ao ``csv.reader`` contando os bytes
+    consumidos, de modo que o início de cada registro é conhecido. As
+    regras de descarte são as do pandas: linhas vazias ou com um único
+    campo em branco são ignoradas e, depois das colunas de índice
+    implícitas, registros com campos a mais são descartados. Se o total
+    não coincidir com ``expected_rows``, nenhum offset é devolvido.
+    """
+    consumed = 0  # Bytes já entregues ao leitor
+
+    def lines() -> Iterator[str]:
+        nonlocal consumed
+        decoder = codecs.getincrementaldecoder(encoding)()
+        with open(file_path, 'rb') as f:
+            for raw_line in f:
+                for piece in BARE_CR.split(raw_line):
+                    if piece:
+                        consumed += len(piece)
+                        yield decoder.decode(piece)
+
+    offsets = []
+    header_fields = max_fields = None
+    rows = 0
+    reader = csv.reader(lines(), delimiter=separator, quotechar=quotechar)
+    try:
+        while True:
+            record_start = consumed
+            try:
+                record = next(reader)
+            except StopIteration:
+                break
+            if not record or (len(record) == 1 and not record[0].strip()):
+                continue
+            if header_fields is None:
+                header_fields = len(record)
+                continue
+            if max_fields is None:
+                max_fields = _max_fields(header_fields, len(record))
+            if len(record) > max_fields:
+                continue
+            if rows % offset_stride == 0:
+                offsets.append(record_start)
+            rows += 1
+    except (csv.Error, UnicodeDecodeError) as e:
+        logger.warning(f"Offsets não registrados para {file_path.name}: {e}")
+        return []
+
+    if rows != expected_rows:
+        logger.warning(
+            f"Offsets não registrados para {file_path.name}: {rows} linha(s) na varredura, {expected_rows} no pandas"
+        )
+        return []
+    return offsets
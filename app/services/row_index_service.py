@@ -0,0 +1,100 @@
+"""
+Índice esparso de linhas dos uploads
+
+Na ingestão é gravado, ao lado do CSV, um índice com o byte inicial de
+uma a cada ``row_index_stride`` linhas de dados. Para ler a página que
+começa na linha N, o arquivo é posicionado no ponto indexado anterior e
+apenas a janela pedida é interpretada, então o custo de qualquer página
+é o mesmo.
+"""
+import io
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import pandas as pd
+from app.config import settings
+from app.services.row_counter import RowCount
+import logging
+
+logger = logging.getLogger(__name__)
+
+INDEX_SUFFIX = ".rowidx.json"
+
+
+def row_index_relative_path(stored_path: str) -> str:
+    """Caminho relativo do índice de linhas de um CSV armazenado"""
+    return str(Path(stored_path).with_suffix(INDEX_SUFFIX))
+
+
+class RowIndexService:
+    """Gravação e uso do índice esparso de linhas"""
+
+    def __init__(self):
+        self.uploads_dir = Path(settings.uploads_dir)
+
+    def write_index(
+        self,
+        index_path: Path,
+        row_count: RowCount,
+        stride: int,
+        encoding: str,
+        separator: str,
+        columns: List[str]
+    ):
+        """Gravar o índice a partir da contagem de linhas com offsets"""
+        index = {
+            "stride": stride,
+            "rows": row_count.rows,
+            "encoding": encoding,
+            "separator": separator,
+            "columns": [str(column) for column in columns],
+            "offsets": row_count.offsets
+        }
+        tmp_path = Path(index_path).with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(index, separators=(",", ":")), encoding="utf-8")
+        tmp_path.replace(index_path)
+
+    def load_index(self, row_index_path: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Carregar o índice de um upload, se existir"""
+        if not row_index_path:
+            return None
+        path = self.uploads_dir / row_index_path
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def read_rows(self, file_path: Path, index: Dict[str, Any], offset: int, limit: int) -> List[Dict[str, Any]]:
+        """
+        Ler ``limit`` linhas de dados a partir da linha ``offset``
+
+        Sem offsets no índice (encodings multibyte ou contagem pelo pandas
+        que a varredura de offsets não confirmou), a leitura começa no
+        início do arquivo.
+        """
+        if offset >= index["rows"] or limit <= 0:
+            return []
+
+        stride = index["stride"]
+        offsets = index["offsets"]
+        read_options = dict(
+            sep=index["separator"],
+            dtype=str,
+            on_bad_lines="skip"
+        )
+
+        if not offsets:
+            # Sem ponto indexado: lê do início (cabeçalho incluído)
+            skip = offset
+            df = pd.read_csv(file_path, encoding=index["encoding"], nrows=offset + limit, **read_options)
+        else:
+            block = min(offset // stride, len(offsets) - 1)
+            skip = offset - block * stride
+            with open(file_path, "rb") as raw:
+                raw.seek(offsets[block])
+                text = io.TextIOWrapper(raw, encoding=index["encoding"], newline="")
+                # nrows conta apenas as linhas mantidas: linhas mal formadas e em
+                # branco entre o ponto indexado e a janela não deslocam a contagem
+                df = pd.read_csv(text, header=None, names=index["columns"], nrows=skip + limit, **read_options)
+
+        window = df.iloc[skip:skip + limit]
+        return window.astype(object).where(window.notna(), None).to_dict(orient="records")
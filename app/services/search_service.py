@@ -0,0 +1,126 @@
+"""
+Busca por nome de arquivo
+"""
+import re
+from functools import lru_cache
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from app.models import Upload
+import logging
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "uploads_fts"
+TOKEN_PATTERN = re.compile(r"[^\W_]+", re.UNICODE)  # Termos como no tokenizador unicode61: "_" separa
+
+# Índice FTS5 sobre uploads.original_name (tabela de conteúdo externo),
+# mantido em sincronia por gatilhos. "_", "." e "-" separam os termos:
+# "relatorio_2024.csv" é indexado como "relatorio", "2024" e "csv".
+FTS_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        original_name,
+        content='uploads',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS uploads_fts_insert AFTER INSERT ON uploads BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, original_name) VALUES (new.id, new.original_name);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS uploads_fts_delete AFTER DELETE ON uploads BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, original_name) VALUES ('delete', old.id, old.original_name);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS uploads_fts_update AFTER UPDATE OF original_name ON uploads BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, original_name) VALUES ('delete', old.id, old.original_name);
+        INSERT INTO {FTS_TABLE}(rowid, original_name) VALUES (new.id, new.original_name);
+    END
+    """,
+]
+
+
+def create_search_index(engine: Engine) -> bool:
+    """
+    Criar o índice de busca por nome de arquivo, se o banco suportar
+
+    Apenas SQLite com FTS5; nos demais bancos a busca continua com ILIKE.
+    Na criação, o índice é preenchido com os uploads já existentes.
+    """
+    if engine.dialect.name != "sqlite":
+        return False
+
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": FTS_TABLE}
+        ).first()
+        if exists:
+            return True
+
+        try:
+            for ddl in FTS_DDL:
+                conn.execute(text(ddl))
+            conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+        except Exception as e:
+            logger.warning(f"FTS5 indisponível, busca por nome usará ILIKE: {e}")
+            return False
+
+    has_search_index.cache_clear()
+    return True
+
+
+@lru_cache(maxsize=None)
+def has_search_index(engine: Engine) -> bool:
+    """Verificar se o índice de busca existe no banco"""
+    if engine.dialect.name != "sqlite":
+        return False
+    with engine.connect() as conn:
+        return conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": FTS_TABLE}
+        ).first() is not None
+
+
+def build_match_query(q: str) -> Optional[str]:
+    """
+    Converter o texto buscado em uma consulta FTS5
+
+    Cada termo vira um prefixo e todos precisam estar presentes:
+    "relat 2024" -> "relat"* AND "2024"*
+    """
+    tokens = TOKEN_PATTERN.findall(q)
+    if not tokens:
+        return None
+    return " AND ".join(f'"{token}"*' for token in tokens)
+
+
+class SearchService:
+    """Serviço de busca de uploads por nome de arquivo"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def has_index(self) -> bool:
+        """Verificar se o banco da sessão tem o índice de busca"""
+        return has_search_index(self.db.get_bind())
+
+    async def has_index_async(self) -> bool:
+        """Versão de ``has_index`` para ``AsyncSession``"""
+        return await self.db.run_sync(lambda session: has_search_index(session.get_bind()))
+
+    @staticmethod
+    def filename_filter(q: str, indexed: bool):
+        """Filtro SQLAlchemy de uploads cujo nome corresponde à busca"""
+        match = build_match_query(q)
+        if match is None or not indexed:
+            return Upload.original_name.ilike(f"%{q}%")
+
+        matching_ids = text(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match").bindparams(match=match)
+        return Upload.id.in_(matching_ids.columns(Upload.id))
@@ -2,9 +2,14 @@
 Serviço de estatísticas
 """
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from app.models import Upload, User
+from sqlalchemy import func, desc, select
+from app.models import Upload, UploadAggregate, UploadColumn, UploadStatus, User
 from typing import Dict, Any, Optional
+from datetime import datetime
+from app.config import settings
+from app.serializers import serialize_upload
+from app.services.columnar_service import ColumnarService
+from app.services.military_aggregates import AGGREGATE_COLUMNS, MilitaryAggregate, aggregate_csv_file, aggregate_frames
 import json
 import logging
 
@@ -17,65 +22,64 @@ class StatsService:
     def __init__(self, db: Session):
         self.db = db
 
-    def serialize_upload(self, upload: Upload) -> dict:
-        return {
-            "id": upload.id,
-            "filename": upload.original_name,
-            "uploaded_at": upload.uploaded_at.isoformat() if upload.uploaded_at else None,
-            "rows_total": upload.rows_total,
-            "cols_total": upload.cols_total
-            # Adicione os outros campos relevantes do modelo aqui
-        }
-    
     def get_dashboard_stats(self) -> Dict[str, Any]:
         """Obter estatísticas para o dashboard"""
         try:
-            # Total de uploads
-            total_uploads = self.db.query(Upload).count()
-            
-            # Último upload
-            last_upload = self.db.query(Upload).order_by(desc(Upload.uploaded_at)).first()
-            serialized_last_upload = self.serialize_upload(last_upload) if last_upload else None
-            
-            # Total de linhas (soma de todos os uploads)
-            total_rows = self.db.query(func.sum(Upload.rows_total)).scalar() or 0
+            statements = self._dashboard_statements()
+            return self._dashboard_result(
+                total_uploads=self.db.execute(statements['total_uploads']).scalar(),
+                last_upload=self.db.execute(statements['last_upload']).scalars().first(),
+                total_rows=self.db.execute(statements['total_rows']).scalar(),
+                dtype_rows=self.db.execute(statements['dtype_distribution']).all()
+            )
             
-            # Distribuição por tipo de dados
-            dtype_distribution = self._get_dtype_distribution()
-            
-            return {
-                'total_uploads': total_uploads,
-                'last_upload': serialized_last_upload,
-                'total_rows': total_rows,
-                'dtype_distribution': dtype_distribution
-            }
+        except Exception as e:
+            logger.error(f"Erro ao obter estatísticas: {e}")
+            return self._dashboard_result(0, None, 0, [])
+    
+    async def get_dashboard_stats_async(self) -> Dict[str, Any]:
+        """Versão de ``get_dashboard_stats`` para ``AsyncSession``"""
+        try:
+            statements = self._dashboard_statements()
+            return self._dashboard_result(
+                total_uploads=(await self.db.execute(statements['total_uploads'])).scalar(),
+                last_upload=(await self.db.execute(statements['last_upload'])).scalars().first(),
+                total_rows=(await self.db.execute(statements['total_rows'])).scalar(),
+                dtype_rows=(await self.db.execute(statements['dtype_distribution'])).all()
+            )
             
         except Exception as e:
             logger.error(f"Erro ao obter estatísticas: {e}")
-            return {
-                'total_uploads': 0,
-                'last_upload': None,
-                'total_rows': 0,
-                'dtype_distribution': {}
-            }
+            return self._dashboard_result(0, None, 0, [])
+    
+    @staticmethod
+    def _dashboard_statements() -> Dict[str, Any]:
+        """Consultas das estatísticas do dashboard"""
+        return {
+            # Total de uploads
+            'total_uploads': select(func.count(Upload.id)),
+            # Último upload
+            'last_upload': select(Upload).order_by(desc(Upload.uploaded_at)).limit(1),
+            # Total de linhas (soma de todos os uploads)
+            'total_rows': select(func.sum(Upload.rows_total)),
+            # Distribuição por tipo de dados
+            'dtype_distribution': select(UploadColumn.dtype, func.count(UploadColumn.id)).group_by(UploadColumn.dtype),
+        }
+    
+    def _dashboard_result(self, total_uploads: int, last_upload: Optional[Upload], total_rows: int, dtype_rows: list) -> Dict[str, Any]:
+        """Montar as estatísticas do dashboard"""
+        return {
+            'total_uploads': total_uploads or 0,
+            'last_upload': serialize_upload(last_upload) if last_upload else None,
+            'total_rows': total_rows or 0,
+            'dtype_distribution': {dtype: count for dtype, count in dtype_rows}
+        }
     
     def _get_dtype_distribution(self) -> Dict[str, int]:
         """Obter distribuição de tipos de dados"""
         try:
-            # Buscar todos os dtypes_json
-            uploads = self.db.query(Upload).filter(Upload.dtypes_json.isnot(None)).all()
-            
-            dtype_counts = {}
-            
-            for upload in uploads:
-                try:
-                    dtypes = json.loads(upload.dtypes_json)
-                    for col, dtype in dtypes.items():
-                        dtype_counts[dtype] = dtype_counts.get(dtype, 0) + 1
-                except (json.JSONDecodeError, TypeError):
-                    continue
-            
-            return dtype_counts
+            rows = self.db.execute(self._dashboard_statements()['dtype_distribution']).all()
+            return {dtype: count for dtype, count in rows}
             
         except Exception as e:
             logger.error(f"Erro ao obter distribuição de tipos: {e}")
@@ -137,117 +141,153 @@ class StatsService:
             return []
         
     def get_military_stats(self, upload_id: Optional[int] = None) -> Dict[str, Any]:
-        """Obter estatísticas específicas dos dados militares"""
+        """
+        Obter estatísticas específicas dos dados militares
+
+        As estatísticas são calculadas na ingestão e lidas da tabela
+        ``upload_aggregates``; uploads antigos, sem agregados, são
+        calculados e gravados no primeiro acesso.
+        """
         try:
-            from app.services.csv_service import CSVService
-            from app.services.file_service import FileService
-            import pandas as pd
-            from pathlib import Path
-            
-            # Se não especificado, pegar o último upload
+            # Se não especificado, pegar o último upload processado
+            query = self.db.query(Upload, UploadAggregate.military_stats_json).outerjoin(
+                UploadAggregate, UploadAggregate.upload_id == Upload.id
+            )
             if upload_id is None:
-                upload = self.db.query(Upload).order_by(desc(Upload.uploaded_at)).first()
+                query = query.filter(Upload.status == UploadStatus.READY).order_by(desc(Upload.uploaded_at))
             else:
-                upload = self.db.query(Upload).filter(Upload.id == upload_id).first()
+                query = query.filter(Upload.id == upload_id)
             
-            if not upload:
+            row = query.first()
+            if not row:
                 return {}
             
-            # Carregar dados do CSV
-            file_service = FileService()
-            csv_service = CSVService()
-            file_path = file_service.get_file_path(upload.stored_path)
-            
-            # Carregar amostra dos dados
-            df = csv_service.load_csv_preview(file_path, max_rows=10000)
-            
-            if df.empty:
-                return {}
+            upload, military_stats_json = row
+            if military_stats_json is not None:
+                return json.loads(military_stats_json)
             
-            stats = {}
-            
-            # 1. Distribuição por UF de nascimento
-            if 'UF_NASCIMENTO' in df.columns:
-                uf_counts = df['UF_NASCIMENTO'].value_counts().head(10)
-                stats['uf_nascimento'] = {
-                    'labels': uf_counts.index.tolist(),
-                    'data': uf_counts.values.tolist()
-                }
-            
-            # 2. Distribuição por sexo
-            if 'SEXO' in df.columns:
-                sexo_counts = df['SEXO'].value_counts()
-                stats['sexo'] = {
-                    'labels': sexo_counts.index.tolist(),
-                    'data': sexo_counts.values.tolist()
-                }
-            
-            # 3. Distribuição por estado civil
-            if 'ESTADO_CIVIL' in df.columns:
-                estado_civil_counts = df['ESTADO_CIVIL'].value_counts()
-                stats['estado_civil'] = {
-                    'labels': estado_civil_counts.index.tolist(),
-                    'data': estado_civil_counts.values.tolist()
-                }
-            
-            # 4. Distribuição por dispensa
-            if 'DISPENSA' in df.columns:
-                dispensa_counts = df['DISPENSA'].value_counts()
-                stats['dispensa'] = {
-                    'labels': dispensa_counts.index.tolist(),
-                    'data': dispensa_counts.values.tolist()
-                }
-            
-            # 5. Distribuição por zona residencial
-            if 'ZONA_RESIDENCIAL' in df.columns:
-                zona_counts = df['ZONA_RESIDENCIAL'].value_counts()
-                stats['zona_residencial'] = {
-                    'labels': zona_counts.index.tolist(),
-                    'data': zona_counts.values.tolist()
-                }
-            
-            # 6. Distribuição por escolaridade
-            if 'ESCOLARIDADE' in df.columns:
-                escolaridade_counts = df['ESCOLARIDADE'].value_counts().head(8)
-                stats['escolaridade'] = {
-                    'labels': escolaridade_counts.index.tolist(),
-                    'data': escolaridade_counts.values.tolist()
-                }
-            
-            # 7. Distribuição por ano de nascimento
-            if 'ANO_NASCIMENTO' in df.columns:
-                # Converter para int e filtrar valores válidos
-                df['ANO_NASCIMENTO'] = pd.to_numeric(df['ANO_NASCIMENTO'], errors='coerce')
-                df_clean = df.dropna(subset=['ANO_NASCIMENTO'])
-                
-                if not df_clean.empty:
-                    # Agrupar por década
-                    df_clean['DECADA'] = (df_clean['ANO_NASCIMENTO'] // 10) * 10
-                    decada_counts = df_clean['DECADA'].value_counts().sort_index()
-                    stats['ano_nascimento'] = {
-                        'labels': [f"{int(d)}-{int(d)+9}" for d in decada_counts.index],
-                        'data': decada_counts.values.tolist()
-                    }
-            
-            # 8. Estatísticas físicas (se disponíveis)
-            physical_stats = {}
-            for col in ['PESO', 'ALTURA', 'CABECA', 'CALCADO', 'CINTURA']:
-                if col in df.columns:
-                    df[col] = pd.to_numeric(df[col], errors='coerce')
-                    df_clean = df.dropna(subset=[col])
-                    if not df_clean.empty:
-                        physical_stats[col.lower()] = {
-                            'media': float(df_clean[col].mean()),
-                            'mediana': float(df_clean[col].median()),
-                            'min': float(df_clean[col].min()),
-                            'max': float(df_clean[col].max())
-                        }
-            
-            if physical_stats:
-                stats['estatisticas_fisicas'] = physical_stats
-            
-            return stats
+            return self.compute_and_store_military_stats(upload)
             
         except Exception as e:
             logger.error(f"Erro ao obter estatísticas militares: {e}")
-            return {}
\ No newline at end of file
+            return {}
+    
+    def get_combined_military_stats(
+        self,
+        user_id: Optional[int] = None,
+        from_date: Optional[datetime] = None,
+        to_date: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """
+        Estatísticas militares combinadas de vários uploads
+        
+        Os agregados parciais gravados na ingestão são combinados, sem
+        reler nenhum CSV; o custo depende apenas da quantidade de uploads.
+        Uploads ainda sem agregado (ou com agregado ilegível) ficam de fora
+        e são contados em ``missing_aggregates``; o cálculo deles é feito
+        em segundo plano (``IngestQueue.start_aggregate_backfill``).
+        """
+        try:
+            query = self.db.query(Upload.id, UploadAggregate.partials_json).outerjoin(
+                UploadAggregate, UploadAggregate.upload_id == Upload.id
+            ).filter(Upload.status == UploadStatus.READY)
+            
+            if user_id is not None:
+                query = query.filter(Upload.user_id == user_id)
+            if from_date is not None:
+                query = query.filter(Upload.uploaded_at >= from_date)
+            if to_date is not None:
+                query = query.filter(Upload.uploaded_at <= to_date)
+            
+            rows = query.all()
+        except Exception as e:
+            logger.error(f"Erro ao combinar estatísticas militares: {e}")
+            return {
+                'total_uploads': 0,
+                'missing_aggregates': 0,
+                'military_stats': {}
+            }
+        
+        combined = MilitaryAggregate()
+        total_uploads = 0
+        missing = []
+        for upload_id, partials_json in rows:
+            if partials_json is None:
+                missing.append(upload_id)
+                continue
+            try:
+                partial = MilitaryAggregate.from_dict(json.loads(partials_json))
+            except Exception as e:
+                logger.warning(f"Agregado do upload {upload_id} ignorado: {e}")
+                missing.append(upload_id)
+                continue
+            combined.merge(partial)
+            total_uploads += 1
+        
+        if missing:
+            logger.info(f"{len(missing)} upload(s) sem agregado fora da combinação: {missing}")
+        
+        return {
+            'total_uploads': total_uploads,
+            'missing_aggregates': len(missing),
+            'military_stats': combined.finalize()
+        }
+    
+    def get_upload_ids_missing_aggregates(self) -> list:
+        """IDs de uploads prontos sem agregado parcial gravado ou com agregado ilegível"""
+        rows = self.db.query(Upload.id, UploadAggregate.partials_json).outerjoin(
+            UploadAggregate, UploadAggregate.upload_id == Upload.id
+        ).filter(Upload.status == UploadStatus.READY).order_by(Upload.id).yield_per(500)
+        return [upload_id for upload_id, partials_json in rows if not self._partials_readable(partials_json)]
+    
+    @staticmethod
+    def _partials_readable(partials_json: Optional[str]) -> bool:
+        if partials_json is None:
+            return False
+        try:
+            MilitaryAggregate.from_dict(json.loads(partials_json))
+        except Exception:
+            return False
+        return True
+    
+    def backfill_military_aggregate(self, upload_id: int) -> bool:
+        """Calcular e gravar o agregado de um upload pronto que não o tem (ou cujo agregado é ilegível)"""
+        upload = self.db.get(Upload, upload_id)
+        if upload is None or upload.status != UploadStatus.READY:
+            return False
+        existing = self.db.get(UploadAggregate, upload_id)
+        if existing is not None and self._partials_readable(existing.partials_json):
+            return False
+        self.compute_and_store_military_stats(upload)
+        return True
+    
+    def compute_and_store_military_stats(self, upload: Upload) -> Dict[str, Any]:
+        """Agregar o arquivo inteiro de um upload e gravar o resultado em upload_aggregates"""
+        from app.services.csv_service import CSVService
+        from app.services.file_service import FileService
+        
+        # A cópia colunar fornece só as colunas agregadas, já tipadas
+        columnar_service = ColumnarService()
+        columnar_path = columnar_service.get_path(upload.columnar_path)
+        if columnar_path is not None:
+            aggregate = aggregate_frames(columnar_service.iter_frames(columnar_path, AGGREGATE_COLUMNS))
+        else:
+            file_path = FileService().get_file_path(upload.stored_path)
+            encoding, separator = CSVService().sniff_format(file_path)
+            aggregate = aggregate_csv_file(file_path, encoding, separator, workers=settings.stats_workers)
+        
+        return self.store_military_aggregate(upload.id, aggregate)
+    
+    def store_military_aggregate(self, upload_id: int, aggregate: MilitaryAggregate) -> Dict[str, Any]:
+        """Gravar o agregado parcial e as estatísticas finais de um upload"""
+        stats = aggregate.finalize()
+        
+        row = self.db.get(UploadAggregate, upload_id)
+        if row is None:
+            row = UploadAggregate(upload_id=upload_id)
+            self.db.add(row)
+        row.military_stats_json = json.dumps(stats)
+        row.partials_json = json.dumps(aggregate.to_dict())
+        self.db.commit()
+        
+        return stats
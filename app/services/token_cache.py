@@ -0,0 +1,85 @@
+"""
+Cache de tokens de acesso já verificados
+
+A verificação da assinatura do JWT é feita uma vez por token; as
+requisições seguintes com o mesmo token resolvem o payload com uma
+consulta a um dicionário. As entradas são indexadas pelo SHA-256 do
+token (o token em si não fica em memória), expiram no ``exp`` do próprio
+token e o total é limitado por LRU.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from app.config import settings
+from app.security import verify_token
+
+
+class TokenCache:
+    """LRU de payloads verificados, com expiração no ``exp`` de cada token"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # digest -> (exp, payload)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        """Payload em cache do token, se ainda válido"""
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            exp, payload = entry
+            if exp <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return payload
+
+    def put(self, token: str, payload: dict):
+        """Guardar o payload verificado até o ``exp`` do token"""
+        exp = payload.get("exp")
+        if not isinstance(exp, (int, float)) or self.maxsize <= 0:
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (exp, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Esvaziar o cache"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Instância global do cache
+token_cache = TokenCache(settings.token_cache_size)
+
+
+def decode_access_token(token: str) -> dict:
+    """
+    Payload de um token de acesso válido
+
+    Tokens inválidos ou expirados levantam ``HTTPException`` 401 (via
+    ``verify_token``); payload sem ``user_id`` levanta ``ValueError``.
+    Retorna uma cópia, então o chamador pode alterá-la livremente.
+    """
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = verify_token(token)
+        # payload deve conter pelo menos user_id
+        if "user_id" not in payload:
+            raise ValueError("Falha ao decodificar token: Token inválido")
+        token_cache.put(token, payload)
+    return dict(payload)
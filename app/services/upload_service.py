@@ -1,34 +1,109 @@
 # app/services/upload_service.py
 
-from datetime import datetime
+from datetime import datetime, timedelta
+from app.services.columnar_service import ParquetSidecarWriter, columnar_available, sidecar_relative_path
 from app.services.csv_service import CSVService
-from app.services.file_service import FileService
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import desc
-from app.models import Upload, User
+from app.services.file_service import FileService, FileTooLargeError, gzip_relative_path
+from app.services.military_aggregates import MilitaryAggregate
+from app.services.row_index_service import RowIndexService, row_index_relative_path
+from app.services.search_service import SearchService
+from app.services.stats_service import StatsService
+from app.config import settings
+from sqlalchemy.orm import Session, joinedload, undefer, undefer_group
+from sqlalchemy import and_, desc, exists, func, or_, select
+from app.models import UPLOAD_BLOBS, Upload, UploadColumn, UploadStatus, User
+from collections import Counter
+import base64
 import json
-from fastapi import UploadFile
+from fastapi import HTTPException, UploadFile, status
 
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+def encode_upload_cursor(upload: Upload) -> str:
+    """Codificar a posição de um upload na listagem como cursor opaco"""
+    raw = f"{upload.uploaded_at.isoformat()}|{upload.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_upload_cursor(cursor: str):
+    """Decodificar um cursor da listagem em ``(uploaded_at, id)``"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        uploaded_at, upload_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(uploaded_at), int(upload_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Cursor de paginação inválido") from e
+
+
 class UploadService:
     def __init__(self, db: Session):
         self.db = db
         self.file_service = FileService()
         self.csv_service = CSVService()
 
-    def get_filtered_uploads(self, q: str = None, from_date: str = None, to_date: str = None, user_id: str = None, page: int = 1, page_size: int = 10):
-        query = self.db.query(Upload).options(joinedload(Upload.user)).join(User)
+    def get_filtered_uploads(
+        self,
+        q: str = None,
+        from_date: str = None,
+        to_date: str = None,
+        user_id: str = None,
+        page: int = 1,
+        page_size: int = 10,
+        cursor: str = None,
+        count: str = "exact"
+    ):
+        """
+        Listar uploads do mais recente para o mais antigo
+
+        Com ``cursor``, a página começa logo após o último upload da página
+        anterior (paginação por chave em ``(uploaded_at, id)``), sem OFFSET.
+        ``count`` controla o total: ``exact``, ``estimate`` (contagem
+        limitada a ``settings.listing_count_cap``) ou ``none``.
+        """
+        indexed = SearchService(self.db).has_index() if q else False
+        filters = self._listing_filters(q, from_date, to_date, user_id, indexed)
+
+        count_stmt = self._listing_count_statement(filters, count)
+        total = self.db.execute(count_stmt).scalar() if count_stmt is not None else None
+        uploads = self.db.execute(self._listing_statement(filters, page, page_size, cursor)).scalars().all()
+
+        return self._listing_page(uploads, total, count, page, page_size)
+
+    async def get_filtered_uploads_async(
+        self,
+        q: str = None,
+        from_date: str = None,
+        to_date: str = None,
+        user_id: str = None,
+        page: int = 1,
+        page_size: int = 10,
+        cursor: str = None,
+        count: str = "exact"
+    ):
+        """Versão de ``get_filtered_uploads`` para ``AsyncSession``"""
+        indexed = await SearchService(self.db).has_index_async() if q else False
+        filters = self._listing_filters(q, from_date, to_date, user_id, indexed)
+
+        count_stmt = self._listing_count_statement(filters, count)
+        total = (await self.db.execute(count_stmt)).scalar() if count_stmt is not None else None
+        uploads = (await self.db.execute(self._listing_statement(filters, page, page_size, cursor))).scalars().all()
+
+        return self._listing_page(uploads, total, count, page, page_size)
+
+    @staticmethod
+    def _listing_filters(q: str, from_date: str, to_date: str, user_id: str, indexed_search: bool) -> list:
+        """Filtros da listagem de uploads"""
+        filters = []
 
         if q:
-            query = query.filter(Upload.original_name.ilike(f"%{q}%"))
+            filters.append(SearchService.filename_filter(q, indexed_search))
 
         if from_date:
             try:
                 from_dt = datetime.strptime(from_date, "%Y-%m-%d")
-                query = query.filter(Upload.uploaded_at >= from_dt)
+                filters.append(Upload.uploaded_at >= from_dt)
             except ValueError:
                 pass
 
@@ -36,48 +111,93 @@ class UploadService:
             try:
                 to_dt = datetime.strptime(to_date, "%Y-%m-%d")
                 to_dt = to_dt.replace(hour=23, minute=59, second=59)
-                query = query.filter(Upload.uploaded_at <= to_dt)
+                filters.append(Upload.uploaded_at <= to_dt)
             except ValueError:
                 pass
 
         if user_id:
-            query = query.filter(Upload.user_id == user_id)
+            filters.append(Upload.user_id == user_id)
+
+        return filters
+
+    @staticmethod
+    def _listing_statement(filters: list, page: int, page_size: int, cursor: str = None):
+        """Consulta de uma página da listagem (com um item a mais, que indica a próxima página)"""
+        stmt = (
+            select(Upload)
+            .options(joinedload(Upload.user))
+            .where(*filters)
+            .order_by(desc(Upload.uploaded_at), desc(Upload.id))
+        )
+
+        if cursor:
+            cursor_at, cursor_id = decode_upload_cursor(cursor)
+            stmt = stmt.where(or_(
+                Upload.uploaded_at < cursor_at,
+                and_(Upload.uploaded_at == cursor_at, Upload.id < cursor_id)
+            ))
+        else:
+            stmt = stmt.offset((page - 1) * page_size)
+
+        return stmt.limit(page_size + 1)
+
+    @staticmethod
+    def _listing_count_statement(filters: list, mode: str):
+        """Consulta do total da listagem conforme o modo de contagem"""
+        if mode == "none":
+            return None
+
+        if mode == "estimate":
+            # Conta no máximo ``cap + 1`` linhas: o custo não cresce com a tabela
+            limited = select(Upload.id).where(*filters).limit(settings.listing_count_cap + 1).subquery()
+            return select(func.count()).select_from(limited)
+
+        return select(func.count(Upload.id)).where(*filters)
+
+    @staticmethod
+    def _listing_page(uploads: list, total: int, count: str, page: int, page_size: int) -> dict:
+        """Montar o resultado de uma página da listagem"""
+        has_next = len(uploads) > page_size
+        uploads = uploads[:page_size]
+
+        total_is_estimate = count == "estimate" and total > settings.listing_count_cap
+        if total_is_estimate:
+            total = settings.listing_count_cap
+        total_pages = (total + page_size - 1) // page_size if total is not None else None
 
-        total = query.count()
-        query = query.order_by(desc(Upload.uploaded_at))
-        offset = (page - 1) * page_size
-        uploads = query.offset(offset).limit(page_size).all()
-        total_pages = (total + page_size - 1) // page_size
-        
         return {
             "uploads": uploads,
             "total": total,
+            "total_is_estimate": total_is_estimate,
             "page": page,
             "page_size": page_size,
-            "total_pages": total_pages
+            "total_pages": total_pages,
+            "has_next": has_next,
+            "next_cursor": encode_upload_cursor(uploads[-1]) if has_next else None
         }
 
-    
     def process_and_save_upload(self, user_id: int, file: UploadFile):
-        # Salva o arquivo fisicamente
-        content = file.file.read()
-        stored_path, size_bytes = self.file_service.save_upload_file(content, file.filename)
-        
-        # Processa o CSV para obter informações
-        file_path = self.file_service.get_file_path(stored_path)
-        csv_info = self.csv_service.get_file_info(file_path)
+        """Salvar e processar o upload de forma síncrona"""
+        upload = self.create_pending_upload(user_id, file)
+        return self.process_upload(upload.id)
+
+    def create_pending_upload(self, user_id: int, file: UploadFile) -> Upload:
+        """Salvar o arquivo e registrar o upload como pendente de processamento"""
+        # Salva o arquivo fisicamente, em blocos, sem carregá-lo em memória
+        try:
+            stored_path, size_bytes, content_sha256 = self.file_service.save_upload_stream(file.file, file.filename)
+        except FileTooLargeError as e:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
         
-        # Salva as informações do upload no banco de dados
         upload = Upload(
             user_id=user_id,
             original_name=file.filename,
             stored_path=stored_path,
             size_bytes=size_bytes,
-            rows_total=csv_info["rows_total"],
-            cols_total=csv_info["cols_total"],
-            columns_json=json.dumps(csv_info["columns"]),
-            dtypes_json=json.dumps(csv_info["dtypes"]),
-            sample_rows_json=json.dumps(csv_info["sample_rows"])
+            content_sha256=content_sha256,
+            status=UploadStatus.PENDING
         )
         
         self.db.add(upload)
@@ -86,5 +206,239 @@ class UploadService:
         
         return upload
 
-    def get_upload_by_id(self, upload_id: int) -> Upload | None:
-        return self.db.query(Upload).filter(Upload.id == upload_id).first()
\ No newline at end of file
+    @staticmethod
+    def _claimable_filter(now: datetime):
+        """Uploads pendentes ou cujo processamento foi interrompido (sem conclusão há muito tempo)"""
+        stale_before = now - timedelta(minutes=settings.ingest_stale_minutes)
+        return or_(
+            Upload.status == UploadStatus.PENDING,
+            and_(
+                Upload.status == UploadStatus.PROCESSING,
+                or_(Upload.processing_started_at.is_(None), Upload.processing_started_at < stale_before)
+            )
+        )
+
+    def claim_upload(self, upload_id: int) -> bool:
+        """
+        Reivindicar um upload para processamento
+
+        A troca de status é um único UPDATE condicional: com vários
+        workers enfileirando os mesmos uploads, apenas um deles o processa.
+        """
+        now = datetime.utcnow()
+        claimed = self.db.query(Upload).filter(
+            Upload.id == upload_id,
+            self._claimable_filter(now)
+        ).update(
+            {Upload.status: UploadStatus.PROCESSING, Upload.processing_started_at: now},
+            synchronize_session=False
+        )
+        self.db.commit()
+        return claimed == 1
+
+    def process_upload(self, upload_id: int) -> Upload | None:
+        """Processar o CSV de um upload pendente e registrar seus metadados"""
+        if not self.claim_upload(upload_id):
+            logger.info(f"Upload {upload_id} já processado ou em processamento por outro worker")
+            return None
+        
+        upload = self.get_upload_by_id(upload_id)
+        
+        try:
+            # Processa o CSV para obter informações
+            file_path = self.file_service.get_file_path(upload.stored_path)
+            
+            # Valores nulos por coluna, contados no arquivo inteiro
+            null_counts = Counter()
+            consumers = [lambda chunk: null_counts.update(chunk.isna().sum().to_dict())]
+            
+            # Cópia colunar gravada na mesma leitura
+            sidecar = None
+            if columnar_available():
+                columnar_path = sidecar_relative_path(upload.stored_path)
+                sidecar = ParquetSidecarWriter(self.file_service.get_file_path(columnar_path))
+                consumers.append(sidecar)
+            
+            # Com um único worker, as estatísticas são agregadas na mesma leitura do perfil
+            aggregate = MilitaryAggregate() if settings.stats_workers <= 1 else None
+            if aggregate is not None:
+                consumers.append(aggregate.update)
+            
+            csv_info = self.csv_service.get_file_info(file_path, consumers, offset_stride=settings.row_index_stride)
+            
+            if csv_info["rows_total"] is None:
+                if sidecar is not None:
+                    sidecar.abort()
+                raise ValueError("Não foi possível processar o CSV")
+            
+            if not csv_info["complete"]:
+                # Leitura parcial: cópia e agregados cobririam só parte do arquivo
+                if sidecar is not None:
+                    sidecar.abort()
+                aggregate = None
+                null_counts = None
+            
+            upload.columnar_path = columnar_path if sidecar is not None and sidecar.close() else None
+            
+            # Índice esparso para paginar o arquivo inteiro
+            row_index_path = row_index_relative_path(upload.stored_path)
+            RowIndexService().write_index(
+                self.file_service.get_file_path(row_index_path),
+                csv_info["row_count"],
+                settings.row_index_stride,
+                csv_info["encoding"],
+                csv_info["separator"],
+                csv_info["columns"]
+            )
+            upload.row_index_path = row_index_path
+            upload.rows_total = csv_info["rows_total"]
+            upload.bad_lines_total = csv_info["bad_lines"]
+            upload.cols_total = csv_info["cols_total"]
+            upload.columns_json = json.dumps(csv_info["columns"])
+            upload.dtypes_json = json.dumps(csv_info["dtypes"])
+            upload.sample_rows_json = json.dumps(csv_info["sample_rows"])
+            self._replace_upload_columns(upload, csv_info["columns"], csv_info["dtypes"], null_counts)
+            
+            # Agregados servidos pelo dashboard, calculados uma única vez
+            stats_service = StatsService(self.db)
+            if aggregate is not None:
+                stats_service.store_military_aggregate(upload.id, aggregate)
+            elif csv_info["complete"]:
+                stats_service.compute_and_store_military_stats(upload)
+            
+            upload.status = UploadStatus.READY
+            upload.error_message = csv_info["error"]
+        except Exception as e:
+            logger.error(f"Erro ao processar upload {upload_id}: {e}")
+            self.db.rollback()
+            upload.status = UploadStatus.FAILED
+            upload.error_message = str(e)
+        
+        self.db.commit()
+        self.db.refresh(upload)
+        
+        return upload
+
+    def _replace_upload_columns(self, upload: Upload, columns: list, dtypes: dict, null_counts: dict = None):
+        """Gravar os metadados normalizados das colunas de um upload"""
+        self.db.query(UploadColumn).filter(UploadColumn.upload_id == upload.id).delete(synchronize_session=False)
+        self.db.add_all([
+            UploadColumn(
+                upload_id=upload.id,
+                position=position,
+                name=str(name),
+                dtype=dtypes.get(name, 'string'),
+                null_count=int(null_counts[name]) if null_counts is not None and name in null_counts else None
+            )
+            for position, name in enumerate(columns)
+        ])
+
+    def backfill_upload_columns(self) -> int:
+        """
+        Preencher upload_columns para uploads gravados antes da tabela existir
+
+        Uploads sem colunas (``columns_json`` vazio ou ``"[]"``) não são
+        selecionados; os com ``columns_json`` ilegível são apenas
+        registrados no log e mantidos como estão, sem apagar o dado de
+        origem. Só ``columns_json`` e ``dtypes_json`` são carregados (as
+        amostras de linhas ficam de fora). Retorna quantos uploads tiveram
+        colunas gravadas.
+        """
+        uploads = self.db.query(Upload).options(
+            undefer(Upload.columns_json),
+            undefer(Upload.dtypes_json)
+        ).filter(
+            Upload.columns_json.isnot(None),
+            Upload.columns_json.notin_(['', '[]']),
+            ~exists().where(UploadColumn.upload_id == Upload.id)
+        ).all()
+        
+        written = 0
+        for upload in uploads:
+            try:
+                columns = json.loads(upload.columns_json)
+            except (json.JSONDecodeError, TypeError):
+                columns = None
+            if not isinstance(columns, list):
+                logger.warning(f"columns_json ilegível no upload {upload.id}; colunas não preenchidas")
+                continue
+            if not columns:
+                upload.columns_json = '[]'
+                continue
+            try:
+                dtypes = json.loads(upload.dtypes_json) if upload.dtypes_json else {}
+            except (json.JSONDecodeError, TypeError):
+                dtypes = {}
+            self._replace_upload_columns(upload, columns, dtypes if isinstance(dtypes, dict) else {})
+            written += 1
+        
+        self.db.commit()
+        return written
+
+    def discard_upload(self, upload: Upload):
+        """Remover um upload e seus arquivos (ex.: quando não pôde ser enfileirado)"""
+        self.file_service.delete_file(upload.stored_path)
+        derived_paths = (upload.columnar_path, upload.row_index_path, gzip_relative_path(upload.stored_path))
+        for derived_path in derived_paths:
+            if derived_path:
+                self.file_service.delete_file(derived_path)
+        self.db.delete(upload)
+        self.db.commit()
+
+    def get_unfinished_upload_ids(self) -> list:
+        """IDs de uploads pendentes ou interrompidos durante o processamento"""
+        rows = self.db.query(Upload.id).filter(
+            self._claimable_filter(datetime.utcnow())
+        ).order_by(Upload.id).all()
+        return [row.id for row in rows]
+
+    def get_upload_rows(self, upload: Upload, offset: int, limit: int) -> dict:
+        """Janela de linhas de dados do arquivo de um upload"""
+        row_index_service = RowIndexService()
+        index = row_index_service.load_index(upload.row_index_path)
+        file_path = self.file_service.get_file_path(upload.stored_path)
+        
+        if index is None:
+            # Upload anterior ao índice: gerar uma única vez
+            info = self.csv_service.get_file_info(file_path, offset_stride=settings.row_index_stride)
+            if info["rows_total"] is None:
+                raise ValueError("Não foi possível processar o CSV")
+            row_index_path = row_index_relative_path(upload.stored_path)
+            row_index_service.write_index(
+                self.file_service.get_file_path(row_index_path),
+                info["row_count"],
+                settings.row_index_stride,
+                info["encoding"],
+                info["separator"],
+                info["columns"]
+            )
+            upload.row_index_path = row_index_path
+            self.db.commit()
+            index = row_index_service.load_index(row_index_path)
+        
+        return {
+            "upload_id": upload.id,
+            "offset": offset,
+            "limit": limit,
+            "rows_total": index["rows"],
+            "columns": index["columns"],
+            "rows": row_index_service.read_rows(file_path, index, offset, limit)
+        }
+
+    def get_upload_by_id(self, upload_id: int, include_blobs: bool = False) -> Upload | None:
+        """Obter upload por ID; ``include_blobs`` carrega também os JSONs de metadados"""
+        query = self.db.query(Upload).filter(Upload.id == upload_id)
+        if include_blobs:
+            query = query.options(undefer_group(UPLOAD_BLOBS))
+        return query.first()
+
+    def ensure_content_hash(self, upload: Upload) -> str:
+        """Hash do conteúdo do upload, calculado e gravado se ainda não existir (uploads antigos)"""
+        if not upload.content_sha256:
+            upload.content_sha256 = self.file_service.hash_file(upload.stored_path)
+            self.db.commit()
+        return upload.content_sha256
+
+    async def get_upload_by_id_async(self, upload_id: int) -> Upload | None:
+        """Versão de ``get_upload_by_id`` para ``AsyncSession``"""
+        return (await self.db.execute(select(Upload).where(Upload.id == upload_id))).scalars().first()
\ No newline at end of file
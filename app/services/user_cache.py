@@ -0,0 +1,84 @@
+"""
+Cache de usuários por worker
+
+``get_user_object`` resolve o usuário autenticado a cada página de conta
+e perfil. O cache guarda, por ``USER_CACHE_TTL`` segundos, um instantâneo
+imutável e desacoplado da sessão (sem o hash da senha) em vez do objeto
+ORM. ``AuthService`` invalida a entrada quando a senha muda ou o usuário
+é excluído.
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from app.config import settings
+from app.models import User, UserRole
+
+
+@dataclass(frozen=True, slots=True)
+class UserSnapshot:
+    """Instantâneo imutável de um usuário"""
+    id: int
+    name: str
+    email: str
+    role: UserRole
+    created_at: Optional[datetime]
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        return cls(
+            id=user.id,
+            name=user.name,
+            email=user.email,
+            role=user.role,
+            created_at=user.created_at
+        )
+
+
+class UserCache:
+    """LRU de instantâneos de usuários com TTL"""
+
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # user_id -> (expira_em, snapshot)
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[UserSnapshot]:
+        """Instantâneo do usuário, se presente e dentro do TTL"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, snapshot = entry
+            if expires_at <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return snapshot
+
+    def put(self, snapshot: UserSnapshot):
+        """Guardar o instantâneo de um usuário"""
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[snapshot.id] = (time.monotonic() + self.ttl, snapshot)
+            self._entries.move_to_end(snapshot.id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        """Descartar a entrada de um usuário"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        """Esvaziar o cache"""
+        with self._lock:
+            self._entries.clear()
+
+
+# Instância global do cache
+user_cache = UserCache(settings.user_cache_ttl, settings.user_cache_size)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark da serialização de uma página da listagem de uploads
+
+Compara o caminho anterior (objetos ORM pelo ``jsonable_encoder`` do
+FastAPI + ``JSONResponse``) com o atual (``serialize_upload`` +
+``ORJSONResponse``).
+
+Uso: python scripts/benchmark_serialization.py [--page-size 100] [--repeat 200]
+"""
+import argparse
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm.attributes import set_committed_value
+from app.models import Upload, UploadStatus, User, UserRole
+from app.responses import ORJSONResponse
+from app.serializers import serialize_upload
+
+
+def build_page(page_size: int) -> list:
+    """Uploads em memória equivalentes a uma página da listagem"""
+    user = User(id=1, name="Operador", email="operador@example.com", password_hash="x" * 60, role=UserRole.OPERATOR)
+    base = datetime(2024, 1, 1)
+    uploads = [
+        Upload(
+            id=i,
+            user_id=user.id,
+            original_name=f"efetivo_{i}.csv",
+            stored_path=f"2024/01/efetivo_{i}.csv",
+            size_bytes=1024 * i,
+            content_sha256="0" * 64,
+            uploaded_at=base + timedelta(minutes=i),
+            status=UploadStatus.READY,
+            rows_total=10000 + i,
+            bad_lines_total=0,
+            cols_total=12
+        )
+        for i in range(page_size)
+    ]
+    # Como num joinedload: o autor é carregado sem popular user.uploads
+    for upload in uploads:
+        set_committed_value(upload, "user", user)
+    return uploads
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    uploads = build_page(args.page_size)
+
+    def before():
+        JSONResponse({"uploads": jsonable_encoder(uploads)}).body
+
+    def after():
+        ORJSONResponse({"uploads": [serialize_upload(upload, include_user=True) for upload in uploads]}).body
+
+    print(f"Página com {args.page_size} uploads, {args.repeat} repetições")
+    results = {}
+    for name, func in (("jsonable_encoder + JSONResponse", before), ("serialize_upload + ORJSONResponse", after)):
+        seconds = min(timeit.repeat(func, number=args.repeat, repeat=3)) / args.repeat
+        results[name] = seconds
+        print(f"  {name:<36} {seconds * 1000:8.3f} ms/página")
+
+    slow, fast = results.values()
+    print(f"  Ganho: {slow / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Calibração do custo do hash de senhas para este servidor
+
+Mede o tempo do bcrypt em cada custo (log2 das iterações) e sugere o
+maior custo cuja mediana cabe no orçamento de latência. O valor vai para
+PASSWORD_HASH_ROUNDS; senhas com outro custo são regravadas no próximo
+login bem-sucedido.
+
+O ``bcrypt_sha256`` do passlib aplica HMAC-SHA256 antes do bcrypt; o
+custo é dominado pelo bcrypt, medido aqui diretamente.
+
+Uso: python scripts/calibrate_password_hash.py [--target-ms 250] [--samples 5] [--min-rounds 10] [--max-rounds 16]
+"""
+import argparse
+import statistics
+import time
+import bcrypt
+
+
+def measure(rounds: int, samples: int) -> float:
+    """Mediana, em ms, de um hash bcrypt no custo informado"""
+    password = b"calibracao-" + bytes(16)
+    timings = []
+    for _ in range(samples):
+        salt = bcrypt.gensalt(rounds=rounds)
+        start = time.perf_counter()
+        bcrypt.hashpw(password, salt)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target-ms", type=float, default=250, help="Orçamento de latência por hash (ms)")
+    parser.add_argument("--samples", type=int, default=5, help="Medições por custo")
+    parser.add_argument("--min-rounds", type=int, default=10, help="Menor custo aceito")
+    parser.add_argument("--max-rounds", type=int, default=16, help="Maior custo testado")
+    args = parser.parse_args()
+
+    chosen = None
+    for rounds in range(args.min_rounds, args.max_rounds + 1):
+        median_ms = measure(rounds, args.samples)
+        fits = median_ms <= args.target_ms
+        print(f"custo {rounds:2d}: {median_ms:8.1f} ms {'ok' if fits else 'acima do orçamento'}")
+        if not fits:
+            break
+        chosen = rounds
+
+    print()
+    if chosen is None:
+        chosen = args.min_rounds
+        print(f"Atenção: nem o custo mínimo ({args.min_rounds}) cabe em {args.target_ms:.0f} ms neste servidor.")
+    print(f"PASSWORD_HASH_ROUNDS={chosen}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+"""
+Configuração comum dos testes
+"""
+import os
+
+# Settings exige SECRET_KEY; permite rodar os testes sem arquivo .env
+os.environ.setdefault("SECRET_KEY", "test_secret_key")
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+@pytest.fixture
+def db():
+    """Sessão em um banco SQLite em memória"""
+    from app.db import Base
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
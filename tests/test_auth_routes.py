@@ -0,0 +1,98 @@
+"""
+Testes das rotas de autenticação e das regras de cadastro
+
+As rotas são testadas com o serviço de autenticação substituído, sem banco.
+"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.dependencies.auth import get_async_auth_service, get_auth_service
+from app.models import User, UserRole
+from app.routers.v1 import auth as auth_routes
+from app.services.auth_service import AuthService
+from app.services.login_throttle import LoginThrottle
+
+
+class StubAuthService:
+    """Serviço de autenticação que apenas registra as chamadas"""
+
+    def __init__(self):
+        self.calls = []
+
+    def validate_new_user(self, email, role=None):
+        self.calls.append(("validate_new_user", email))
+        raise ValueError("Email já está em uso")
+
+    def create_user(self, *args, **kwargs):
+        self.calls.append(("create_user", args))
+
+    async def authenticate_user_async(self, email, password):
+        self.calls.append(("authenticate_user_async", email))
+        return None
+
+
+@pytest.fixture
+def stub_service():
+    return StubAuthService()
+
+
+@pytest.fixture
+def client(stub_service):
+    app = FastAPI()
+    app.include_router(auth_routes.router, prefix="/auth")
+    app.dependency_overrides[get_auth_service] = lambda: stub_service
+    app.dependency_overrides[get_async_auth_service] = lambda: stub_service
+    return TestClient(app)
+
+
+def test_register_validates_before_hashing(client, stub_service, monkeypatch):
+    """Teste de que um email em uso é recusado sem ocupar o pool de senhas"""
+    hashed = []
+
+    async def fake_hash(password):
+        hashed.append(password)
+        return "hash"
+
+    monkeypatch.setattr(auth_routes.password_pool, "hash", fake_hash)
+
+    response = client.post("/auth/register", json={
+        "name": "Usuário", "email": "user@teste.com", "password": "123456", "confirm_password": "123456"
+    })
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Email já está em uso"
+    assert hashed == []
+    assert stub_service.calls == [("validate_new_user", "user@teste.com")]
+
+
+def test_throttled_login_skips_password_check(client, stub_service, monkeypatch):
+    """Teste de que uma tentativa recusada pelo limitador não chega à verificação de senha"""
+    throttle = LoginThrottle(
+        ip_burst=10, ip_per_minute=0,
+        email_burst=1, email_per_minute=0,
+        email_global_burst=10, email_global_per_minute=0,
+        max_keys=100
+    )
+    monkeypatch.setattr(auth_routes, "login_throttle", throttle)
+    credentials = {"email": "alvo@teste.com", "password": "errada"}
+
+    assert client.post("/auth/login", json=credentials).status_code == 401
+    response = client.post("/auth/login", json=credentials)
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert stub_service.calls == [("authenticate_user_async", "alvo@teste.com")]
+
+
+def test_validate_new_user(db):
+    """Teste das regras de cadastro verificadas antes do hash da senha"""
+    service = AuthService(db)
+    assert service.validate_new_user("primeiro@teste.com") == UserRole.OPERATOR
+
+    db.add(User(name="Operador", email="op@teste.com", password_hash="x", role=UserRole.OPERATOR))
+    db.commit()
+    assert service.validate_new_user("novo@teste.com") == UserRole.USER
+    with pytest.raises(ValueError):
+        service.validate_new_user("op@teste.com")
+    with pytest.raises(ValueError):
+        service.validate_new_user("outro@teste.com", UserRole.OPERATOR)
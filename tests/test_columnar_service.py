@@ -0,0 +1,94 @@
+"""
+Testes da cópia colunar dos uploads
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+from app.services.columnar_service import ColumnarService, ParquetSidecarWriter
+from app.services.csv_service import CSVService
+from app.services.military_aggregates import AGGREGATE_COLUMNS, aggregate_csv_file, aggregate_frames
+
+
+@pytest.fixture
+def military_csv(tmp_path):
+    """CSV com colunas militares, valores ausentes e uma coluna de texto"""
+    rng = np.random.default_rng(0)
+    rows = 12000
+    df = pd.DataFrame({
+        "UF_NASCIMENTO": rng.choice(["SP", "RJ", "MG"], rows),
+        "SEXO": rng.choice(["M", "F"], rows),
+        "ANO_NASCIMENTO": rng.integers(1970, 2005, rows),
+        "PESO": rng.normal(72, 10, rows).round(1),
+        "OBS": ["texto"] * rows,
+    })
+    df["ANO_NASCIMENTO"] = df["ANO_NASCIMENTO"].astype("Int64")
+    df.loc[7000::50, "ANO_NASCIMENTO"] = pd.NA
+    file_path = tmp_path / "militar.csv"
+    df.to_csv(file_path, sep=";", index=False)
+    return file_path
+
+
+def test_sidecar_written_in_profile_pass(military_csv):
+    """Teste de que a cópia Parquet é gravada na mesma leitura do perfil"""
+    parquet_path = military_csv.with_suffix(".parquet")
+    writer = ParquetSidecarWriter(parquet_path)
+
+    info = CSVService().get_file_info(military_csv, [writer])
+
+    assert writer.close()
+    frames = list(ColumnarService().iter_frames(parquet_path, ["SEXO", "ANO_NASCIMENTO", "INEXISTENTE"]))
+    table = pd.concat(frames)
+    assert list(table.columns) == ["SEXO", "ANO_NASCIMENTO"]
+    assert len(table) == info["rows_total"] == 12000
+    # Inteiros continuam inteiros, mesmo com valores ausentes
+    assert pq.ParquetFile(parquet_path).schema_arrow.field("ANO_NASCIMENTO").type == pa.int64()
+    assert pq.ParquetFile(parquet_path).schema_arrow.field("PESO").type == pa.float64()
+
+    encoding, separator = info["encoding"], info["separator"]
+    from_csv = aggregate_csv_file(military_csv, encoding, separator).finalize()
+    from_parquet = aggregate_frames(ColumnarService().iter_frames(parquet_path, AGGREGATE_COLUMNS)).finalize()
+    assert from_parquet["sexo"] == from_csv["sexo"]
+    assert from_parquet["ano_nascimento"] == from_csv["ano_nascimento"]
+    assert from_parquet["uf_nascimento"] == from_csv["uf_nascimento"]
+
+
+def test_sidecar_promotes_column_on_type_change(tmp_path):
+    """Teste de que um valor fora do tipo promove só a coluna afetada, sem descartar a cópia"""
+    file_path = tmp_path / "tipos.csv"
+    lines = [f"{i};{i * 2};{i}.5;{i}" for i in range(6000)] + ["ABC12;1;2;2.5"]
+    file_path.write_text("COD;DOBRO;MEIO;NOTA\n" + "\n".join(lines) + "\n")
+    parquet_path = file_path.with_suffix(".parquet")
+    writer = ParquetSidecarWriter(parquet_path)
+
+    CSVService().get_file_info(file_path, [writer])
+
+    assert writer.close()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["tipos.csv", "tipos.parquet"]
+    table = pq.read_table(parquet_path)
+    assert table.schema.field("COD").type == pa.string()
+    assert table.schema.field("DOBRO").type == pa.int64()
+    assert table.schema.field("MEIO").type == pa.float64()
+    assert table.schema.field("NOTA").type == pa.float64()
+    cod = table.column("COD").to_pylist()
+    assert cod[:3] == ["0", "1", "2"]
+    assert cod[5999:] == ["5999", "ABC12"]
+    assert table.column("DOBRO").to_pylist()[-2:] == [11998, 1]
+    assert table.column("NOTA").to_pylist()[-2:] == [5999.0, 2.5]
+
+
+def test_sidecar_keeps_large_integers_exact(tmp_path):
+    """Teste de que inteiros acima de 2**53 não perdem precisão"""
+    file_path = tmp_path / "ids.csv"
+    ids = [2 ** 53 + i for i in range(1, 4)]
+    file_path.write_text("ID\n" + "\n".join(str(i) for i in ids) + "\n")
+    parquet_path = file_path.with_suffix(".parquet")
+    writer = ParquetSidecarWriter(parquet_path)
+
+    CSVService().get_file_info(file_path, [writer])
+
+    assert writer.close()
+    assert pq.read_table(parquet_path).column("ID").to_pylist() == ids
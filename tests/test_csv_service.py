@@ -0,0 +1,57 @@
+"""
+Testes do processamento de CSV
+"""
+import pytest
+from app.services.csv_service import CSVService
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    """Arquivo CSV com separador ';' e encoding latin-1"""
+    rows = ["NOME;IDADE;PESO"]
+    rows += [f"João {i};{i};{70.5 + i}" for i in range(12000)]
+    file_path = tmp_path / "dados.csv"
+    file_path.write_text("\n".join(rows) + "\n", encoding="latin-1")
+    return file_path
+
+
+def test_get_file_info_single_pass(csv_file):
+    """Teste de que o perfil do arquivo e os consumidores usam a mesma leitura do pandas"""
+    chunk_sizes = []
+    info = CSVService().get_file_info(csv_file, [lambda chunk: chunk_sizes.append(len(chunk))])
+
+    assert info["separator"] == ";"
+    assert info["rows_total"] == 12000
+    assert info["cols_total"] == 3
+    assert info["columns"] == ["NOME", "IDADE", "PESO"]
+    assert info["dtypes"] == {"NOME": "string", "IDADE": "int", "PESO": "float"}
+    assert len(info["sample_rows"]) == 100
+    assert info["sample_rows"][0]["NOME"] == "João 0"
+    assert sum(chunk_sizes) == 12000
+
+
+def test_get_file_info_empty_file(tmp_path):
+    """Teste de arquivo vazio"""
+    file_path = tmp_path / "vazio.csv"
+    file_path.write_bytes(b"")
+
+    info = CSVService().get_file_info(file_path)
+
+    assert info["rows_total"] is None
+    assert info["columns"] == []
+
+
+def test_get_file_info_partial_on_late_decode_error(tmp_path):
+    """Teste de que bytes inválidos após o trecho de detecção geram um resultado parcial"""
+    rows = ["NOME;IDADE"] + [f"Nome {i};{i}" for i in range(20000)]
+    file_path = tmp_path / "misto.csv"
+    file_path.write_bytes(("\n".join(rows) + "\n").encode("ascii") + b"Jo\xe3o;1\n")
+    chunk_sizes = []
+
+    info = CSVService().get_file_info(file_path, [lambda chunk: chunk_sizes.append(len(chunk))])
+
+    assert info["complete"] is False
+    assert "encoding" in info["error"]
+    assert info["columns"] == ["NOME", "IDADE"]
+    assert info["rows_total"] == 20001
+    assert 0 < sum(chunk_sizes) < 20001
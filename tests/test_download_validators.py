@@ -0,0 +1,74 @@
+"""
+Testes de ETag, GET condicional e Range nos downloads
+"""
+import gzip
+import hashlib
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from app.responses import accepts_gzip, conditional_file_response, is_not_modified, strong_etag
+from app.services.file_service import FileService
+
+
+def test_is_not_modified():
+    """Teste da avaliação de If-None-Match e If-Modified-Since"""
+    etag = strong_etag("abc")
+    assert is_not_modified({"if-none-match": '"x", "abc"'}, etag, 0)
+    assert is_not_modified({"if-none-match": 'W/"abc"'}, etag, 0)
+    assert is_not_modified({"if-none-match": "*"}, etag, 0)
+    assert not is_not_modified({"if-none-match": '"abc-gzip"'}, etag, 0)
+    # If-None-Match tem precedência sobre If-Modified-Since
+    assert not is_not_modified({"if-none-match": '"x"', "if-modified-since": "Sat, 01 Jan 2100 00:00:00 GMT"}, etag, 0)
+    assert is_not_modified({"if-modified-since": "Sat, 01 Jan 2000 00:00:00 GMT"}, etag, 946684800)
+    assert not is_not_modified({"if-modified-since": "data inválida"}, etag, 0)
+
+
+def test_accepts_gzip():
+    """Teste da negociação de gzip"""
+    assert accepts_gzip("br, gzip;q=0.8")
+    assert not accepts_gzip("gzip;q=0, identity")
+    assert not accepts_gzip(None)
+
+
+def test_conditional_file_response(tmp_path):
+    """Teste de 304, Range simples, If-Range e várias faixas"""
+    path = tmp_path / "dados.csv"
+    path.write_bytes(b"0123456789abcdef")
+    etag = strong_etag("hash")
+
+    app = FastAPI()
+
+    @app.get("/arquivo")
+    def arquivo(request: Request):
+        return conditional_file_response(request.headers, path, "dados.csv", "text/csv", etag)
+
+    client = TestClient(app)
+    response = client.get("/arquivo")
+    assert response.status_code == 200
+    assert response.headers["etag"] == etag
+
+    assert client.get("/arquivo", headers={"if-none-match": etag}).status_code == 304
+
+    response = client.get("/arquivo", headers={"range": "bytes=10-", "if-range": etag})
+    assert response.status_code == 206
+    assert response.content == b"abcdef"
+
+    response = client.get("/arquivo", headers={"range": "bytes=10-", "if-range": '"outro"'})
+    assert response.status_code == 200
+    assert response.content == b"0123456789abcdef"
+
+    response = client.get("/arquivo", headers={"range": "bytes=0-1,4-5"})
+    assert response.status_code == 206
+    assert response.headers["content-type"].startswith("multipart/byteranges")
+
+
+def test_gzip_variant(tmp_path, monkeypatch):
+    """Teste da variante gzip gerada uma vez e reaproveitada"""
+    monkeypatch.setattr("app.config.settings.uploads_dir", str(tmp_path))
+    (tmp_path / "dados.csv").write_bytes(b"A;B\n1;2\n" * 1000)
+    service = FileService()
+
+    gzip_path = service.get_gzip_variant("dados.csv")
+    assert gzip.decompress(gzip_path.read_bytes()) == b"A;B\n1;2\n" * 1000
+    mtime = gzip_path.stat().st_mtime_ns
+    assert service.get_gzip_variant("dados.csv").stat().st_mtime_ns == mtime
+    assert service.hash_file("dados.csv") == hashlib.sha256(b"A;B\n1;2\n" * 1000).hexdigest()
@@ -0,0 +1,90 @@
+"""
+Testes da exportação do conteúdo dos uploads
+"""
+import io
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from app.models import Upload
+from app.services import export_service
+from app.services.export_service import ExportService, create_export_token, read_export_token
+
+
+@pytest.fixture
+def upload(tmp_path, monkeypatch):
+    """Upload com CSV de vários blocos no diretório de uploads temporário"""
+    monkeypatch.setattr("app.config.settings.uploads_dir", str(tmp_path))
+    monkeypatch.setattr(export_service, "BATCH_SIZE", 700)
+    rng = np.random.default_rng(1)
+    rows = 2500
+    df = pd.DataFrame({
+        "NOME": [f"Nome {i}" for i in range(rows)],
+        "UF": rng.choice(["SP", "RJ", None], rows),
+        "PESO": rng.normal(72, 10, rows).round(1),
+    })
+    df.to_csv(tmp_path / "dados.csv", sep=";", index=False)
+    return Upload(stored_path="dados.csv", original_name="dados.csv", columnar_path=None)
+
+
+def test_export_csv_and_ndjson(upload):
+    """Teste da exportação em CSV e NDJSON com projeção de colunas"""
+    service = ExportService()
+    expected = pd.read_csv(service.file_service.get_file_path(upload.stored_path), sep=";", dtype=str)[["UF", "NOME"]]
+
+    chunks = list(service.export_upload(upload, "csv", ["UF", "NOME"]))
+    assert len(chunks) > 2  # cabeçalho + um bloco por leitura
+    exported = pd.read_csv(io.BytesIO(b"".join(chunks)), dtype=str)
+    pd.testing.assert_frame_equal(exported, expected)
+
+    lines = b"".join(service.export_upload(upload, "ndjson", ["UF", "NOME"])).splitlines()
+    assert len(lines) == len(expected)
+    records = [json.loads(line) for line in lines]
+    assert [r["NOME"] for r in records] == expected["NOME"].tolist()
+    assert [r["UF"] for r in records] == expected["UF"].astype(object).where(expected["UF"].notna(), None).tolist()
+
+
+def test_export_parquet(upload):
+    """Teste da exportação em Parquet gravada em vários row groups"""
+    pq = pytest.importorskip("pyarrow.parquet")
+    data = b"".join(ExportService().export_upload(upload, "parquet", ["NOME", "PESO"]))
+
+    parquet_file = pq.ParquetFile(io.BytesIO(data))
+    assert parquet_file.num_row_groups == 4
+    exported = parquet_file.read().to_pandas()
+    assert exported["NOME"].tolist() == [f"Nome {i}" for i in range(2500)]
+    assert str(parquet_file.schema_arrow.field("PESO").type) == "string"
+
+
+def test_export_validation(upload):
+    """Teste de formato e colunas inválidos"""
+    with pytest.raises(ValueError):
+        ExportService().export_upload(upload, "xlsx")
+    with pytest.raises(ValueError):
+        ExportService().export_upload(upload, "csv", ["INEXISTENTE"])
+
+
+def test_export_token():
+    """Teste do link assinado de exportação"""
+    token = create_export_token(1, 2, "ndjson", ["NOME"])
+    assert read_export_token(token) == {"upload_id": 1, "user_id": 2, "format": "ndjson", "columns": ["NOME"]}
+    assert read_export_token(token[:-2] + "xx") is None
+
+
+
+@pytest.mark.parametrize("fmt", ["csv", "ndjson", "parquet"])
+def test_export_same_output_with_and_without_sidecar(upload, tmp_path, fmt):
+    """Teste de que a exportação não depende de a cópia colunar existir"""
+    if fmt == "parquet":
+        pytest.importorskip("pyarrow.parquet")
+    pd.read_csv(tmp_path / "dados.csv", sep=";").to_parquet(tmp_path / "dados.parquet")
+    service = ExportService()
+
+    without_sidecar = b"".join(service.export_upload(upload, fmt, ["UF", "PESO"]))
+    upload.columnar_path = "dados.parquet"
+    with_sidecar = b"".join(service.export_upload(upload, fmt, ["UF", "PESO"]))
+
+    assert with_sidecar == without_sidecar
+    if fmt == "ndjson":
+        first = json.loads(with_sidecar.splitlines()[0])
+        assert isinstance(first["PESO"], str)
@@ -0,0 +1,37 @@
+"""
+Testes do armazenamento de arquivos
+"""
+import hashlib
+import io
+import pytest
+from app.services.file_service import FileService, FileTooLargeError
+
+
+@pytest.fixture
+def file_service(tmp_path):
+    """Serviço de arquivos apontando para um diretório temporário"""
+    service = FileService()
+    service.uploads_dir = tmp_path
+    service.chunk_size = 4
+    return service
+
+
+def test_save_upload_stream_hash_and_size(file_service):
+    """Teste de gravação em blocos com cálculo do SHA-256"""
+    content = b"a,b,c\n1,2,3\n"
+
+    relative_path, size_bytes, sha256 = file_service.save_upload_stream(io.BytesIO(content), "dados.csv")
+
+    assert size_bytes == len(content)
+    assert sha256 == hashlib.sha256(content).hexdigest()
+    assert file_service.get_file_path(relative_path).read_bytes() == content
+
+
+def test_save_upload_stream_too_large(file_service):
+    """Teste de que uploads acima do limite são abortados e removidos"""
+    file_service.max_size_bytes = 10
+
+    with pytest.raises(FileTooLargeError):
+        file_service.save_upload_stream(io.BytesIO(b"x" * 11), "grande.csv")
+
+    assert not any(path.is_file() for path in file_service.uploads_dir.rglob("*"))
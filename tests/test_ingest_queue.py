@@ -0,0 +1,140 @@
+"""
+Testes da fila de processamento de uploads
+"""
+import threading
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.db import Base
+from app.models import Upload, UploadAggregate, UploadStatus, User, UserRole
+from app.services.ingest_queue import IngestQueue, IngestQueueFull
+from app.services.upload_service import UploadService
+
+
+def test_queue_rejects_when_full(monkeypatch):
+    """Teste de que a fila recusa uploads além da capacidade"""
+    queue = IngestQueue(max_workers=1, max_pending=1)
+    release = threading.Event()
+    processed = []
+
+    def fake_run(upload_id):
+        release.wait(timeout=5)
+        processed.append(upload_id)
+
+    monkeypatch.setattr(queue, "_run", fake_run)
+
+    queue.submit(1)
+    queue.submit(2)
+    assert queue.is_full()
+    with pytest.raises(IngestQueueFull):
+        queue.submit(3)
+
+    release.set()
+    queue.shutdown(wait=True)
+
+    assert processed == [1, 2]
+    assert not queue.is_full()
+
+
+def test_requeue_returns_submitted_count(db, monkeypatch):
+    """Teste de que o total reenfileirado desconsidera os recusados por fila cheia"""
+    queue = IngestQueue(max_workers=1, max_pending=1)
+    release = threading.Event()
+    monkeypatch.setattr(queue, "_run", lambda upload_id: release.wait(timeout=5))
+    monkeypatch.setattr(
+        "app.services.ingest_queue.UploadService.get_unfinished_upload_ids",
+        lambda self: [1, 2, 3, 4]
+    )
+    monkeypatch.setattr(queue, "session_factory", lambda: db)
+
+    assert queue.requeue_unfinished() == 2
+
+    release.set()
+    queue.shutdown(wait=True)
+
+
+def test_claim_upload_is_exclusive(db):
+    """Teste de que apenas uma reivindicação do mesmo upload é aceita"""
+    user = User(name="Usuário", email="user@teste.com", password_hash="x", role=UserRole.USER)
+    db.add(user)
+    db.commit()
+    pending = Upload(user_id=user.id, original_name="a.csv", stored_path="a.csv", size_bytes=1, status=UploadStatus.PENDING)
+    stale = Upload(
+        user_id=user.id, original_name="b.csv", stored_path="b.csv", size_bytes=1,
+        status=UploadStatus.PROCESSING, processing_started_at=datetime.utcnow() - timedelta(days=1)
+    )
+    running = Upload(
+        user_id=user.id, original_name="c.csv", stored_path="c.csv", size_bytes=1,
+        status=UploadStatus.PROCESSING, processing_started_at=datetime.utcnow()
+    )
+    db.add_all([pending, stale, running])
+    db.commit()
+    service = UploadService(db)
+
+    assert service.get_unfinished_upload_ids() == [pending.id, stale.id]
+    assert service.claim_upload(pending.id)
+    assert not service.claim_upload(pending.id)
+    assert service.claim_upload(stale.id)
+    assert not service.claim_upload(running.id)
+    assert service.get_unfinished_upload_ids() == []
+
+
+def test_discard_upload_removes_derived_files(db, tmp_path, monkeypatch):
+    """Teste de que o descarte remove o CSV e todos os arquivos derivados, inclusive o gzip"""
+    monkeypatch.setattr("app.config.settings.uploads_dir", str(tmp_path))
+    names = ["dados.csv", "dados.parquet", "dados.rowidx", "dados.csv.gz"]
+    for name in names:
+        (tmp_path / name).write_bytes(b"x")
+    user = User(name="Usuário", email="user@teste.com", password_hash="x", role=UserRole.USER)
+    db.add(user)
+    db.commit()
+    upload = Upload(
+        user_id=user.id, original_name="dados.csv", stored_path="dados.csv", size_bytes=1,
+        columnar_path="dados.parquet", row_index_path="dados.rowidx"
+    )
+    db.add(upload)
+    db.commit()
+
+    UploadService(db).discard_upload(upload)
+
+    assert [name for name in names if (tmp_path / name).exists()] == []
+    assert db.query(Upload).count() == 0
+
+
+def test_aggregate_backfill_does_not_use_upload_slots(tmp_path, monkeypatch):
+    """Teste de que o preenchimento de agregados não ocupa vagas de upload e percorre todos os pendentes"""
+    monkeypatch.setattr("app.config.settings.uploads_dir", str(tmp_path))
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine)
+
+    db = session_factory()
+    user = User(name="Usuário", email="user@teste.com", password_hash="x", role=UserRole.USER)
+    db.add(user)
+    db.commit()
+    for i in range(5):
+        (tmp_path / f"legado_{i}.csv").write_text("SEXO;PESO\nM;70\nF;80\n", encoding="utf-8")
+        db.add(Upload(
+            user_id=user.id, original_name=f"legado_{i}.csv", stored_path=f"legado_{i}.csv",
+            size_bytes=1, status=UploadStatus.READY
+        ))
+    db.commit()
+    db.close()
+
+    queue = IngestQueue(max_workers=1, max_pending=0, session_factory=session_factory)
+    release = threading.Event()
+    monkeypatch.setattr(queue, "_run", lambda upload_id: release.wait(timeout=5))
+
+    backfill = queue.start_aggregate_backfill()
+    queue.submit(99)
+    assert backfill.result(timeout=10) == 5
+
+    release.set()
+    queue.shutdown(wait=True)
+    db = session_factory()
+    try:
+        assert db.query(UploadAggregate).count() == 5
+    finally:
+        db.close()
+        engine.dispose()
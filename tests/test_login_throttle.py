@@ -0,0 +1,71 @@
+"""
+Testes da limitação de tentativas de login
+"""
+import pytest
+from app.services import login_throttle as login_throttle_module
+from app.services.login_throttle import LoginThrottle, LoginThrottled, TokenBucketLimiter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Relógio controlado pelo teste"""
+    now = [1000.0]
+    monkeypatch.setattr(login_throttle_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_bucket_refill_and_lru(clock):
+    """Teste da reposição contínua e do limite de chaves"""
+    limiter = TokenBucketLimiter(capacity=2, refill_per_second=0.5, max_keys=2)
+    assert limiter.acquire("a") is None
+    assert limiter.acquire("a") is None
+    assert limiter.acquire("a") == pytest.approx(2.0)
+
+    clock[0] += 2
+    assert limiter.acquire("a") is None
+
+    limiter.acquire("b")
+    limiter.acquire("c")
+    assert len(limiter) == 2
+    # "a" foi descartada: volta com o balde cheio
+    assert limiter.acquire("a") is None and limiter.acquire("a") is None
+
+
+def test_throttle_by_email_and_ip(clock):
+    """Teste das recusas por email e por IP, com devolução no sucesso"""
+    throttle = LoginThrottle(
+        ip_burst=4, ip_per_minute=0,
+        email_burst=2, email_per_minute=0,
+        email_global_burst=3, email_global_per_minute=0,
+        max_keys=100
+    )
+
+    # O limite por email vale para cada IP: o atacante não bloqueia a vítima
+    throttle.check("10.0.0.1", "Alvo@Teste.com")
+    throttle.check("10.0.0.1", "alvo@teste.com ")
+    with pytest.raises(LoginThrottled) as exc:
+        throttle.check("10.0.0.1", "alvo@teste.com")
+    assert exc.value.scope == "email"
+    throttle.check("10.0.0.2", "alvo@teste.com")
+
+    # Somando os IPs, o email tem um limite global mais folgado
+    with pytest.raises(LoginThrottled) as exc:
+        throttle.check("10.0.0.3", "alvo@teste.com")
+    assert exc.value.scope == "email_global"
+
+    for email in ("a@teste.com", "b@teste.com"):
+        throttle.check("10.0.0.1", email)
+    with pytest.raises(LoginThrottled) as exc:
+        throttle.check("10.0.0.1", "d@teste.com")
+    assert exc.value.scope == "ip"
+
+    # Logins bem-sucedidos não consomem o limite
+    for _ in range(5):
+        throttle.check("10.0.0.9", "ok@teste.com")
+        throttle.succeeded("10.0.0.9", "ok@teste.com")
+
+    metrics = throttle.metrics()
+    assert metrics["rejected_email"] == 1
+    assert metrics["rejected_email_global"] == 1
+    assert metrics["rejected_ip"] == 1
+    assert metrics["allowed"] == 10
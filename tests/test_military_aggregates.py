@@ -0,0 +1,80 @@
+"""
+Testes da agregação das estatísticas militares
+"""
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from app.services.military_aggregates import MilitaryAggregate, QuantileSketch, aggregate_csv_file
+
+
+@pytest.fixture
+def military_csv(tmp_path):
+    """CSV com colunas militares e valores ausentes"""
+    rng = np.random.default_rng(0)
+    rows = 20000
+    df = pd.DataFrame({
+        "UF_NASCIMENTO": rng.choice(["SP", "RJ", "MG", "BA"], rows),
+        "SEXO": rng.choice(["M", "F"], rows),
+        "ANO_NASCIMENTO": rng.integers(1970, 2005, rows).astype(float),
+        "PESO": rng.normal(72, 10, rows).round(1),
+        "OBS": ["texto; com separador"] * rows,
+    })
+    df.loc[::40, "ANO_NASCIMENTO"] = np.nan
+    file_path = tmp_path / "militar.csv"
+    df.to_csv(file_path, sep=";", index=False)
+    return file_path, df
+
+
+def test_sketch_median_within_relative_accuracy():
+    """Teste de que a mediana estimada respeita o erro relativo"""
+    values = np.random.default_rng(1).lognormal(4, 0.5, 50000)
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    for part in np.array_split(values, 7):
+        partial = QuantileSketch(relative_accuracy=0.01)
+        partial.add(part)
+        sketch.merge(partial)
+
+    assert sketch.count == len(values)
+    assert sketch.quantile(0.5) == pytest.approx(np.median(values), rel=0.02)
+
+
+def test_chunked_aggregate_matches_full_file(military_csv):
+    """Teste de que os blocos combinados equivalem ao arquivo inteiro"""
+    file_path, df = military_csv
+
+    stats = aggregate_csv_file(file_path, "utf-8", ";", chunksize=3000).finalize()
+
+    uf_counts = df["UF_NASCIMENTO"].value_counts()
+    assert stats["uf_nascimento"] == {"labels": uf_counts.index.tolist(), "data": uf_counts.tolist()}
+    decades = ((df["ANO_NASCIMENTO"].dropna() // 10) * 10).value_counts().sort_index()
+    assert stats["ano_nascimento"]["data"] == decades.tolist()
+    peso = stats["estatisticas_fisicas"]["peso"]
+    assert peso["media"] == pytest.approx(df["PESO"].mean())
+    assert peso["min"] == df["PESO"].min()
+    assert peso["max"] == df["PESO"].max()
+    assert peso["mediana"] == pytest.approx(df["PESO"].median(), rel=0.01)
+
+
+def test_parallel_aggregate_matches_sequential(military_csv):
+    """Teste de que a agregação em processos gera o mesmo resultado"""
+    file_path, _ = military_csv
+
+    sequential = aggregate_csv_file(file_path, "utf-8", ";", chunksize=3000).finalize()
+    parallel = aggregate_csv_file(file_path, "utf-8", ";", workers=3, chunksize=3000).finalize()
+
+    # A soma em ordem diferente pode variar na última casa decimal
+    sequential_peso = sequential.pop("estatisticas_fisicas")["peso"]
+    parallel_peso = parallel.pop("estatisticas_fisicas")["peso"]
+    assert parallel == sequential
+    assert parallel_peso == pytest.approx(sequential_peso)
+
+
+def test_aggregate_roundtrip_json(military_csv):
+    """Teste de que o agregado parcial sobrevive à serialização"""
+    file_path, _ = military_csv
+    aggregate = aggregate_csv_file(file_path, "utf-8", ";")
+
+    restored = MilitaryAggregate.from_dict(json.loads(json.dumps(aggregate.to_dict())))
+
+    assert restored.finalize() == aggregate.finalize()
@@ -0,0 +1,45 @@
+"""
+Testes do pool de hashing de senhas
+"""
+import asyncio
+import threading
+import pytest
+from app.services import password_pool as password_pool_module
+from app.services.password_pool import PasswordPool, PasswordPoolFull
+
+
+def test_pool_runs_off_loop_and_records_metrics(monkeypatch):
+    """Teste de hash/verificação fora do event loop com métricas"""
+    monkeypatch.setattr(password_pool_module, "hash_password", lambda password: f"hash:{password}")
+    monkeypatch.setattr(password_pool_module, "verify_password", lambda plain, hashed: hashed == f"hash:{plain}")
+    pool = PasswordPool(max_workers=2, max_pending=2)
+
+    async def scenario():
+        hashed = await pool.hash("segredo")
+        return hashed, await pool.verify("segredo", hashed), await pool.verify("errada", hashed)
+
+    assert asyncio.run(scenario()) == ("hash:segredo", True, False)
+    assert pool.verify_sync("segredo", "hash:segredo")
+
+    metrics = pool.metrics()
+    assert metrics["completed"] == 4
+    assert metrics["in_flight"] == 0
+    assert metrics["hash_seconds_max"] >= metrics["hash_seconds_avg"] >= 0
+    pool.shutdown()
+
+
+def test_pool_rejects_when_saturated(monkeypatch):
+    """Teste da recusa quando execução e fila estão cheias"""
+    release = threading.Event()
+    monkeypatch.setattr(password_pool_module, "hash_password", lambda password: release.wait(5))
+    pool = PasswordPool(max_workers=1, max_pending=1)
+
+    futures = [pool._submit(password_pool_module.hash_password, "a") for _ in range(2)]
+    with pytest.raises(PasswordPoolFull):
+        pool.hash_sync("b")
+    assert pool.metrics()["rejected"] == 1
+    assert pool.metrics()["queued"] == 1
+
+    release.set()
+    assert all(future.result(timeout=5) for future in futures)
+    pool.shutdown()
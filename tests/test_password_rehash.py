@@ -0,0 +1,115 @@
+"""
+Testes do custo do hash de senhas e da regravação no login
+"""
+import asyncio
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+from app.config import settings
+from app.db import Base
+from app.models import User, UserRole
+from app.security import password_needs_rehash
+from app.services import password_pool as password_pool_module
+from app.services.auth_service import AuthService
+
+HASH_TEMPLATE = "$bcrypt-sha256$v=2,t=2b,r={rounds}$n79VH.0Q2TMWmt3Oqt9uku$Kq4Noyk3094Y4QCE.3f7mgcmSOsY3Ri"
+
+
+def test_needs_rehash_when_cost_differs():
+    """Teste de que apenas hashes no custo configurado estão atualizados"""
+    rounds = settings.password_hash_rounds
+    assert not password_needs_rehash(HASH_TEMPLATE.format(rounds=rounds))
+    assert password_needs_rehash(HASH_TEMPLATE.format(rounds=rounds - 1))
+    assert password_needs_rehash(HASH_TEMPLATE.format(rounds=rounds + 1))
+
+
+def test_login_rehashes_outdated_hash(db, monkeypatch):
+    """Teste da regravação do hash em um login bem-sucedido"""
+    old_hash = HASH_TEMPLATE.format(rounds=settings.password_hash_rounds - 2)
+    new_hash = HASH_TEMPLATE.format(rounds=settings.password_hash_rounds)
+
+    def fake_verify_and_update(plain, hashed):
+        if plain != "segredo":
+            return False, None
+        return True, (new_hash if hashed == old_hash else None)
+
+    monkeypatch.setattr(password_pool_module, "verify_and_update_password", fake_verify_and_update)
+    user = User(name="Usuário", email="user@teste.com", password_hash=old_hash, role=UserRole.USER)
+    db.add(user)
+    db.commit()
+    service = AuthService(db)
+
+    assert service.authenticate_user("user@teste.com", "errada") is None
+    assert db.get(User, user.id).password_hash == old_hash
+
+    assert service.authenticate_user("user@teste.com", "segredo").id == user.id
+    db.expire_all()
+    assert db.get(User, user.id).password_hash == new_hash
+
+
+@pytest.fixture
+def outdated_login(monkeypatch):
+    """Hashes antigo e novo, com a verificação de senha substituída"""
+    old_hash = HASH_TEMPLATE.format(rounds=settings.password_hash_rounds - 2)
+    new_hash = HASH_TEMPLATE.format(rounds=settings.password_hash_rounds)
+
+    def fake_verify_and_update(plain, hashed):
+        if plain != "segredo":
+            return False, None
+        return True, (new_hash if hashed == old_hash else None)
+
+    monkeypatch.setattr(password_pool_module, "verify_and_update_password", fake_verify_and_update)
+    return old_hash, new_hash
+
+
+def _run_async_login(old_hash, fail_commit=False):
+    """Login pela sessão assíncrona; retorna (id autenticado, hash gravado, id do usuário)"""
+
+    async def scenario():
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        sessionmaker = async_sessionmaker(bind=engine, expire_on_commit=False)
+        try:
+            async with sessionmaker() as db:
+                user = User(name="Usuário", email="user@teste.com", password_hash=old_hash, role=UserRole.USER)
+                db.add(user)
+                await db.commit()
+                user_id = user.id
+
+                if fail_commit:
+                    async def failing_commit():
+                        raise OperationalError("UPDATE users", {}, Exception("database is locked"))
+                    db.commit = failing_commit
+
+                authenticated = await AuthService(db).authenticate_user_async("user@teste.com", "segredo")
+                authenticated_id = authenticated.id if authenticated else None
+
+            async with sessionmaker() as db:
+                stored = (await db.get(User, user_id)).password_hash
+            return authenticated_id, stored, user_id
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(scenario())
+
+
+def test_async_login_rehashes_outdated_hash(outdated_login):
+    """Teste da regravação do hash no login pela sessão assíncrona"""
+    old_hash, new_hash = outdated_login
+
+    authenticated_id, stored, user_id = _run_async_login(old_hash)
+
+    assert authenticated_id == user_id
+    assert stored == new_hash
+
+
+def test_async_login_survives_rehash_failure(outdated_login):
+    """Teste de que uma falha ao regravar o hash não impede o login"""
+    old_hash, _ = outdated_login
+
+    authenticated_id, stored, user_id = _run_async_login(old_hash, fail_commit=True)
+
+    assert authenticated_id == user_id
+    assert stored == old_hash
@@ -0,0 +1,113 @@
+"""
+Testes das consultas filtradas sobre uploads
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from app.models import Upload, UploadColumn
+from app.services.query_service import QueryService, parse_predicates
+
+
+@pytest.fixture
+def upload_files(tmp_path, monkeypatch):
+    """Upload com CSV e cópia colunar no diretório de uploads temporário"""
+    monkeypatch.setattr("app.config.settings.uploads_dir", str(tmp_path))
+    rng = np.random.default_rng(0)
+    rows = 3000
+    df = pd.DataFrame({
+        "UF_NASCIMENTO": rng.choice(["SP", "RJ", "MG"], rows),
+        "SEXO": rng.choice(["M", "F"], rows),
+        "PESO": rng.normal(72, 10, rows).round(1),
+    })
+    df.loc[::100, "PESO"] = np.nan
+    df.to_csv(tmp_path / "dados.csv", sep=";", index=False)
+
+    columnar_path = None
+    try:
+        df.to_parquet(tmp_path / "dados.parquet", row_group_size=500)
+        columnar_path = "dados.parquet"
+    except ImportError:
+        pass
+    return df, Upload(stored_path="dados.csv", columnar_path=columnar_path)
+
+
+FILTERS = [
+    {"column": "UF_NASCIMENTO", "op": "in", "value": ["SP", "MG"]},
+    {"column": "SEXO", "op": "eq", "value": "M"},
+    {"column": "PESO", "op": "ge", "value": 80},
+]
+
+
+def _expected(df, limit):
+    mask = df["UF_NASCIMENTO"].isin(["SP", "MG"]) & (df["SEXO"] == "M") & (df["PESO"] >= 80)
+    return df.loc[mask, ["UF_NASCIMENTO", "PESO"]].head(limit)
+
+
+@pytest.mark.parametrize("use_columnar", [True, False])
+def test_query_filters_and_projects(upload_files, use_columnar):
+    """Teste de filtros, projeção e limite na cópia colunar e no CSV"""
+    df, upload = upload_files
+    if use_columnar and upload.columnar_path is None:
+        pytest.skip("pyarrow indisponível")
+    if not use_columnar:
+        upload.columnar_path = None
+
+    rows = list(QueryService().query_upload(upload, ["UF_NASCIMENTO", "PESO"], parse_predicates(FILTERS), 40))
+
+    expected = _expected(df, 40)
+    assert len(rows) == len(expected) == 40
+    assert [row["UF_NASCIMENTO"] for row in rows] == expected["UF_NASCIMENTO"].tolist()
+    assert [float(row["PESO"]) for row in rows] == expected["PESO"].tolist()
+
+
+def test_query_validation(upload_files):
+    """Teste de colunas e operadores inválidos"""
+    _, upload = upload_files
+    with pytest.raises(ValueError):
+        parse_predicates([{"column": "SEXO", "op": "like", "value": "M"}])
+    with pytest.raises(ValueError):
+        QueryService().query_upload(upload, ["INEXISTENTE"], [], 10)
+
+
+def test_csv_fallback_selects_same_rows_as_columnar(upload_files):
+    """Teste de que a mesma consulta seleciona as mesmas linhas no Parquet e no CSV (este como texto)"""
+    df, upload = upload_files
+    if upload.columnar_path is None:
+        pytest.skip("pyarrow indisponível")
+    predicates = parse_predicates([
+        {"column": "PESO", "op": "gt", "value": 75},
+        {"column": "SEXO", "op": "in", "value": ["F"]},
+    ])
+    columns = ["SEXO", "PESO"]
+
+    columnar_rows = list(QueryService().query_upload(upload, columns, predicates, 25))
+    upload.columnar_path = None
+    csv_rows = list(QueryService().query_upload(upload, columns, predicates, 25))
+
+    assert len(columnar_rows) == len(csv_rows) == 25
+    assert all(type(row["PESO"]) is float for row in columnar_rows)
+    assert all(type(row["PESO"]) is str for row in csv_rows)
+    assert [(r["SEXO"], float(r["PESO"])) for r in csv_rows] == [(r["SEXO"], r["PESO"]) for r in columnar_rows]
+
+
+def test_csv_fallback_keeps_text_when_sidecar_was_abandoned(tmp_path, monkeypatch):
+    """Teste de que, sem cópia colunar, valores fora do tipo detectado não viram nulos"""
+    monkeypatch.setattr("app.config.settings.uploads_dir", str(tmp_path))
+    lines = [f"{i};{i % 2}" for i in range(6000)] + ["ABC12;1"]
+    (tmp_path / "codigos.csv").write_text("COD;FLAG\n" + "\n".join(lines) + "\n")
+    # Tipos detectados no primeiro bloco; a cópia colunar não existe
+    upload = Upload(stored_path="codigos.csv", columnar_path=None)
+    upload.columns = [
+        UploadColumn(position=0, name="COD", dtype="int"),
+        UploadColumn(position=1, name="FLAG", dtype="int"),
+    ]
+    service = QueryService()
+
+    rows = list(service.query_upload(upload, None, parse_predicates([{"column": "COD", "op": "eq", "value": "ABC12"}]), 10))
+    assert rows == [{"COD": "ABC12", "FLAG": "1"}]
+
+    rows = list(service.query_upload(upload, ["COD"], parse_predicates([{"column": "COD", "op": "ge", "value": 5998}]), 10))
+    assert rows == [{"COD": "5998"}, {"COD": "5999"}]
+
+    rows = list(service.query_upload(upload, ["COD"], [], 6001))
+    assert rows[0] == {"COD": "0"} and rows[-1] == {"COD": "ABC12"}
@@ -0,0 +1,102 @@
+"""
+Testes da contagem de linhas de CSV
+"""
+import pandas as pd
+import pytest
+from app.services.row_counter import count_csv_rows
+
+
+def write_csv(tmp_path, content: str, name: str = "dados.csv"):
+    file_path = tmp_path / name
+    file_path.write_bytes(content.encode("utf-8"))
+    return file_path
+
+
+@pytest.mark.parametrize("block_size", [1, 7, 4096])
+def test_count_matches_pandas(tmp_path, block_size):
+    """Teste de que a contagem reproduz o pandas com on_bad_lines='skip'"""
+    content = (
+        "a,b,c\n"
+        "1,2,3\n"
+        "\n"
+        'x,"linha\nquebrada, com vírgula",z\n'
+        "1,2,3,4\n"
+        'x,"aspas ""duplas""",z\n'
+        "1,2\n"
+        "5,6,7"
+    )
+    file_path = write_csv(tmp_path, content)
+
+    result = count_csv_rows(file_path, block_size=block_size)
+
+    assert result.rows == len(pd.read_csv(file_path, on_bad_lines="skip"))
+    assert result.rows == 5
+    assert result.bad_lines == 1
+    assert result.blank_lines == 1
+
+
+def test_count_crlf_and_separator(tmp_path):
+    """Teste com quebras CRLF e separador ';'"""
+    file_path = write_csv(tmp_path, "a;b\r\n1;2\r\n\r\n3;4\r\n")
+
+    result = count_csv_rows(file_path, separator=";")
+
+    assert result.rows == 2
+    assert result.bad_lines == 0
+
+
+def test_count_empty_and_header_only(tmp_path):
+    """Teste de arquivo vazio e arquivo só com cabeçalho"""
+    assert count_csv_rows(write_csv(tmp_path, "", "vazio.csv")).rows == 0
+    assert count_csv_rows(write_csv(tmp_path, "a,b,c", "cabecalho.csv")).rows == 0
+
+
+@pytest.mark.parametrize("content", [
+    'a,b\nx"y,1\n2,3\n4,5\n',
+    'a,b\nx"y,1\n2,3"\n4,5\n',
+    'a,b\n"x",1\n2,3\n4,5',
+])
+@pytest.mark.parametrize("block_size", [3, 4096])
+def test_count_quote_inside_unquoted_field(tmp_path, content, block_size):
+    """Teste de aspas literais no meio de campos sem aspas"""
+    file_path = write_csv(tmp_path, content)
+
+    result = count_csv_rows(file_path, block_size=block_size)
+
+    assert result.rows == len(pd.read_csv(file_path, on_bad_lines="skip")) == 3
+
+
+@pytest.mark.parametrize("separator,expected", [(",", 2), ("\t", 4)])
+@pytest.mark.parametrize("block_size", [2, 4096])
+def test_count_whitespace_only_lines(tmp_path, separator, expected, block_size):
+    """Teste de que linhas só com espaços e tabulações são ignoradas (se a tabulação não for o separador)"""
+    content = "a{0}b\n  \n1{0}2\n \t \r\n3{0}4\n\t".format(separator)
+    file_path = write_csv(tmp_path, content)
+
+    result = count_csv_rows(file_path, separator=separator, block_size=block_size)
+
+    assert result.rows == len(pd.read_csv(file_path, sep=separator, on_bad_lines="skip")) == expected
+    assert result.bad_lines == 0
+
+
+@pytest.mark.parametrize("block_size", [3, 4096])
+def test_count_first_row_with_multiple_extra_fields(tmp_path, block_size):
+    """Teste de primeira linha com dois campos a mais (índice de várias colunas no pandas)"""
+    file_path = write_csv(tmp_path, "a,b\n1,2,3,4\n5,6,7,8\n1,2,3\n1,2,3,4,5\n9,9\n")
+
+    result = count_csv_rows(file_path, block_size=block_size)
+
+    frame = pd.read_csv(file_path, on_bad_lines="skip")
+    assert frame.index.nlevels == 2
+    assert result.rows == len(frame) == 4
+    assert result.bad_lines == 1
+
+
+@pytest.mark.parametrize("block_size", [3, 4096])
+def test_count_bare_carriage_return(tmp_path, block_size):
+    """Teste de arquivo com quebras de linha "\\r" isoladas"""
+    file_path = write_csv(tmp_path, 'a,b\r1,2\r"x\ry",3\r\r5,6\r')
+
+    result = count_csv_rows(file_path, block_size=block_size)
+
+    assert result.rows == len(pd.read_csv(file_path, on_bad_lines="skip")) == 3
@@ -0,0 +1,64 @@
+"""
+Testes do índice esparso de linhas
+"""
+import json
+import pandas as pd
+import pytest
+from app.services.csv_service import CSVService
+from app.services.row_index_service import RowIndexService
+
+
+@pytest.fixture(params=["aspas nas bordas", "aspa no meio do campo"])
+def indexed_csv(tmp_path, request):
+    """CSV com aspas multilinha, linhas mal formadas e em branco, já indexado"""
+    lines = ["ID;NOME;OBS"]
+    for i in range(5500):
+        if i == 3 and request.param == "aspa no meio do campo":
+            lines.append(f'{i};Nome "apelido" {i};')  # Aspas literais: contagem pelo pandas
+        elif i % 997 == 0:
+            lines.append(f'{i};"Nome\nem duas linhas";x')
+        elif i % 1013 == 0:
+            lines.append(f"{i};demais;campos;aqui")  # Mal formada: descartada
+        elif i % 1500 == 0:
+            lines.append("")
+        else:
+            lines.append(f"{i};Nome {i};")
+    file_path = tmp_path / "dados.csv"
+    file_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    info = CSVService().get_file_info(file_path, offset_stride=1000)
+    index_path = tmp_path / "dados.rowidx.json"
+    service = RowIndexService()
+    service.write_index(index_path, info["row_count"], 1000, info["encoding"], info["separator"], info["columns"])
+    index = json.loads(index_path.read_text())
+
+    expected = pd.read_csv(file_path, sep=";", dtype=str, on_bad_lines="skip")
+    return file_path, index, expected
+
+
+@pytest.mark.parametrize("offset", [0, 999, 1000, 2500, 4321])
+def test_read_rows_matches_full_parse(indexed_csv, offset):
+    """Teste de que cada janela coincide com a leitura completa do arquivo"""
+    file_path, index, expected = indexed_csv
+
+    rows = RowIndexService().read_rows(file_path, index, offset, 50)
+
+    window = expected.iloc[offset:offset + 50]
+    assert rows == window.astype(object).where(window.notna(), None).to_dict(orient="records")
+
+
+def test_index_has_offsets(indexed_csv):
+    """Teste de que o índice tem um offset por bloco, inclusive quando a contagem fica com o pandas"""
+    file_path, index, expected = indexed_csv
+
+    assert len(index["offsets"]) == -(-len(expected) // 1000)
+
+
+def test_read_rows_past_the_end(indexed_csv):
+    """Teste de janelas no fim do arquivo"""
+    file_path, index, expected = indexed_csv
+    service = RowIndexService()
+
+    assert index["rows"] == len(expected)
+    assert len(service.read_rows(file_path, index, len(expected) - 3, 50)) == 3
+    assert service.read_rows(file_path, index, len(expected), 50) == []
@@ -0,0 +1,49 @@
+"""
+Testes da busca por nome de arquivo
+"""
+import pytest
+from app.models import Upload, User
+from app.services.search_service import build_match_query, create_search_index
+from app.services.upload_service import UploadService
+
+
+@pytest.fixture
+def uploads(db):
+    """Uploads com nomes variados e índice de busca criado"""
+    assert create_search_index(db.get_bind())
+    user = User(name="Teste", email="teste@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    for name in ("relatorio_2024.csv", "Relatório Final.csv", "dados-militares.csv"):
+        db.add(Upload(user_id=user.id, original_name=name, stored_path=name, size_bytes=1))
+    db.commit()
+    return user
+
+
+def _search(db, q):
+    return sorted(u.original_name for u in UploadService(db).get_filtered_uploads(q=q)["uploads"])
+
+
+def test_build_match_query():
+    """Teste da conversão da busca em consulta FTS5"""
+    assert build_match_query("relat 2024") == '"relat"* AND "2024"*'
+    assert build_match_query('"*') is None
+    assert build_match_query("relatorio_2024") == '"relatorio"* AND "2024"*'
+
+
+def test_search_by_token_and_prefix(db, uploads):
+    """Teste da busca por termos e prefixos"""
+    assert _search(db, "relat") == ["Relatório Final.csv", "relatorio_2024.csv"]
+    assert _search(db, "relatorio 2024") == ["relatorio_2024.csv"]
+    assert _search(db, "relatorio_2024") == ["relatorio_2024.csv"]
+    assert _search(db, "relatorio_20") == ["relatorio_2024.csv"]
+    assert _search(db, "milit") == ["dados-militares.csv"]
+    assert _search(db, "csv") == ["Relatório Final.csv", "dados-militares.csv", "relatorio_2024.csv"]
+
+
+def test_search_index_follows_deletes(db, uploads):
+    """Teste de que o índice acompanha a remoção de uploads"""
+    db.delete(db.query(Upload).filter(Upload.original_name == "dados-militares.csv").one())
+    db.commit()
+
+    assert _search(db, "dados") == []
@@ -0,0 +1,38 @@
+"""
+Testes da serialização das respostas da API
+"""
+import json
+from datetime import datetime
+from app.models import Upload, UploadStatus, User, UserRole
+from app.responses import ORJSONResponse
+from app.serializers import serialize_upload, serialize_user
+
+
+def test_serialize_upload_with_user(db):
+    """Teste de que apenas campos públicos são serializados"""
+    user = User(name="Teste", email="teste@example.com", password_hash="hash", role=UserRole.USER)
+    upload = Upload(
+        user=user,
+        original_name="dados.csv",
+        stored_path="segredo/dados.csv",
+        size_bytes=10,
+        uploaded_at=datetime(2024, 5, 1, 12, 30),
+        status=UploadStatus.READY
+    )
+    db.add(upload)
+    db.commit()
+
+    data = serialize_upload(upload, include_user=True)
+
+    assert data["uploaded_at"] == "2024-05-01T12:30:00"
+    assert data["status"] == "ready"
+    assert data["user"] == {"id": user.id, "name": "Teste", "role": "user"}
+    assert "stored_path" not in data
+    assert "password_hash" not in serialize_user(user)
+
+
+def test_orjson_response_renders_native_types():
+    """Teste da resposta orjson com datetime e enum"""
+    response = ORJSONResponse({"quando": datetime(2024, 5, 1), "papel": UserRole.OPERATOR, 1: "a"})
+
+    assert json.loads(response.body) == {"quando": "2024-05-01T00:00:00", "papel": "operator", "1": "a"}
@@ -0,0 +1,170 @@
+"""
+Testes do serviço de estatísticas
+"""
+import json
+from datetime import datetime
+import pandas as pd
+import pytest
+from app.models import Upload, UploadAggregate, UploadStatus, User, UserRole
+from app.services.military_aggregates import MilitaryAggregate
+from app.services.stats_service import StatsService
+
+
+CSV_CONTENT = (
+    "UF_NASCIMENTO;SEXO;PESO\n"
+    "SP;M;70\n"
+    "SP;F;80\n"
+    "RJ;M;90\n"
+)
+
+
+@pytest.fixture
+def uploads_dir(tmp_path, monkeypatch):
+    """Diretório de uploads temporário"""
+    monkeypatch.setattr("app.config.settings.uploads_dir", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def user(db):
+    user = User(name="Usuário", email="user@teste.com", password_hash="x", role=UserRole.USER)
+    db.add(user)
+    db.commit()
+    return user
+
+
+def _add_upload(db, user, stored_path="dados.csv", status=UploadStatus.READY, uploaded_at=None):
+    upload = Upload(
+        user_id=user.id,
+        original_name=stored_path,
+        stored_path=stored_path,
+        size_bytes=1,
+        status=status,
+        uploaded_at=uploaded_at or datetime(2024, 1, 1)
+    )
+    db.add(upload)
+    db.commit()
+    return upload
+
+
+def _aggregate(frame: dict) -> MilitaryAggregate:
+    aggregate = MilitaryAggregate()
+    aggregate.update(pd.DataFrame(frame))
+    return aggregate
+
+
+def test_military_stats_read_from_stored_aggregate(db, user, uploads_dir):
+    """Teste de que as estatísticas vêm do agregado gravado, sem reler o arquivo"""
+    # O arquivo não existe: qualquer leitura do CSV falharia
+    upload = _add_upload(db, user, stored_path="inexistente.csv")
+    service = StatsService(db)
+    stored = service.store_military_aggregate(upload.id, _aggregate({"SEXO": ["M", "M", "F"]}))
+
+    assert service.get_military_stats(upload.id) == stored
+    assert stored["sexo"] == {"labels": ["M", "F"], "data": [2, 1]}
+
+
+def test_military_stats_defaults_to_latest_ready_upload(db, user, uploads_dir):
+    """Teste de que, sem upload_id, é usado o último upload pronto"""
+    service = StatsService(db)
+    older = _add_upload(db, user, "antigo.csv", uploaded_at=datetime(2024, 1, 1))
+    latest = _add_upload(db, user, "recente.csv", uploaded_at=datetime(2024, 2, 1))
+    _add_upload(db, user, "pendente.csv", status=UploadStatus.PENDING, uploaded_at=datetime(2024, 3, 1))
+    service.store_military_aggregate(older.id, _aggregate({"SEXO": ["F"]}))
+    service.store_military_aggregate(latest.id, _aggregate({"SEXO": ["M"]}))
+
+    assert service.get_military_stats()["sexo"] == {"labels": ["M"], "data": [1]}
+
+
+def test_military_stats_computed_once_for_legacy_upload(db, user, uploads_dir):
+    """Teste de que uploads sem agregado são calculados no primeiro acesso e gravados"""
+    (uploads_dir / "legado.csv").write_text(CSV_CONTENT, encoding="utf-8")
+    upload = _add_upload(db, user, "legado.csv")
+    service = StatsService(db)
+
+    stats = service.get_military_stats(upload.id)
+
+    assert stats["uf_nascimento"] == {"labels": ["SP", "RJ"], "data": [2, 1]}
+    assert stats["estatisticas_fisicas"]["peso"]["max"] == 90.0
+    row = db.get(UploadAggregate, upload.id)
+    assert row is not None
+    assert json.loads(row.military_stats_json) == stats
+    assert row.partials_json is not None
+
+    # Segundo acesso lê o agregado mesmo sem o arquivo
+    (uploads_dir / "legado.csv").unlink()
+    assert service.get_military_stats(upload.id) == stats
+
+
+@pytest.fixture
+def other_user(db):
+    user = User(name="Outro", email="outro@teste.com", password_hash="x", role=UserRole.USER)
+    db.add(user)
+    db.commit()
+    return user
+
+
+def test_combined_stats_merge_partials(db, user, uploads_dir):
+    """Teste de que as estatísticas combinadas somam os parciais de cada upload"""
+    service = StatsService(db)
+    first = _add_upload(db, user, "a.csv")
+    second = _add_upload(db, user, "b.csv")
+    service.store_military_aggregate(first.id, _aggregate({"SEXO": ["M", "F"], "PESO": [60, 70]}))
+    service.store_military_aggregate(second.id, _aggregate({"SEXO": ["M"], "PESO": [90]}))
+
+    result = service.get_combined_military_stats()
+
+    assert result["total_uploads"] == 2
+    assert result["missing_aggregates"] == 0
+    assert result["military_stats"]["sexo"] == {"labels": ["M", "F"], "data": [2, 1]}
+    peso = result["military_stats"]["estatisticas_fisicas"]["peso"]
+    assert (peso["min"], peso["max"], peso["media"]) == (60.0, 90.0, 220 / 3)
+
+
+def test_combined_stats_filters_by_user_and_date(db, user, other_user, uploads_dir):
+    """Teste dos filtros de usuário e de período"""
+    service = StatsService(db)
+    january = _add_upload(db, user, "jan.csv", uploaded_at=datetime(2024, 1, 15))
+    february = _add_upload(db, user, "fev.csv", uploaded_at=datetime(2024, 2, 15))
+    foreign = _add_upload(db, other_user, "outro.csv", uploaded_at=datetime(2024, 2, 15))
+    service.store_military_aggregate(january.id, _aggregate({"SEXO": ["F"]}))
+    service.store_military_aggregate(february.id, _aggregate({"SEXO": ["M"]}))
+    service.store_military_aggregate(foreign.id, _aggregate({"SEXO": ["M", "M"]}))
+
+    by_user = service.get_combined_military_stats(user_id=user.id)
+    assert by_user["total_uploads"] == 2
+    assert by_user["military_stats"]["sexo"] == {"labels": ["F", "M"], "data": [1, 1]}
+
+    by_date = service.get_combined_military_stats(
+        user_id=user.id, from_date=datetime(2024, 2, 1), to_date=datetime(2024, 2, 28, 23, 59, 59)
+    )
+    assert by_date["total_uploads"] == 1
+    assert by_date["military_stats"]["sexo"] == {"labels": ["M"], "data": [1]}
+
+
+def test_combined_stats_skip_missing_aggregates(db, user, uploads_dir):
+    """Teste de que uploads sem agregado (ou com agregado ilegível) não são calculados na leitura"""
+    (uploads_dir / "legado.csv").write_text(CSV_CONTENT, encoding="utf-8")
+    (uploads_dir / "quebrado.csv").write_text(CSV_CONTENT, encoding="utf-8")
+    service = StatsService(db)
+    stored = _add_upload(db, user, "a.csv")
+    legacy = _add_upload(db, user, "legado.csv")
+    broken = _add_upload(db, user, "quebrado.csv")
+    service.store_military_aggregate(stored.id, _aggregate({"SEXO": ["F"]}))
+    db.add(UploadAggregate(upload_id=broken.id, military_stats_json="{}", partials_json="{inválido"))
+    db.commit()
+
+    result = service.get_combined_military_stats()
+
+    assert result["total_uploads"] == 1
+    assert result["missing_aggregates"] == 2
+    assert result["military_stats"]["sexo"] == {"labels": ["F"], "data": [1]}
+    assert db.get(UploadAggregate, legacy.id) is None
+    assert service.get_upload_ids_missing_aggregates() == [legacy.id, broken.id]
+
+    # O cálculo fica com o preenchimento em segundo plano, que também refaz agregados ilegíveis
+    assert service.backfill_military_aggregate(legacy.id)
+    assert service.backfill_military_aggregate(broken.id)
+    assert not service.backfill_military_aggregate(legacy.id)
+    assert service.get_upload_ids_missing_aggregates() == []
+    assert service.get_combined_military_stats()["total_uploads"] == 3
@@ -0,0 +1,47 @@
+"""
+Testes do cache de tokens verificados
+"""
+import time
+import pytest
+from fastapi import HTTPException
+from app.security import create_access_token
+from app.services import token_cache as token_cache_module
+from app.services.token_cache import TokenCache, decode_access_token
+
+
+def test_decode_uses_cache(monkeypatch):
+    """Teste de que a assinatura é verificada uma única vez por token"""
+    calls = []
+    verify = token_cache_module.verify_token
+    monkeypatch.setattr(token_cache_module, "verify_token", lambda token: calls.append(token) or verify(token))
+    monkeypatch.setattr(token_cache_module, "token_cache", TokenCache(16))
+
+    token = create_access_token(None, {"user_id": 7, "user_role": "user"})
+    first = decode_access_token(token)
+    first["user_role"] = "admin"  # cópia: não altera o cache
+    second = decode_access_token(token)
+
+    assert second["user_id"] == 7 and second["user_role"] == "user"
+    assert len(calls) == 1
+
+    with pytest.raises(HTTPException):
+        decode_access_token(token + "x")
+
+
+def test_cache_expiry_and_lru():
+    """Teste da expiração no exp do token e do limite de entradas"""
+    cache = TokenCache(2)
+    cache.put("expirado", {"user_id": 1, "exp": time.time() - 1})
+    assert cache.get("expirado") is None
+
+    now = time.time()
+    cache.put("a", {"user_id": 1, "exp": now + 60})
+    cache.put("b", {"user_id": 2, "exp": now + 60})
+    cache.get("a")
+    cache.put("c", {"user_id": 3, "exp": now + 60})
+    assert cache.get("b") is None
+    assert cache.get("a")["user_id"] == 1
+    assert len(cache) == 2
+
+    cache.put("sem_exp", {"user_id": 4})
+    assert cache.get("sem_exp") is None
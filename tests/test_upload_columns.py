@@ -0,0 +1,55 @@
+"""
+Testes dos metadados normalizados de colunas
+"""
+import json
+from app.models import Upload, UploadColumn, User
+from app.services.stats_service import StatsService
+from app.services.upload_service import UploadService
+
+
+def test_backfill_and_dtype_distribution(db):
+    """Teste do preenchimento de upload_columns a partir do JSON legado"""
+    user = User(name="Teste", email="teste@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    for dtypes in ({"A": "int", "B": "string"}, {"C": "int"}):
+        db.add(Upload(
+            user_id=user.id,
+            original_name="dados.csv",
+            stored_path="dados.csv",
+            size_bytes=1,
+            columns_json=json.dumps(list(dtypes)),
+            dtypes_json=json.dumps(dtypes)
+        ))
+    db.commit()
+
+    assert UploadService(db).backfill_upload_columns() == 2
+    assert UploadService(db).backfill_upload_columns() == 0
+    assert db.query(UploadColumn).count() == 3
+    assert StatsService(db)._get_dtype_distribution() == {"int": 2, "string": 1}
+
+
+def test_backfill_skips_empty_and_malformed_columns(db, caplog):
+    """Teste de que uploads sem colunas ou com JSON ilegível não são contados e mantêm o JSON original"""
+    user = User(name="Teste", email="teste@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    for columns_json in ("[]", "", "[ ]", "{inválido", '{"A": 1}', '["A"]'):
+        db.add(Upload(
+            user_id=user.id,
+            original_name="dados.csv",
+            stored_path="dados.csv",
+            size_bytes=1,
+            columns_json=columns_json,
+            dtypes_json="{inválido"
+        ))
+    db.commit()
+
+    service = UploadService(db)
+    assert service.backfill_upload_columns() == 1
+    assert db.query(UploadColumn.name, UploadColumn.dtype).all() == [("A", "string")]
+
+    assert caplog.text.count("ilegível") == 2
+    assert service.backfill_upload_columns() == 0
+    stored = {columns_json for (columns_json,) in db.query(Upload.columns_json)}
+    assert {"{inválido", '{"A": 1}'} <= stored
@@ -0,0 +1,147 @@
+"""
+Testes da listagem paginada de uploads
+"""
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import text
+from app.db import normalize_upload_timestamps
+from app.models import Upload, User
+from app.services.upload_service import UploadService
+
+
+@pytest.fixture
+def uploads(db):
+    """25 uploads, alguns com o mesmo horário de envio"""
+    user = User(name="Teste", email="teste@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    base = datetime(2024, 1, 1)
+    for i in range(25):
+        db.add(Upload(
+            user_id=user.id,
+            original_name=f"arquivo_{i}.csv",
+            stored_path=f"arquivo_{i}.csv",
+            size_bytes=1,
+            uploaded_at=base + timedelta(minutes=i // 3)
+        ))
+    db.commit()
+    return user
+
+
+def test_cursor_pagination_matches_offset(db, uploads):
+    """Teste de que a paginação por cursor percorre a mesma ordem que OFFSET"""
+    service = UploadService(db)
+    expected = [u.id for page in range(1, 4) for u in service.get_filtered_uploads(page=page)["uploads"]]
+
+    seen, cursor = [], None
+    while True:
+        data = service.get_filtered_uploads(cursor=cursor, count="none")
+        seen += [u.id for u in data["uploads"]]
+        cursor = data["next_cursor"]
+        if not data["has_next"]:
+            break
+
+    assert data["total"] is None
+    assert seen == expected
+    assert len(set(seen)) == 25
+
+
+def test_estimated_count_is_capped(db, uploads, monkeypatch):
+    """Teste da contagem limitada"""
+    monkeypatch.setattr("app.services.upload_service.settings.listing_count_cap", 10)
+    service = UploadService(db)
+
+    data = service.get_filtered_uploads(count="estimate")
+    assert (data["total"], data["total_is_estimate"]) == (10, True)
+
+    data = service.get_filtered_uploads(count="exact")
+    assert (data["total"], data["total_is_estimate"], data["total_pages"]) == (25, False, 3)
+
+
+def test_invalid_cursor(db):
+    """Teste de cursor inválido"""
+    with pytest.raises(ValueError):
+        UploadService(db).get_filtered_uploads(cursor="invalido")
+
+
+def test_async_listing_matches_sync(db, uploads, tmp_path):
+    """Teste de que a listagem assíncrona retorna o mesmo que a síncrona"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from app.db import Base, async_database_url
+
+    # Copiar os uploads para um banco em arquivo, acessível pelos dois drivers
+    url = f"sqlite:///{tmp_path / 'async.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            rows = [dict(row._mapping) for row in db.execute(table.select())]
+            if rows:
+                conn.execute(table.insert(), rows)
+
+    expected = UploadService(db).get_filtered_uploads(page=2, count="estimate")
+
+    async def list_async():
+        async_engine = create_async_engine(async_database_url(url))
+        try:
+            async with async_sessionmaker(async_engine, expire_on_commit=False)() as session:
+                return await UploadService(session).get_filtered_uploads_async(page=2, count="estimate")
+        finally:
+            await async_engine.dispose()
+
+    data = asyncio.run(list_async())
+
+    assert [u.id for u in data["uploads"]] == [u.id for u in expected["uploads"]]
+    assert data["uploads"][0].user.name == "Teste"
+    assert (data["total"], data["next_cursor"]) == (expected["total"], expected["next_cursor"])
+
+
+def test_listing_skips_json_blobs(db, uploads):
+    """Teste de que a listagem não carrega os JSONs de metadados"""
+    service = UploadService(db)
+    statement = str(service._listing_statement([], page=1, page_size=10))
+    assert "sample_rows_json" not in statement
+    assert "columns_json" not in statement
+
+    db.expire_all()
+    upload = service.get_filtered_uploads()["uploads"][0]
+    assert "sample_rows_json" not in upload.__dict__
+
+    db.expire_all()
+    upload = service.get_upload_by_id(upload.id, include_blobs=True)
+    assert {"columns_json", "dtypes_json", "sample_rows_json"} <= upload.__dict__.keys()
+
+
+def test_cursor_pagination_with_server_default_timestamps(db):
+    """Teste do cursor com datas gravadas pelo CURRENT_TIMESTAMP do banco (sem microssegundos)"""
+    user = User(name="Teste", email="teste@example.com", password_hash="x")
+    db.add(user)
+    db.commit()
+    for i in range(5):
+        db.execute(
+            text("INSERT INTO uploads (user_id, original_name, stored_path, size_bytes) VALUES (:user_id, :name, :name, 1)"),
+            {"user_id": user.id, "name": f"legado_{i}.csv"}
+        )
+    db.commit()
+    assert db.execute(text("SELECT length(uploaded_at) FROM uploads")).scalars().all() == [19] * 5
+
+    assert normalize_upload_timestamps(db.get_bind()) == 5
+    # Uploads novos usam o default do Python, no mesmo formato
+    db.add(Upload(user_id=user.id, original_name="novo.csv", stored_path="novo.csv", size_bytes=1))
+    db.commit()
+    assert set(db.execute(text("SELECT length(uploaded_at) FROM uploads")).scalars()) == {26}
+
+    service = UploadService(db)
+    seen, cursor = [], None
+    for _ in range(10):
+        data = service.get_filtered_uploads(page_size=2, cursor=cursor, count="none")
+        seen += [u.id for u in data["uploads"]]
+        cursor = data["next_cursor"]
+        if not data["has_next"]:
+            break
+
+    assert not data["has_next"]
+    assert sorted(seen) == list(range(1, 7))
+    assert len(seen) == len(set(seen))
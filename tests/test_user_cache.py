@@ -0,0 +1,58 @@
+"""
+Testes do cache de usuários
+"""
+import dataclasses
+import pytest
+from app.models import User, UserRole
+from app.services import user_cache as user_cache_module
+from app.services.auth_service import AuthService
+from app.services.user_cache import UserCache, UserSnapshot
+
+
+def _create_user(db, email="user@teste.com", role=UserRole.USER):
+    user = User(name="Usuário", email=email, password_hash="x", role=role)
+    db.add(user)
+    db.commit()
+    return user
+
+
+def test_snapshot_is_immutable_and_detached(db):
+    """Teste do instantâneo imutável e sem o hash da senha"""
+    user = _create_user(db)
+    snapshot = UserSnapshot.from_user(user)
+    db.close()
+
+    assert snapshot.email == "user@teste.com"
+    assert snapshot.role == UserRole.USER
+    assert not hasattr(snapshot, "password_hash")
+    assert not hasattr(snapshot, "__dict__")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        snapshot.name = "Outro"
+
+
+def test_cache_ttl_and_lru(monkeypatch):
+    """Teste da expiração por TTL e do limite de entradas"""
+    now = [1000.0]
+    monkeypatch.setattr(user_cache_module.time, "monotonic", lambda: now[0])
+    cache = UserCache(ttl=60, maxsize=2)
+    snapshots = [UserSnapshot(i, f"U{i}", f"u{i}@teste.com", UserRole.USER, None) for i in range(3)]
+
+    for snapshot in snapshots:
+        cache.put(snapshot)
+    assert cache.get(0) is None
+    assert cache.get(2) is snapshots[2]
+
+    now[0] += 61
+    assert cache.get(2) is None
+
+
+def test_delete_user_invalidates_cache(db, monkeypatch):
+    """Teste da invalidação ao excluir o usuário"""
+    cache = UserCache(ttl=60, maxsize=10)
+    monkeypatch.setattr("app.services.auth_service.user_cache", cache)
+    _create_user(db, "operador@teste.com", UserRole.OPERATOR)
+    user = _create_user(db)
+    cache.put(UserSnapshot.from_user(user))
+
+    assert AuthService(db).delete_user(user.id)
+    assert cache.get(user.id) is None